@@ -0,0 +1,98 @@
+# file: app/adjustments.py
+import hashlib
+import numpy as np
+import pandas as pd
+
+PRICE_COLS = ["Open", "High", "Low", "Close"]
+
+# Adj Close / Close is noisy in the last digits; smaller moves are not a corporate action
+FACTOR_RTOL = 1e-6
+
+def split_provider_bars(df):
+    """
+    Splits a yfinance download (auto_adjust=False, actions=True) into
+    unadjusted OHLCV and a per-bar adjustment factor frame.
+
+    Yahoo's Close is already split-adjusted and its Adj Close additionally
+    dividend-adjusted, so splits are undone first to get bars that never change
+    once published:
+        split[t]  = product of split ratios after t
+        raw       = provider price * split[t], raw volume = provider volume / split[t]
+        price[t]  = Adj Close / Close / split[t]   (adjusted price = raw * price)
+        volume[t] = split[t]                       (adjusted volume = raw * volume)
+    Factors are piecewise constant between corporate actions and 1.0 after the
+    latest one, so only the breakpoints are kept (see expand_factors).
+    Returns: (raw_df, factors_df[price, volume])
+    """
+    n = len(df)
+    if "Stock Splits" in df.columns:
+        ratios = df["Stock Splits"].to_numpy(dtype=float)
+        ratios = np.where(ratios > 0, ratios, 1.0)
+        # Splits on bar i apply to every bar before i
+        after = np.append(ratios[1:], 1.0)
+        split = np.cumprod(after[::-1])[::-1]
+    else:
+        split = np.ones(n)
+
+    close = df["Close"].to_numpy(dtype=float)
+    if "Adj Close" in df.columns:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            div = df["Adj Close"].to_numpy(dtype=float) / close
+        div = np.where(np.isfinite(div), div, 1.0)
+    else:
+        div = np.ones(n)
+
+    raw = pd.DataFrame(index=df.index)
+    for col in PRICE_COLS:
+        raw[col] = df[col].to_numpy(dtype=float) * split
+    if "Volume" in df.columns:
+        raw["Volume"] = df["Volume"].to_numpy(dtype=float) / split
+
+    factors = pd.DataFrame({"price": div / split, "volume": split}, index=df.index)
+    return raw, compress_factors(factors)
+
+def compress_factors(factors):
+    """Keeps the first bar and every bar where a factor moves by more than FACTOR_RTOL."""
+    if factors.empty:
+        return factors
+    vals = factors[["price", "volume"]].to_numpy(dtype=float)
+    keep = np.ones(len(vals), dtype=bool)
+    keep[1:] = np.any(np.abs(vals[1:] / vals[:-1] - 1.0) > FACTOR_RTOL, axis=1)
+    return factors[keep]
+
+def expand_factors(factors, index):
+    """Per-bar factors for `index` from breakpoints (bars after the last breakpoint reuse it)."""
+    if factors is None or factors.empty:
+        return pd.DataFrame({"price": 1.0, "volume": 1.0}, index=index)
+    f = factors.reindex(factors.index.union(index)).ffill().reindex(index)
+    return f.fillna(1.0)
+
+def apply_factors(raw, factors):
+    """Adjusted OHLCV from raw bars and factor breakpoints, vectorized."""
+    f = expand_factors(factors, raw.index)
+    price = f["price"].to_numpy()
+    adj = raw.copy()
+    for col in PRICE_COLS:
+        if col in adj.columns:
+            adj[col] = raw[col].to_numpy() * price
+    if "Volume" in adj.columns:
+        adj["Volume"] = raw["Volume"].to_numpy() * f["volume"].to_numpy()
+    return adj
+
+def factor_version(factors):
+    """Short content hash of a factor series; changes whenever a split/dividend is applied."""
+    if factors is None or factors.empty:
+        return "none"
+    h = hashlib.sha1(np.ascontiguousarray(factors[["price", "volume"]].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()[:12]
+
+def factors_changed(old, new):
+    """True when the factors differ on any bar both cover (ie. a new split or dividend)."""
+    if old is None or old.empty:
+        return True
+    lo = max(old.index[0], new.index[0])
+    idx = old.index.union(new.index)
+    idx = idx[idx >= lo]
+    a = expand_factors(old, idx).to_numpy(dtype=float)
+    b = expand_factors(new, idx).to_numpy(dtype=float)
+    return not np.allclose(a, b, rtol=FACTOR_RTOL, atol=0)
@@ -1,64 +1,61 @@
 # file: app/alerts.py
-import json
-import os
-import smtplib
-from email.mime.text import MIMEText
+import time
 from app.logger import log_error, log_usage
+from app import store
 
-ALERTS_FILE = "./data/alerts.json"
 DIGEST_FILE = "./data/digest/latest.json"
 
-def save_alert(symbol, target_price, condition="above"):
+def save_alert(symbol, target_price, condition="above", user_id=store.DEFAULT_USER):
     """Saves a price alert."""
     try:
-        alerts = load_alerts()
-        alerts.append({"symbol": symbol, "price": target_price, "condition": condition, "active": True})
-        with open(ALERTS_FILE, 'w') as f:
-            json.dump(alerts, f)
-        log_usage("Alert Created", f"{symbol} {condition} {target_price}")
+        with store.transaction() as conn:
+            conn.execute("INSERT INTO alerts (user_id, symbol, price, condition, active, created) "
+                         "VALUES (?, ?, ?, ?, 1, ?)",
+                         (user_id, symbol, float(target_price), condition, time.time()))
+        log_usage(f"Alert Created: {symbol} {condition} {target_price}")
         return True
     except Exception as e:
-        log_error(e, "Save Alert")
+        log_error(e, {"action": "save_alert", "symbol": symbol})
         return False
 
-def load_alerts():
-    if not os.path.exists(ALERTS_FILE):
-        return []
-    with open(ALERTS_FILE, 'r') as f:
-        return json.load(f)
+def load_alerts(user_id=store.DEFAULT_USER, symbol=None):
+    """Alerts of a user (optionally one symbol), oldest first."""
+    sql = "SELECT symbol, price, condition, active FROM alerts WHERE user_id = ?"
+    params = [user_id]
+    if symbol is not None:
+        sql += " AND symbol = ?"
+        params.append(symbol)
+    rows = store.query(sql + " ORDER BY id", params)
+    return [{"symbol": r["symbol"], "price": r["price"], "condition": r["condition"],
+             "active": bool(r["active"])} for r in rows]
 
 def check_alerts(current_price_map):
     """
-    Checks saved alerts against current prices. 
+    Checks active alerts against current prices and disables the ones that trigger.
+    Only alerts for the priced symbols are read (active-alert index), in one transaction,
+    so an alert fires once even if two sessions check at the same time.
     current_price_map: dict {symbol: price}
     """
-    alerts = load_alerts()
+    if not current_price_map:
+        return []
     triggered = []
-    updated_alerts = []
-    
-    for alert in alerts:
-        if not alert['active']:
-            updated_alerts.append(alert)
-            continue
-            
-        sym = alert['symbol']
-        if sym in current_price_map:
+    marks = ",".join("?" * len(current_price_map))
+    with store.transaction() as conn:
+        rows = conn.execute(f"SELECT id, symbol, price, condition FROM alerts "
+                            f"WHERE active = 1 AND symbol IN ({marks}) ORDER BY id",
+                            list(current_price_map)).fetchall()
+        for alert in rows:
+            sym = alert['symbol']
             price = current_price_map[sym]
             target = alert['price']
-            
+
             hit = False
             if alert['condition'] == 'above' and price > target: hit = True
             elif alert['condition'] == 'below' and price < target: hit = True
-            
+
             if hit:
                 triggered.append(f"🚨 ALERT: {sym} is now {price} ({alert['condition']} {target})")
-                alert['active'] = False # Disable after trigger
-        
-        updated_alerts.append(alert)
-    
-    with open(ALERTS_FILE, 'w') as f:
-        json.dump(updated_alerts, f)
-        
+                conn.execute("UPDATE alerts SET active = 0 WHERE id = ?", (alert['id'],)) # Disable after trigger
     return triggered
 
 def send_email_digest(recipient_email, smtp_config, subject, body):
@@ -68,7 +65,9 @@ def send_email_digest(recipient_email, smtp_config, subject, body):
     """
     if not recipient_email or not smtp_config:
         return False, "Missing config"
-        
+
+    import smtplib
+    from email.mime.text import MIMEText
     msg = MIMEText(body)
     msg['Subject'] = subject
     msg['From'] = smtp_config['user']
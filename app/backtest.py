@@ -1,11 +1,14 @@
 # file: app/backtest.py
 import pandas as pd
-import numpy as np
+from app.equity import equity_curve, equity_metrics
 from app.logger import log_error
 
-def run_trade_backtest(df, initial_capital=100000, slippage_pct=0.001, commission_pct=0.001):
+def run_trade_backtest(df, initial_capital=100000, slippage_pct=0.001, commission_pct=0.001,
+                       curve=None, timeframe="1d"):
     """
     Event-based backtest (Vectorized preprocessing + Iterative trade log).
+    Return and risk metrics come from the bar-level equity curve (app.equity); pass a
+    precomputed `curve` for the same bars to reuse it.
     Returns: trades_df, metrics_dict
     """
     try:
@@ -69,45 +72,22 @@ def run_trade_backtest(df, initial_capital=100000, slippage_pct=0.001, commissio
             })
 
         trades_df = pd.DataFrame(trades)
+        if curve is None:
+            curve = equity_curve(df, slippage_pct, commission_pct)
+        metrics = equity_metrics(curve, timeframe)
         
         # Metrics
         if trades_df.empty:
-            return pd.DataFrame(), {
-                "total_return": 0.0, "cagr": 0.0, "win_rate": 0.0, 
-                "trades": 0, "sharpe": 0.0, "max_drawdown": 0.0
-            }
+            metrics.update({"win_rate": 0.0, "trades": 0})
+            return pd.DataFrame(), metrics
 
-        # Calculate Equity Curve for Sharpe/Drawdown
         trades_df['equity_growth'] = 1 + trades_df['pnl_pct']
-        total_ret = trades_df['equity_growth'].prod() - 1
-        
-        # Simple CAGR approximation
-        days = (df.index[-1] - df.index[0]).days
-        years = max(days / 365.25, 0.5) # avoid div by zero
-        cagr = (1 + total_ret) ** (1 / years) - 1
-        
         win_rate = len(trades_df[trades_df['is_win']]) / len(trades_df)
-        
-        # Max Drawdown (Approximate based on trade sequence equity curve)
-        cum_equity = trades_df['equity_growth'].cumprod()
-        running_max = cum_equity.cummax()
-        drawdown = (cum_equity - running_max) / running_max
-        max_dd = drawdown.min()
-        
-        # Sharpe (Using trade returns, assuming risk_free=0)
-        avg_ret = trades_df['pnl_pct'].mean()
-        std_ret = trades_df['pnl_pct'].std()
-        sharpe = (avg_ret / std_ret) * np.sqrt(len(trades_df)) if std_ret != 0 else 0
-
-        metrics = {
-            "total_return": round(total_ret * 100, 2),
-            "cagr": round(cagr * 100, 2),
+        metrics.update({
             "win_rate": round(win_rate * 100, 2),
             "trades": len(trades_df),
-            "sharpe": round(sharpe, 2),
-            "max_drawdown": round(max_dd * 100, 2),
-            "avg_pnl": round(avg_ret * 100, 2)
-        }
+            "avg_pnl": round(trades_df['pnl_pct'].mean() * 100, 2)
+        })
         
         return trades_df, metrics
 
@@ -2,46 +2,310 @@
 import os
 import time
 import pickle
+import threading
 import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from app.logger import log_usage, log_error
+from app.adjustments import apply_factors, factors_changed, factor_version
+from app.market_calendar import is_fresh
 
 CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
 
-def _cache_path(ticker: str, period: str, auto_adjust: bool) -> str:
+# Bars are stored unadjusted, with corporate-action factors in a separate small file:
+#   <ticker>_<period>_<interval>.pkl          raw OHLCV (or a derived frame)
+#   <ticker>_<period>_<interval>.factors.pkl  adjustment factor breakpoints + version
+# so adjusted and raw views share one entry, and a new split/dividend only rewrites the factors.
+
+def _cache_path(ticker: str, period: str, interval: str = "1d", kind: str = "bars") -> str:
     safe = ticker.replace("/", "_").replace(" ", "_")
-    adj = "adj" if auto_adjust else "raw"
-    fname = f"{safe}_{period}_{adj}.pkl"
+    suffix = "" if kind == "bars" else f".{kind}"
+    fname = f"{safe}_{period}_{interval}{suffix}.pkl"
     return os.path.join(CACHE_DIR, fname)
 
-def set_cache(ticker: str, period: str, df: pd.DataFrame, auto_adjust: bool = True) -> None:
-    """Write dataframe to disk cache (overwrite)."""
+# --- Tier sizing (override with configure_cache) ---
+MEMORY_BUDGET_BYTES = 256 * 1024**2
+DISK_BUDGET_BYTES = 2 * 1024**3
+DISK_MAX_AGE_SECONDS = 30 * 24 * 3600
+DISK_CHECK_INTERVAL_SECONDS = 60
+
+# get_cached ttl: expire when the exchange could have published a new bar (see market_calendar)
+MARKET_TTL = "market"
+
+_STATS = {"mem_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "mem_evictions": 0, "disk_evictions": 0}
+_stats_lock = threading.Lock()
+
+def _count(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _STATS[key] += n
+
+def _payload_nbytes(payload: dict) -> int:
+    n = 0
+    for v in payload.values():
+        if isinstance(v, (pd.DataFrame, pd.Series)):
+            n += int(v.memory_usage(deep=True).sum()) if isinstance(v, pd.DataFrame) else int(v.memory_usage(deep=True))
+    return n + 256
+
+class _MemoryLRU:
+    """In-process LRU of cache payloads with a byte budget. Entries remember the file mtime
+    they were read at, so a rewrite by another process is picked up on the next access."""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.nbytes = 0
+        self._items = OrderedDict()  # path -> (mtime, payload, nbytes)
+        self._lock = threading.Lock()
+
+    def get(self, path: str, mtime: Optional[float]) -> Optional[dict]:
+        with self._lock:
+            item = self._items.get(path)
+            if item is None:
+                return None
+            # mtime None: file evicted from disk, the in-memory copy is still good
+            if mtime is not None and item[0] != mtime:
+                self._drop(path)
+                return None
+            self._items.move_to_end(path)
+            return item[1]
+
+    def put(self, path: str, mtime: Optional[float], payload: dict) -> None:
+        nbytes = _payload_nbytes(payload)
+        with self._lock:
+            self._drop(path)
+            if nbytes > self.budget:
+                return
+            self._items[path] = (mtime, payload, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.budget:
+                old, _ = next(iter(self._items.items()))
+                self._drop(old)
+                _count("mem_evictions")
+
+    def resize(self, budget: int) -> None:
+        with self._lock:
+            self.budget = budget
+            while self.nbytes > self.budget and self._items:
+                old, _ = next(iter(self._items.items()))
+                self._drop(old)
+                _count("mem_evictions")
+
+    def discard(self, path: str) -> None:
+        with self._lock:
+            self._drop(path)
+
+    def _drop(self, path: str) -> None:
+        item = self._items.pop(path, None)
+        if item is not None:
+            self.nbytes -= item[2]
+
+    def __len__(self):
+        return len(self._items)
+
+_MEMORY = _MemoryLRU(MEMORY_BUDGET_BYTES)
+_last_disk_check = 0.0
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def _load(path: str, count: bool = True) -> Optional[dict]:
+    """
+    Payload from the memory tier, else from disk (promoted into memory).
+    Payloads are shared between callers and must not be mutated.
+    """
+    mtime = _mtime(path)
+    payload = _MEMORY.get(path, mtime)
+    if payload is not None:
+        if count: _count("mem_hits")
+        return payload
+    if mtime is None:
+        if count: _count("misses")
+        return None
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    if count: _count("disk_hits")
+    # Record the access for disk LRU; mtime stays the write time used for age eviction
+    try:
+        os.utime(path, (time.time(), mtime))
+    except OSError:
+        pass
+    _MEMORY.put(path, mtime, payload)
+    return payload
+
+def _dump(path: str, payload: dict) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f)
+    os.replace(tmp, path)
+    _MEMORY.put(path, _mtime(path), payload)
+    _maybe_enforce_disk_quota()
+
+def _entry_key(fname: str) -> str:
+    """Bars and their .factors file are one entry and are evicted together."""
+    return fname[:-len(".factors.pkl")] if fname.endswith(".factors.pkl") else fname[:-len(".pkl")]
+
+def enforce_disk_quota(budget_bytes: Optional[int] = None, max_age_seconds: Optional[int] = None) -> int:
+    """
+    Deletes entries older than max_age_seconds (by write time), then least recently
+    used entries until the cache directory fits in budget_bytes.
+    Returns: number of entries evicted.
+    """
+    budget = DISK_BUDGET_BYTES if budget_bytes is None else budget_bytes
+    max_age = DISK_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+
+    entries = {}  # key -> [paths, bytes, last_access, written]
+    for fname in os.listdir(CACHE_DIR):
+        if not fname.endswith(".pkl"):
+            continue
+        path = os.path.join(CACHE_DIR, fname)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        e = entries.setdefault(_entry_key(fname), [[], 0, 0.0, 0.0])
+        e[0].append(path)
+        e[1] += st.st_size
+        e[2] = max(e[2], st.st_atime)
+        e[3] = max(e[3], st.st_mtime)
+
+    now = time.time()
+    evict = [k for k, e in entries.items() if now - e[3] > max_age]
+    total = sum(e[1] for k, e in entries.items() if k not in evict)
+    for k, e in sorted(entries.items(), key=lambda kv: kv[1][2]):
+        if total <= budget:
+            break
+        if k not in evict:
+            evict.append(k)
+            total -= e[1]
+
+    for k in evict:
+        for path in entries[k][0]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    if evict:
+        _count("disk_evictions", len(evict))
+        log_usage(f"cache_evict:{len(evict)}")
+    return len(evict)
+
+def _maybe_enforce_disk_quota() -> None:
+    global _last_disk_check
+    now = time.time()
+    if now - _last_disk_check < DISK_CHECK_INTERVAL_SECONDS:
+        return
+    _last_disk_check = now
     try:
-        path = _cache_path(ticker, period, auto_adjust)
-        with open(path, "wb") as f:
-            pickle.dump({"ts": time.time(), "df": df}, f)
-        log_usage(f"cache_set:{ticker}:{period}")
+        enforce_disk_quota()
+    except Exception as e:
+        log_error(e, {"action": "enforce_disk_quota"})
+
+def configure_cache(memory_bytes: Optional[int] = None, disk_bytes: Optional[int] = None,
+                    max_age_seconds: Optional[int] = None) -> None:
+    """Adjust tier budgets at runtime (eg. from the CLI or a deployment config)."""
+    global DISK_BUDGET_BYTES, DISK_MAX_AGE_SECONDS
+    if memory_bytes is not None:
+        _MEMORY.resize(memory_bytes)
+    if disk_bytes is not None:
+        DISK_BUDGET_BYTES = disk_bytes
+    if max_age_seconds is not None:
+        DISK_MAX_AGE_SECONDS = max_age_seconds
+
+def cache_stats() -> dict:
+    """Hit / miss / eviction counters plus current memory tier usage."""
+    with _stats_lock:
+        stats = dict(_STATS)
+    stats["mem_entries"] = len(_MEMORY)
+    stats["mem_bytes"] = _MEMORY.nbytes
+    stats["mem_budget"] = _MEMORY.budget
+    return stats
+
+def warm_cache(tickers, period: str, interval: str = "1d", max_workers: int = 8) -> int:
+    """
+    Preloads the disk entries of a universe into the memory tier (no network).
+    Returns: number of tickers found on disk.
+    """
+    def _warm(ticker):
+        found = _load(_cache_path(ticker, period, interval)) is not None
+        _load(_cache_path(ticker, period, interval, kind="factors"), count=False)
+        return found
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return sum(pool.map(_warm, tickers))
+
+def set_cache(ticker: str, period: str, df: pd.DataFrame, interval: str = "1d",
+              factors: Optional[pd.DataFrame] = None) -> bool:
+    """
+    Write dataframe to disk cache (overwrite). With `factors`, df is raw bars and
+    the factor file is only rewritten when a corporate action changed it.
+    Returns True when the factors were rewritten.
+    """
+    try:
+        # Copy: the payload is shared through the memory tier and callers add columns to df
+        _dump(_cache_path(ticker, period, interval), {"ts": time.time(), "df": df.copy()})
+        log_usage(f"cache_set:{ticker}:{period}:{interval}")
+
+        if factors is None:
+            return False
+        fpath = _cache_path(ticker, period, interval, kind="factors")
+        old = _load(fpath, count=False)
+        if old is not None and not factors_changed(old["factors"], factors):
+            return False
+        _dump(fpath, {"ts": time.time(), "factors": factors, "version": factor_version(factors)})
+        log_usage(f"cache_factors:{ticker}:{period}:{interval}")
+        return True
     except Exception as e:
         log_error(e, {"ticker": ticker, "action": "set_cache"})
+        return False
+
+def get_adjustment_version(ticker: str, period: str, interval: str = "1d") -> Optional[str]:
+    """Version of the stored factors; anything derived from adjusted bars should key on it."""
+    try:
+        payload = _load(_cache_path(ticker, period, interval, kind="factors"), count=False)
+        return payload["version"] if payload else None
+    except Exception as e:
+        log_error(e, {"ticker": ticker, "action": "get_adjustment_version"})
+        return None
 
-def get_cached(ticker: str, period: str, auto_adjust: bool = True, ttl_seconds: int = 6*3600) -> Optional[pd.DataFrame]:
-    """Return cached dataframe if exists and not expired, else None."""
+def get_cached(ticker: str, period: str, auto_adjust: bool = True, ttl_seconds=MARKET_TTL,
+               interval: str = "1d") -> Optional[pd.DataFrame]:
+    """
+    Return cached dataframe if exists and not expired, else None. ttl_seconds is seconds,
+    MARKET_TTL (trading-calendar freshness for `interval`) or None (never expires).
+    For bars stored with factors, auto_adjust picks the adjusted or raw view, and
+    df.attrs['adj_version'] carries the factor version, df.attrs['fetched_at'] the write time.
+    """
     try:
-        path = _cache_path(ticker, period, auto_adjust)
-        if not os.path.exists(path):
+        payload = _load(_cache_path(ticker, period, interval))
+        if payload is None:
             return None
-        with open(path, "rb") as f:
-            payload = pickle.load(f)
         ts = payload.get("ts", 0)
-        if (time.time() - ts) > ttl_seconds:
-            # expired
+        if ttl_seconds == MARKET_TTL:
+            expired = not is_fresh(ts, interval)
+        else:
+            expired = ttl_seconds is not None and (time.time() - ts) > ttl_seconds
+        if expired:
+            _count("expired")
             return None
         df = payload.get("df")
-        if isinstance(df, pd.DataFrame):
-            log_usage(f"cache_hit:{ticker}:{period}")
-            return df
-        return None
+        if not isinstance(df, pd.DataFrame):
+            return None
+
+        fpayload = _load(_cache_path(ticker, period, interval, kind="factors"), count=False)
+        if fpayload is not None and auto_adjust:
+            df = apply_factors(df, fpayload["factors"])
+        else:
+            df = df.copy()
+        if fpayload is not None:
+            df.attrs["adj_version"] = fpayload["version"]
+        df.attrs["fetched_at"] = ts
+        return df
     except Exception as e:
         log_error(e, {"ticker": ticker, "action": "get_cached"})
         return None
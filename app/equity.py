@@ -0,0 +1,109 @@
+# file: app/equity.py
+import numpy as np
+import pandas as pd
+
+# Bars per year by timeframe (NSE: ~252 sessions of 09:15-15:30)
+PERIODS_PER_YEAR = {"15m": 252 * 25, "1h": 252 * 7, "1d": 252, "1wk": 52, "1mo": 12}
+
+def crossover_signals(df):
+    """Buy / sell signal arrays of the Donchian middle-band strategy (same rule as run_trade_backtest)."""
+    close, mid = df['Close'], df['Middle']
+    buy = (close > mid) & (close.shift(1) <= mid.shift(1))
+    sell = (close < mid) & (close.shift(1) >= mid.shift(1))
+    return buy.to_numpy(), sell.to_numpy()
+
+def position_mask(buy, sell):
+    """
+    1.0 on bars that end in a long position, else 0.0: entered at the close of a buy
+    bar, flat from the close of the next sell bar. Signals while already in (or out of)
+    the position are ignored, as in the trade loop.
+    """
+    events = np.full(len(buy), np.nan)
+    events[sell] = 0.0
+    events[buy] = 1.0
+    return pd.Series(events).ffill().fillna(0.0).to_numpy()
+
+def equity_curve(df, slippage_pct=0.001, commission_pct=0.001):
+    """
+    Daily (per bar) mark-to-market equity of the strategy, vectorized from a position mask.
+    Entry / exit costs are charged on the entry / exit bar, so each trade compounds to the
+    same return as the trade ledger; an open position is marked at the last close.
+    Returns: {"index", "close", "position", "returns", "equity", "drawdown"} of aligned arrays
+    """
+    buy, sell = crossover_signals(df)
+    pos = position_mask(buy, sell)
+    close = df['Close'].to_numpy(dtype=float)
+
+    held = np.zeros(len(pos))
+    held[1:] = pos[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bar_ret = np.zeros(len(close))
+        bar_ret[1:] = close[1:] / close[:-1] - 1.0
+    growth = 1.0 + np.nan_to_num(held * bar_ret)
+
+    entries = (pos == 1.0) & (held == 0.0)
+    exits = (pos == 0.0) & (held == 1.0)
+    growth[entries] /= 1 + slippage_pct + commission_pct
+    growth[exits] *= 1 - slippage_pct - commission_pct
+
+    equity = np.cumprod(growth)
+    peak = np.maximum.accumulate(equity)
+    return {
+        "index": df.index,
+        "close": close,
+        "position": pos,
+        "returns": growth - 1.0,
+        "equity": equity,
+        "drawdown": equity / peak - 1.0,
+    }
+
+def _longest_underwater(drawdown):
+    """(start, end) positions of the longest run of bars below the previous equity peak."""
+    best, start, best_span = 0, None, (0, 0)
+    for i, under in enumerate(drawdown < 0):
+        if under and start is None:
+            start = i
+        if start is not None and (not under or i == len(drawdown) - 1):
+            end = i if under else i - 1
+            if end - start + 1 > best:
+                best, best_span = end - start + 1, (start, end)
+            start = None
+    return best, best_span
+
+def equity_metrics(curve, timeframe="1d"):
+    """
+    Risk metrics of an equity curve: total return, CAGR over the actual span, annualized
+    Sharpe and Sortino of bar returns (risk-free 0), exposure, max drawdown and the longest
+    drawdown in bars and calendar days. Percentages are rounded like run_trade_backtest.
+    """
+    ret = curve["returns"]
+    equity = curve["equity"]
+    index = curve["index"]
+    if len(equity) < 2:
+        return {"total_return": 0.0, "cagr": 0.0, "sharpe": 0.0, "sortino": 0.0, "exposure": 0.0,
+                "max_drawdown": 0.0, "dd_bars": 0, "dd_days": 0}
+
+    ppy = PERIODS_PER_YEAR.get(timeframe, 252)
+    total = equity[-1] - 1.0
+    years = (index[-1] - index[0]).days / 365.25
+    cagr = equity[-1] ** (1 / years) - 1 if years > 0 and equity[-1] > 0 else 0.0
+
+    r = ret[1:]
+    std = r.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(r, 0.0) ** 2))
+    sharpe = r.mean() / std * np.sqrt(ppy) if std > 0 else 0.0
+    sortino = r.mean() / downside * np.sqrt(ppy) if downside > 0 else 0.0
+
+    dd_bars, (dd_start, dd_end) = _longest_underwater(curve["drawdown"])
+    # Underwater from the peak bar before the first negative bar
+    dd_days = (index[dd_end] - index[max(dd_start - 1, 0)]).days if dd_bars else 0
+    return {
+        "total_return": round(total * 100, 2),
+        "cagr": round(cagr * 100, 2),
+        "sharpe": round(float(sharpe), 2),
+        "sortino": round(float(sortino), 2),
+        "exposure": round(float(curve["position"].mean()) * 100, 2),
+        "max_drawdown": round(float(curve["drawdown"].min()) * 100, 2),
+        "dd_bars": int(dd_bars),
+        "dd_days": int(dd_days),
+    }
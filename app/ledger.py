@@ -0,0 +1,119 @@
+# file: app/ledger.py
+import os
+import concurrent.futures
+import numpy as np
+import pandas as pd
+from app.backtest import run_trade_backtest
+from app.scanner import indicator_bars, equity_for
+from app.universe import display_name
+from app.logger import log_error
+
+EXPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "exports")
+EXPORT_CHUNK_ROWS = 50_000
+
+LEDGER_COLS = ["Symbol", "entry_date", "entry_price", "exit_date", "exit_price",
+               "pnl_pct", "duration_days", "is_win", "status"]
+
+def backtest_ticker(ticker, timeframe="1d"):
+    """run_trade_backtest for one ticker on its (cached) indicator bars. Returns: (trades_df, metrics)"""
+    df = indicator_bars(ticker, timeframe)
+    if df is None or len(df) < 50:
+        return pd.DataFrame(), {}
+    trades, metrics = run_trade_backtest(df, curve=equity_for(ticker, df, timeframe), timeframe=timeframe)
+    if not trades.empty:
+        trades.insert(0, "Symbol", display_name(ticker))
+        if "status" not in trades.columns:
+            trades["status"] = None
+        trades["status"] = trades["status"].fillna("Closed")
+    return trades, metrics
+
+def backtest_universe(tickers, timeframe="1d", max_workers=8, progress_cb=None):
+    """
+    Backtests every ticker in parallel and aggregates the trades into one ledger.
+    progress_cb(done, total) is called as tickers finish.
+    Returns: (ledger_df, per_ticker_df, overall_metrics)
+    """
+    ledgers, rows = [], []
+    total = len(tickers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(backtest_ticker, t, timeframe): t for t in tickers}
+        for done, fut in enumerate(concurrent.futures.as_completed(futures), 1):
+            ticker = futures[fut]
+            try:
+                trades, metrics = fut.result()
+            except Exception as e:
+                log_error(e, {"ticker": ticker, "action": "backtest_universe"})
+                trades, metrics = pd.DataFrame(), {}
+            if metrics:
+                rows.append({"Symbol": display_name(ticker), **metrics})
+            if not trades.empty:
+                ledgers.append(trades[[c for c in LEDGER_COLS if c in trades.columns]])
+            if progress_cb:
+                progress_cb(done, total)
+
+    ledger = pd.concat(ledgers, ignore_index=True) if ledgers else pd.DataFrame(columns=LEDGER_COLS)
+    ledger = ledger.sort_values(["exit_date", "Symbol"], kind="mergesort").reset_index(drop=True)
+    per_ticker = pd.DataFrame(rows)
+    if not per_ticker.empty:
+        per_ticker = per_ticker.sort_values("total_return", ascending=False).reset_index(drop=True)
+    return ledger, per_ticker, ledger_metrics(ledger)
+
+def ledger_metrics(ledger):
+    """Overall trade statistics across every ticker of a ledger."""
+    if ledger.empty:
+        return {"trades": 0, "tickers": 0}
+    pnl = ledger["pnl_pct"].to_numpy(dtype=float)
+    gains = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    return {
+        "trades": int(len(pnl)),
+        "tickers": int(ledger["Symbol"].nunique()),
+        "win_rate": round(float((pnl > 0).mean()) * 100, 2),
+        "avg_pnl": round(float(pnl.mean()) * 100, 2),
+        "median_pnl": round(float(np.median(pnl)) * 100, 2),
+        "profit_factor": round(float(gains / losses), 2) if losses > 0 else None,
+        "avg_duration_days": round(float(ledger["duration_days"].mean()), 1),
+        "open_trades": int((ledger["status"] == "Open").sum()) if "status" in ledger else 0,
+    }
+
+def iter_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def export_ledger(ledger, path, fmt=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Writes a ledger (DataFrame or iterable of DataFrame chunks) to CSV or Parquet,
+    one chunk at a time, so the export is never built as one in-memory string.
+    fmt defaults to the file extension. Writes to a temp file and renames it into place.
+    Returns: path
+    """
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+    chunks = iter_chunks(ledger, chunk_rows) if isinstance(ledger, pd.DataFrame) else ledger
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pd.DataFrame(columns=LEDGER_COLS).to_parquet(tmp, index=False)
+    else:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            header = True
+            for chunk in chunks:
+                chunk.to_csv(f, index=False, header=header)
+                header = False
+            if header:
+                f.write(",".join(LEDGER_COLS) + "\n")
+    os.replace(tmp, path)
+    return path
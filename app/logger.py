@@ -4,7 +4,6 @@ import time
 import traceback
 
 LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
 ERROR_LOG = os.path.join(LOG_DIR, "error.log")
 USAGE_LOG = os.path.join(LOG_DIR, "usage.log")
 CONSENT_LOG = os.path.join(LOG_DIR, "consent.log")
@@ -12,6 +11,7 @@ CONSENT_LOG = os.path.join(LOG_DIR, "consent.log")
 def log_error(e: Exception, context: dict | None = None) -> None:
     """Append full exception traceback + context to error.log"""
     try:
+        os.makedirs(LOG_DIR, exist_ok=True)
         with open(ERROR_LOG, "a", encoding="utf-8") as f:
             f.write(f"---\nTIME: {time.asctime()}\n")
             if context:
@@ -26,6 +26,7 @@ def log_error(e: Exception, context: dict | None = None) -> None:
 def log_usage(msg: str) -> None:
     """Append a short usage / event line to usage.log"""
     try:
+        os.makedirs(LOG_DIR, exist_ok=True)
         with open(USAGE_LOG, "a", encoding="utf-8") as f:
             f.write(f"{time.asctime()}\t{msg}\n")
     except Exception:
@@ -34,6 +35,7 @@ def log_usage(msg: str) -> None:
 def log_consent(txt: str) -> None:
     """Log explicit user consent actions (eg. paywall scraping opt-in)"""
     try:
+        os.makedirs(LOG_DIR, exist_ok=True)
         with open(CONSENT_LOG, "a", encoding="utf-8") as f:
             f.write(f"{time.asctime()}\t{txt}\n")
     except Exception:
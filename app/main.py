@@ -16,34 +16,13 @@ import streamlit as st
 import pandas as pd
 import time
 import os
-import json
-
-# Import Modules
-from app.scanner import submit_scan_job, get_job_status, get_job_result, fetch_data_with_retry
-from app.indicators import add_indicators
-from app.backtest import run_trade_backtest
-from app.robustness import check_parameter_stability, bootstrap_simulation, calculate_robustness_score
-from app.ui import render_interactive_table, plot_stock_chart
-from app.explain import explain_signal
-from app.alerts import save_alert, send_email_digest
-from app.paper_trade import get_portfolio, execute_trade
-from app.logger import log_error, log_usage
+
+# App modules (and yfinance / plotly / st_aggrid behind them) are imported inside
+# the tab that needs them, so a new session only pays for what it renders.
 
 # --- CONFIG & ASSETS ---
 st.set_page_config(page_title="DC - Pro Scanner", layout="wide", initial_sidebar_state="expanded")
 
-NSE_500_LIST = [
-    'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS',
-    'SBIN.NS', 'BHARTIARTL.NS', 'ITC.NS', 'KOTAKBANK.NS', 'LT.NS',
-    'AXISBANK.NS', 'HINDUNILVR.NS', 'TATAMOTORS.NS', 'BAJFINANCE.NS', 'MARUTI.NS'
-    # ... In a real deployment, load the full list from a file or keep the original list.
-    # Truncated here for brevity in the code block, but you should paste your full list back.
-]
-
-# Ensure data dirs
-for d in ['./data/jobs', './data/cache', './data/logs', './data/digest']:
-    os.makedirs(d, exist_ok=True)
-
 # --- SIDEBAR SETTINGS ---
 with st.sidebar:
     st.header("⚙️ Configuration")
@@ -53,7 +32,17 @@ with st.sidebar:
     sma_len = st.number_input("SMA Trend Filter", value=200)
     rsi_len = st.number_input("RSI Length", value=14)
     min_vol = st.number_input("Min Volume (30D Avg)", value=0)
+    from app.timeframes import TIMEFRAMES
+    timeframe = st.selectbox("Timeframe", list(TIMEFRAMES), index=list(TIMEFRAMES).index("1d"))
     
+    st.divider()
+    st.subheader("Universe")
+    from app.universe import list_universes, load_universe, DEFAULT_UNIVERSE
+    universes = list_universes()
+    universe_name = st.selectbox("Universe", universes) if universes else None
+    scan_universe = load_universe(universe_name) if universe_name else DEFAULT_UNIVERSE
+    st.caption(f"{len(scan_universe)} symbols")
+
     st.divider()
     st.subheader("Alerts & Email")
     smtp_user = st.text_input("SMTP Email")
@@ -63,159 +52,318 @@ with st.sidebar:
     dev_mode = st.toggle("Developer Mode")
 
 # --- TABS ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["🚀 Scanner", "🔍 Deep Dive", "📊 Backtest Lab", "💼 Paper Trade", "🛠️ Dev"])
+def _open_tabs(labels):
+    """Lazy tabs: with on_change="rerun" only the selected tab's body is executed."""
+    try:
+        return st.tabs(labels, key="main_tabs", on_change="rerun")
+    except TypeError:
+        # Older Streamlit without lazy tabs: every tab renders on every run
+        return st.tabs(labels)
+
+def _is_open(tab):
+    # `.open` is None (or missing) when the active tab is not tracked
+    return getattr(tab, 'open', None) is not False
+
+tab1, tab2, tab3, tab4, tab5 = _open_tabs(["🚀 Scanner", "🔍 Deep Dive", "📊 Backtest Lab", "💼 Paper Trade", "🛠️ Dev"])
 
 # --- TAB 1: SCANNER ---
-with tab1:
-    st.header("Market Scanner")
+if _is_open(tab1):
+    with tab1:
+        from app.scanner import submit_scan_job, get_job_status, get_job_result
+        from app.scan_store import latest_scan_path, load_scan_result
+        from app.ui import render_paginated_table
+
+        st.header("Market Scanner")
+
+        # Precomputed results (python -m app.scan) load instantly instead of scanning on demand
+        latest = latest_scan_path()
+        if latest and 'scan_results' not in st.session_state and 'scan_job_id' not in st.session_state:
+            st.session_state['scan_results'] = load_scan_result(latest)
+            st.session_state['scan_source'] = latest
     
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        if st.button("RUN SCAN", type="primary"):
-            job_id = submit_scan_job(NSE_500_LIST, True, True, min_vol)
-            st.session_state['scan_job_id'] = job_id
-            st.rerun()
-
-    with col2:
-        if 'scan_job_id' in st.session_state:
-            jid = st.session_state['scan_job_id']
-            status = get_job_status(jid)
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            full_rescan = st.checkbox("Full rescan", value=False, help="Recompute tickers whose data has not changed")
+            if st.button("RUN SCAN", type="primary"):
+                job_id = submit_scan_job(scan_universe, True, True, min_vol, timeframe, force=full_rescan)
+                st.session_state['scan_job_id'] = job_id
+                st.rerun()
+            if latest and st.button("Load Latest Precomputed"):
+                st.session_state['scan_results'] = load_scan_result(latest)
+                st.session_state['scan_source'] = latest
+                st.rerun()
+
+        with col2:
+            if 'scan_job_id' in st.session_state:
+                jid = st.session_state['scan_job_id']
+                status = get_job_status(jid)
             
-            if status:
-                st.progress(status.get('progress', 0.0))
-                st.caption(f"Status: {status.get('status')}")
+                if status:
+                    st.progress(status.get('progress', 0.0))
+                    st.caption(f"Status: {status.get('status')}")
                 
-                if status.get('status') == 'completed':
-                    res = get_job_result(jid)
-                    st.session_state['scan_results'] = res
-                    del st.session_state['scan_job_id'] # Clear job
+                    if status.get('status') == 'completed':
+                        res = get_job_result(jid)
+                        st.session_state['scan_results'] = res
+                        st.session_state['scan_source'] = "live scan"
+                        del st.session_state['scan_job_id'] # Clear job
+                        st.rerun()
+                else:
+                    st.spinner("Waiting for worker...")
+                    time.sleep(2)
                     st.rerun()
-            else:
-                st.spinner("Waiting for worker...")
-                time.sleep(2)
-                st.rerun()
 
-    if 'scan_results' in st.session_state:
-        res = st.session_state['scan_results']
-        st.subheader("Buy Signals")
-        df_buy = pd.DataFrame(res['buys'])
-        
-        sel_row = render_interactive_table(df_buy, key="buy_grid")
-        if sel_row:
-            st.session_state['selected_ticker'] = sel_row['Symbol']
-            st.success(f"Selected {sel_row['Symbol']} - Go to Deep Dive")
+        if 'scan_results' in st.session_state:
+            res = st.session_state['scan_results']
+            # Build the result frames once per scan, not on every rerun
+            if st.session_state.get('scan_frames_src') is not res:
+                st.session_state['scan_frames'] = {
+                    "buys": pd.DataFrame(res['buys']),
+                    "sells": pd.DataFrame(res['sells'])
+                }
+                st.session_state['scan_frames_src'] = res
+            frames = st.session_state['scan_frames']
+            st.caption(f"Source: {st.session_state.get('scan_source', 'live scan')}")
+
+            st.subheader("Buy Signals")
+            sel_row = render_paginated_table(frames['buys'], key="buy_grid")
+            if sel_row:
+                st.session_state['selected_ticker'] = sel_row['Symbol']
+                st.success(f"Selected {sel_row['Symbol']} - Go to Deep Dive")
             
-        st.subheader("Sell Signals (Long Exit)")
-        st.dataframe(pd.DataFrame(res['sells']))
+            st.subheader("Sell Signals (Long Exit)")
+            sel_sell = render_paginated_table(frames['sells'], key="sell_grid")
+            if sel_sell:
+                st.session_state['selected_ticker'] = sel_sell['Symbol']
+
+        # Historical crossovers come from the signal index, no indicators are recomputed here
+        with st.expander("Recent Crossovers (signal index)"):
+            from app.signal_index import load_signal_index
+            r1, r2, r3, r4 = st.columns(4)
+            n_sessions = r1.slider("Last N sessions", 1, 20, 5)
+            direction = r2.selectbox("Direction", ["buy", "sell", "any"])
+            max_rsi = r3.number_input("RSI below", 0.0, 100.0, 100.0)
+            trend = r4.selectbox("Trend", ["any", "Up", "Down"])
+
+            recent = load_signal_index(timeframe).recent(
+                n_sessions,
+                direction=None if direction == "any" else direction,
+                max_rsi=None if max_rsi >= 100 else max_rsi,
+                trend=None if trend == "any" else trend
+            )
+            sel_recent = render_paginated_table(recent, key="recent_grid")
+            if sel_recent:
+                st.session_state['selected_ticker'] = sel_recent['Symbol']
+
+        # Any number of rule expressions, evaluated together in one pass over the universe
+        with st.expander("Custom Screens"):
+            from app.screener import strategy_screens, parse_screens
+            default = "\n".join(f"{k}: {v}" for k, v in strategy_screens(True, True, min_vol).items())
+            screen_text = st.text_area("One screen per line as  name: expression", value=default, height=120,
+                                       help="eg. breakout: Close > PREV(HIGHEST(High, 20)) and Volume > 2 * SMA(Volume, 20)")
+            if st.button("Run Screens"):
+                from app.scanner import run_screens
+                try:
+                    with st.spinner("Screening..."):
+                        st.session_state['screen_hits'] = run_screens(scan_universe, parse_screens(screen_text), timeframe)
+                except ValueError as e:
+                    st.error(str(e))
+            if 'screen_hits' in st.session_state:
+                sel_hit = render_paginated_table(st.session_state['screen_hits'], key="screen_grid")
+                if sel_hit:
+                    st.session_state['selected_ticker'] = sel_hit['Symbol']
 
 # --- TAB 2: DEEP DIVE ---
-with tab2:
-    ticker = st.text_input("Symbol", value=st.session_state.get('selected_ticker', 'RELIANCE'))
-    if ticker:
-        ticker = ticker if ticker.endswith('.NS') else ticker + '.NS'
-        df = fetch_data_with_retry(ticker)
+if _is_open(tab2):
+    with tab2:
+        from app.scanner import indicator_bars, robustness_for, equity_for
+        from app.ui import plot_stock_chart
+        from app.explain import explain_signal
+        from app.alerts import save_alert
+        from app.paper_trade import execute_trade
+
+        ticker = st.text_input("Symbol", value=st.session_state.get('selected_ticker', 'RELIANCE'))
+        if ticker:
+            ticker = ticker if ticker.endswith('.NS') else ticker + '.NS'
+            df = indicator_bars(ticker, timeframe)
         
-        if df is not None:
-            df = add_indicators(df)
+            if df is not None:
+                # Layout
+                c1, c2 = st.columns([3, 1])
+                with c1:
+                    plot_stock_chart(df, f"{ticker} ({timeframe})")
             
-            # Layout
-            c1, c2 = st.columns([3, 1])
-            with c1:
-                plot_stock_chart(df, ticker)
-            
-            with c2:
-                # Signal Explanation
-                curr = df.iloc[-1]
-                prev = df.iloc[-2]
-                explanation = explain_signal(ticker, curr, prev)
-                st.info(f"💡 **Analysis:**\n{explanation}")
+                with c2:
+                    # Signal Explanation
+                    curr = df.iloc[-1]
+                    prev = df.iloc[-2]
+                    explanation = explain_signal(ticker, curr, prev)
+                    st.info(f"💡 **Analysis:**\n{explanation}")
                 
-                # Robustness Score
-                trades, metrics = run_trade_backtest(df)
-                stab = check_parameter_stability(df)
-                score = calculate_robustness_score(metrics, stab, True)
-                st.metric("Robustness Score", f"{score}/100")
+                    # Robustness Score (memoized on the bars, so reruns don't repeat the backtests)
+                    report = robustness_for(ticker, df, timeframe)
+                    metrics = report["metrics"]
+                    st.metric("Robustness Score", f"{report['score']}/100")
                 
-                # Actions
-                if st.button("Add to Watchlist"):
-                    save_alert(ticker, curr['Close'], "below") # Default logic
-                    st.toast("Added to watchlist")
+                    # Actions
+                    if st.button("Add to Watchlist"):
+                        save_alert(ticker, curr['Close'], "below") # Default logic
+                        st.toast("Added to watchlist")
                     
-                if st.button("Paper Buy 100 Qty"):
-                    ok, msg = execute_trade("BUY", ticker, curr['Close'], 100)
-                    if ok: st.toast(msg)
-                    else: st.error(msg)
-
-            # Metrics
-            m1, m2, m3, m4 = st.columns(4)
-            m1.metric("CAGR", f"{metrics.get('cagr')}%")
-            m2.metric("Win Rate", f"{metrics.get('win_rate')}%")
-            m3.metric("Max DD", f"{metrics.get('max_drawdown')}%")
-            m4.metric("Total Trades", metrics.get('trades'))
+                    if st.button("Paper Buy 100 Qty"):
+                        ok, msg = execute_trade("BUY", ticker, curr['Close'], 100)
+                        if ok: st.toast(msg)
+                        else: st.error(msg)
+
+                # Metrics
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("CAGR", f"{metrics.get('cagr')}%")
+                m2.metric("Win Rate", f"{metrics.get('win_rate')}%")
+                m3.metric("Max DD", f"{metrics.get('max_drawdown')}%")
+                m4.metric("Total Trades", metrics.get('trades'))
+                m5, m6, m7, m8 = st.columns(4)
+                m5.metric("Sharpe", metrics.get('sharpe'))
+                m6.metric("Sortino", metrics.get('sortino'))
+                m7.metric("Exposure", f"{metrics.get('exposure')}%")
+                m8.metric("Longest DD", f"{metrics.get('dd_days')} days")
+
+                # Same arrays the robustness score was computed from (memoized, not recomputed)
+                curve = equity_for(ticker, df, timeframe)
+                st.line_chart(pd.DataFrame({"Equity": curve["equity"]}, index=curve["index"]))
+
+                # Read from the ingested news index (no network call per symbol)
+                with st.expander("News"):
+                    from app.news import fetch_news, ingest_news
+                    if st.button("Refresh News"):
+                        with st.spinner("Fetching feeds..."):
+                            stats = ingest_news(scan_universe)
+                        st.caption(f"{stats['new']} new articles from {stats['feeds']} feeds")
+                    articles = fetch_news(ticker)
+                    if not articles:
+                        st.caption("No indexed news for this symbol.")
+                    for a in articles:
+                        st.markdown(f"- [{a['title']}]({a['link']}) · {a['source']} · {a['published'][:10]}")
 
 # --- TAB 3: BACKTEST LAB ---
-with tab3:
-    st.header("Advanced Backtest")
-    
-    if 'scan_results' in st.session_state:
-        st.write("Full ledger for last scan available.")
-        # Logic to aggregate all trades from the scan would go here
-        # For now, we show single stock deep backtest
+if _is_open(tab3):
+    with tab3:
+        from app.scanner import indicator_bars, equity_for
+        from app.backtest import run_trade_backtest
+        from app.robustness import bootstrap_simulation
+        from app.ui import render_paginated_table
+
+        st.header("Advanced Backtest")
     
-    bt_ticker = st.text_input("Backtest Symbol", "TCS")
-    if st.button("Run Simulation"):
-        df_bt = fetch_data_with_retry(bt_ticker + ".NS")
-        if df_bt is not None:
-            df_bt = add_indicators(df_bt)
-            trades, met = run_trade_backtest(df_bt)
-            
-            st.dataframe(trades)
-            
+        if 'scan_results' in st.session_state:
+            # Every ticker the last scan evaluated, backtested in parallel into one ledger
+            with st.expander("Universe Ledger (last scan)"):
+                from app.ledger import backtest_universe, export_ledger, EXPORTS_DIR
+                snaps = pd.DataFrame(st.session_state['scan_results'].get('snapshots', []))
+                # Provider tickers as scanned; display names drop the ".NS" / "=F" suffixes
+                tickers = snaps['Ticker'].dropna().tolist() if 'Ticker' in snaps else []
+                st.caption(f"{len(tickers)} tickers in the last scan")
+                if tickers and st.button("Backtest All"):
+                    bar = st.progress(0.0)
+                    st.session_state['universe_ledger'] = backtest_universe(
+                        tickers, timeframe, progress_cb=lambda done, total: bar.progress(done / total)
+                    )
+                if 'universe_ledger' in st.session_state:
+                    ledger, per_ticker, overall = st.session_state['universe_ledger']
+                    st.json(overall)
+                    st.subheader("Per Ticker")
+                    render_paginated_table(per_ticker, key="bt_per_ticker", selectable=False)
+                    st.subheader("All Trades")
+                    render_paginated_table(ledger, key="bt_universe_ledger", selectable=False)
+
+                    fmt = st.radio("Export format", ["csv", "parquet"], horizontal=True)
+                    if st.button("Prepare Export"):
+                        # Written to disk in chunks, so the CSV / Parquet isn't built in memory next to the
+                        # ledger (which the tables above already hold). Streamlit can't stream downloads:
+                        # the file is read into memory when the button is clicked, not on every rerun.
+                        # For very large ledgers call export_ledger from a script instead.
+                        st.session_state['ledger_export'] = export_ledger(
+                            ledger, os.path.join(EXPORTS_DIR, f"ledger.{fmt}"), fmt)
+                    path = st.session_state.get('ledger_export')
+                    if path and os.path.exists(path):
+                        def _read_export(path=path):
+                            with open(path, "rb") as f:
+                                return f.read()
+                        st.download_button("Download Ledger", _read_export, os.path.basename(path),
+                                           "text/csv" if path.endswith(".csv") else "application/octet-stream")
+
+        bt_ticker = st.text_input("Backtest Symbol", "TCS")
+        if st.button("Run Simulation"):
+            df_bt = indicator_bars(bt_ticker + ".NS", timeframe)
+            if df_bt is not None:
+                curve = equity_for(bt_ticker + ".NS", df_bt, timeframe)
+                trades, met = run_trade_backtest(df_bt, curve=curve, timeframe=timeframe)
+                # Keep the result so paging the ledger (a rerun) doesn't drop it
+                st.session_state['bt_trades'] = trades
+                st.session_state['bt_curve'] = (curve, met)
+
+        if 'bt_curve' in st.session_state:
+            curve, met = st.session_state['bt_curve']
+            st.json(met)
+            st.line_chart(pd.DataFrame({"Equity": curve["equity"], "Drawdown": curve["drawdown"] + 1}, index=curve["index"]))
+
+        if 'bt_trades' in st.session_state:
+            trades = st.session_state['bt_trades']
+            render_paginated_table(trades, key="bt_ledger", selectable=False)
+        
             # Bootstrap
             stats, sims = bootstrap_simulation(trades)
             if stats:
                 st.write("Bootstrap (500 runs) Final Equity Distribution:")
                 st.bar_chart(sims[:100]) # simple vis
                 st.json(stats)
-            
+        
             csv = trades.to_csv(index=False).encode('utf-8')
             st.download_button("Download Trade CSV", csv, "trades.csv", "text/csv")
 
 # --- TAB 4: PAPER TRADE ---
-with tab4:
-    st.header("Paper Trading Portfolio")
-    pf = get_portfolio()
+if _is_open(tab4):
+    with tab4:
+        from app.paper_trade import get_portfolio, execute_trade
+
+        st.header("Paper Trading Portfolio")
+        pf = get_portfolio()
     
-    st.metric("Cash Balance", f"₹{pf['cash']:,.2f}")
+        st.metric("Cash Balance", f"₹{pf['cash']:,.2f}")
     
-    if pf['positions']:
-        st.subheader("Open Positions")
-        st.dataframe(pd.DataFrame(pf['positions']))
+        if pf['positions']:
+            st.subheader("Open Positions")
+            st.dataframe(pd.DataFrame(pf['positions']))
         
-        # Close position UI
-        st.divider()
-        c_sym = st.selectbox("Select to Close", [p['symbol'] for p in pf['positions']])
-        if st.button("Close Position"):
-            # Find price
-            df_c = fetch_data_with_retry(c_sym)
-            curr_p = df_c['Close'].iloc[-1]
-            ok, msg = execute_trade("SELL", c_sym, curr_p, 0) # Qty handled in function
-            st.rerun()
+            # Close position UI
+            st.divider()
+            c_sym = st.selectbox("Select to Close", [p['symbol'] for p in pf['positions']])
+            if st.button("Close Position"):
+                from app.scanner import fetch_bars
+                # Find price
+                df_c = fetch_bars(c_sym)
+                curr_p = df_c['Close'].iloc[-1]
+                ok, msg = execute_trade("SELL", c_sym, curr_p, 0) # Qty handled in function
+                st.rerun()
             
-    st.subheader("Trade History")
-    st.write(pf['history'])
+        st.subheader("Trade History")
+        st.write(pf['history'])
 
 # --- TAB 5: DEV ---
-with tab5:
-    if dev_mode:
-        st.subheader("Logs")
-        if os.path.exists('./data/logs/error.log'):
-            with open('./data/logs/error.log', 'r') as f:
-                st.text(f.read())
+if _is_open(tab5):
+    with tab5:
+        if dev_mode:
+            st.subheader("Logs")
+            if os.path.exists('./data/logs/error.log'):
+                with open('./data/logs/error.log', 'r') as f:
+                    st.text(f.read())
         
-        st.subheader("Active Jobs")
-        # List files in jobs dir
-        jobs = os.listdir('./data/jobs')
-        st.write(jobs)
-    else:
-        st.warning("Enable Developer Mode in Sidebar to view logs.")
+            st.subheader("Price Cache")
+            from app.cache import cache_stats
+            st.json(cache_stats())
+
+            st.subheader("Active Jobs")
+            # List files in jobs dir
+            jobs = os.listdir('./data/jobs') if os.path.isdir('./data/jobs') else []
+            st.write(jobs)
+        else:
+            st.warning("Enable Developer Mode in Sidebar to view logs.")
@@ -0,0 +1,139 @@
+# file: app/market_calendar.py
+import os
+import json
+import time
+import datetime as dt
+from zoneinfo import ZoneInfo
+from app.logger import log_usage
+
+CALENDAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "calendar", "nse.json")
+
+# data/calendar/nse.json lists exchange holidays and special sessions (Muhurat trading,
+# Saturday sessions). Add each year's circular there; a missing holiday only costs a refetch.
+DEFAULT_CALENDAR = {"timezone": "Asia/Kolkata", "session": ["09:15", "15:30"], "holidays": [], "special_sessions": {}}
+
+# Provider lag after the close before the final daily bar is reliably published
+PUBLISH_DELAY = dt.timedelta(minutes=30)
+# How often a live (partial) daily bar is worth refreshing during a session
+LIVE_REFRESH = dt.timedelta(minutes=15)
+INTRADAY_STEPS = {"15m": dt.timedelta(minutes=15), "1h": dt.timedelta(hours=1)}
+# Flat TTL used past the last year the calendar file lists (its holidays are unknown there)
+FALLBACK_TTL = dt.timedelta(hours=6)
+
+def _hm(s):
+    h, m = s.split(":")
+    return dt.time(int(h), int(m))
+
+class MarketCalendar:
+    """NSE trading sessions in exchange time: regular weekdays minus holidays, plus special sessions."""
+
+    def __init__(self, spec=None):
+        spec = spec or DEFAULT_CALENDAR
+        self.tz = ZoneInfo(spec.get("timezone", "Asia/Kolkata"))
+        self.session = tuple(_hm(s) for s in spec.get("session", DEFAULT_CALENDAR["session"]))
+        self.holidays = {dt.date.fromisoformat(d) for d in spec.get("holidays", [])}
+        self.special = {
+            dt.date.fromisoformat(d): [(_hm(a), _hm(b)) for a, b in windows]
+            for d, windows in spec.get("special_sessions", {}).items()
+        }
+        # Last year with listed holidays / special sessions; None for a weekdays-only calendar
+        self.last_year = max((d.year for d in self.holidays | set(self.special)), default=None)
+        self._warned = False
+
+    def covers(self, day):
+        """False for dates past the last year the calendar file lists."""
+        return self.last_year is None or day.year <= self.last_year
+
+    def sessions_on(self, day):
+        """[(open, close)] tz-aware datetimes for a date; empty on weekends and holidays."""
+        if day in self.special:
+            windows = self.special[day]
+        elif day.weekday() >= 5 or day in self.holidays:
+            windows = []
+        else:
+            windows = [self.session]
+        return [(dt.datetime.combine(day, a, self.tz), dt.datetime.combine(day, b, self.tz)) for a, b in windows]
+
+    def is_trading_day(self, day):
+        return bool(self.sessions_on(day))
+
+    def _now(self, now):
+        if now is None:
+            now = time.time()
+        if isinstance(now, (int, float)):
+            return dt.datetime.fromtimestamp(now, self.tz)
+        return now.astimezone(self.tz) if now.tzinfo else now.replace(tzinfo=self.tz)
+
+    def next_publish(self, fetched_at, interval="1d"):
+        """
+        Earliest time after `fetched_at` (epoch seconds) at which the provider could
+        have a new or updated bar for `interval`:
+          - in a session: the next bar boundary (intraday) or LIVE_REFRESH (daily), capped at the close
+          - between the close and close + PUBLISH_DELAY: close + PUBLISH_DELAY (final bar)
+          - otherwise: the next session open
+        Returns: tz-aware datetime
+        """
+        t = self._now(fetched_at)
+        day = t.date()
+        for _ in range(60):
+            for open_, close in self.sessions_on(day):
+                if t < open_:
+                    return open_
+                if t < close:
+                    step = INTRADAY_STEPS.get(interval)
+                    if step is None:
+                        return min(t + LIVE_REFRESH, close)
+                    n = (t - open_) // step + 1
+                    return min(open_ + n * step, close)
+                if t < close + PUBLISH_DELAY:
+                    return close + PUBLISH_DELAY
+            day += dt.timedelta(days=1)
+        # Calendar gap (eg. a long closure): let the caller refetch once a day
+        return t + dt.timedelta(days=1)
+
+    def is_fresh(self, fetched_at, interval="1d", now=None):
+        """
+        True when no new bar could have been published since `fetched_at`. Past the years
+        the calendar covers, falls back to FALLBACK_TTL (and logs it once) rather than
+        treating that year's holidays as sessions.
+        """
+        t = self._now(now)
+        if not self.covers(t.date()):
+            if not self._warned:
+                self._warned = True
+                log_usage(f"calendar_stale: no NSE holidays after {self.last_year}, using a "
+                          f"{FALLBACK_TTL} TTL; add {t.year} to data/calendar/nse.json")
+            return t - self._now(fetched_at) < FALLBACK_TTL
+        return t < self.next_publish(fetched_at, interval)
+
+    def sessions_back(self, day, n):
+        """Date of the n-th trading day counting back from `day` (inclusive, n=1 -> latest trading day)."""
+        day = day.date() if isinstance(day, dt.datetime) else day
+        found = 0
+        for _ in range(n * 3 + 30):
+            if self.is_trading_day(day):
+                found += 1
+                if found >= n:
+                    return day
+            day -= dt.timedelta(days=1)
+        return day
+
+_LOADED = {}
+
+def load_calendar(path=CALENDAR_PATH):
+    """MarketCalendar from a JSON file, re-read only when the file changes. Weekdays-only if missing."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return MarketCalendar()
+    cached = _LOADED.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        cal = MarketCalendar(json.load(f))
+    _LOADED[path] = (mtime, cal)
+    return cal
+
+def is_fresh(fetched_at, interval="1d", now=None):
+    """Cache freshness by the NSE calendar instead of a flat TTL."""
+    return load_calendar().is_fresh(fetched_at, interval, now)
@@ -1,37 +1,343 @@
 # file: app/news.py
+"""
+News ingestion, eg. from cron every 15 minutes:
+
+    python -m app.news --universe nse500
+
+Fetches every feed in RSS_FEEDS concurrently with conditional GETs (ETag /
+Last-Modified, last bodies kept in data/news/feeds), dedups items by normalized
+URL and indexes them by the symbols / company names they mention
+(data/news/index.json). fetch_news() is a lookup in that index, no network.
+"""
 import os
-import requests
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import concurrent.futures
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from app.logger import log_consent, log_error
+from app.throttle import file_lock
+from app.universe import display_name, load_universe, DEFAULT_UNIVERSE
+from app import store
+
+NEWS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "news")
+FEED_WORKERS = 8
+FEED_TIMEOUT = 10
+MAX_ARTICLES = 5000
+USER_AGENT = "Mozilla/5.0 (compatible; nse-scanner news ingest)"
 
-# Simple heuristic for news
 RSS_FEEDS = {
-    "General": "https://finance.yahoo.com/news/rssindex",
-    # Add more robust free RSS feeds here
+    "Yahoo Finance": "https://finance.yahoo.com/news/rssindex",
+    "Economic Times": "https://economictimes.indiatimes.com/markets/rssfeeds/1977021501.cms",
+    "Moneycontrol": "https://www.moneycontrol.com/rss/latestnews.xml",
+    "Livemint": "https://www.livemint.com/rss/markets",
 }
 
-def check_consent():
-    """Checks if consent file contains 'accepted'."""
-    if not os.path.exists('./data/logs/consent.log'):
-        return False
-    with open('./data/logs/consent.log', 'r') as f:
-        return "Consent: accepted" in f.read()
-
-def fetch_news(ticker):
-    """
-    Fetches news. Returns list of dicts {title, link, sentiment}.
-    Uses free RSS if possible.
-    """
-    # Note: Real news scraping needs 'feedparser' or 'BeautifulSoup'. 
-    # Since we can't introduce new complex dependencies easily without pip install,
-    # we simulate or assume feedparser is available or use a basic request.
-    
-    # Mock return for the prompt scope to avoid complex scraping code bloat
-    # In production, use `feedparser.parse(url)`
-    return [
-        {"title": f"Market analysis for {ticker}", "link": "#", "source": "Aggregator"},
-        {"title": f"{ticker} sees volume spike", "link": "#", "source": "Exchange"}
-    ]
+# Matched case-insensitively, besides the upper-case symbol itself
+COMPANY_NAMES = {
+    'RELIANCE.NS': ["Reliance Industries", "Reliance"],
+    'TCS.NS': ["Tata Consultancy Services", "Tata Consultancy"],
+    'HDFCBANK.NS': ["HDFC Bank"],
+    'INFY.NS': ["Infosys"],
+    'ICICIBANK.NS': ["ICICI Bank"],
+    'SBIN.NS': ["State Bank of India", "SBI"],
+    'BHARTIARTL.NS': ["Bharti Airtel", "Airtel"],
+    'KOTAKBANK.NS': ["Kotak Mahindra Bank", "Kotak Bank"],
+    'LT.NS': ["Larsen & Toubro", "Larsen and Toubro", "L&T"],
+    'AXISBANK.NS': ["Axis Bank"],
+    'HINDUNILVR.NS': ["Hindustan Unilever", "HUL"],
+    'TATAMOTORS.NS': ["Tata Motors"],
+    'BAJFINANCE.NS': ["Bajaj Finance"],
+    'MARUTI.NS': ["Maruti Suzuki", "Maruti"],
+}
+
+# Query parameters that don't change which article a URL points to
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "cmpid", "ncid", "from", "source"}
+_TOKEN = re.compile(r"[A-Za-z0-9&]+")
+
+def check_consent(user_id=None):
+    """True if the user (or, without user_id, anyone) has accepted. One indexed lookup."""
+    if user_id is None:
+        rows = store.query("SELECT 1 FROM consent WHERE accepted = 1 LIMIT 1")
+    else:
+        rows = store.query("SELECT 1 FROM consent WHERE user_id = ? AND accepted = 1", (user_id,))
+    return bool(rows)
 
 def record_consent(user_id):
-    with open('./data/logs/consent.log', 'a') as f:
-        f.write(f"User: {user_id} | Consent: accepted\n")
+    with store.transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO consent (user_id, accepted, ts) VALUES (?, 1, ?)",
+                     (str(user_id), time.time()))
+    # Append-only audit trail; check_consent reads the store
+    log_consent(f"User: {user_id} | Consent: accepted")
+
+def normalize_url(url):
+    """Canonical article URL: https, lower-case host without www, no fragment / tracking params / trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS)
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme
+    return urlunsplit((scheme, host, parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+def url_key(url):
+    return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()[:16]
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def _child_text(el, *names):
+    for child in el:
+        if _local(child.tag) in names and (child.text or "").strip():
+            return child.text.strip()
+    return ""
+
+def _parse_date(text):
+    """RSS (RFC 822) or Atom (ISO 8601) date -> UTC datetime, or None."""
+    if not text:
+        return None
+    try:
+        d = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        try:
+            d = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return d.astimezone(timezone.utc) if d.tzinfo else d.replace(tzinfo=timezone.utc)
+
+def parse_feed(body):
+    """RSS 2.0 / Atom body -> [{title, link, published, summary}]. Items without a link are skipped."""
+    items = []
+    for el in ET.fromstring(body).iter():
+        if _local(el.tag) not in ("item", "entry"):
+            continue
+        link = _child_text(el, "link")
+        if not link:
+            # Atom: <link rel="alternate" href="..."/>
+            for child in el:
+                if _local(child.tag) == "link" and child.get("rel", "alternate") == "alternate" and child.get("href"):
+                    link = child.get("href")
+                    break
+        if not link:
+            continue
+        published = _parse_date(_child_text(el, "pubDate", "published", "updated", "date"))
+        items.append({
+            "title": _child_text(el, "title"),
+            "link": link.strip(),
+            "published": published.isoformat() if published else None,
+            "summary": re.sub(r"<[^>]+>", " ", _child_text(el, "description", "summary"))[:500],
+        })
+    return items
+
+def fetch_feed(name, url, root=NEWS_DIR, timeout=FEED_TIMEOUT):
+    """
+    Conditional GET of one feed. The last body and its ETag / Last-Modified are kept in
+    <root>/feeds, so an unchanged feed costs a 304 and a failing one serves its last copy.
+    Returns: (items, status) with status "fetched", "not_modified", "stale" or "failed"
+    """
+    feed_dir = os.path.join(root, "feeds")
+    base = os.path.join(feed_dir, hashlib.sha1(url.encode("utf-8")).hexdigest()[:16])
+    meta = {}
+    if os.path.exists(base + ".json"):
+        with open(base + ".json", "r") as f:
+            meta = json.load(f)
+
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    if meta.get("etag"):
+        req.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        req.add_header("If-Modified-Since", meta["last_modified"])
+
+    status = "fetched"
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            headers = resp.headers
+        # Parse before saving: a malformed body must not replace the last good copy or its
+        # ETag, or every later request gets a 304 and reparses the same bad body
+        items = parse_feed(body)
+        os.makedirs(feed_dir, exist_ok=True)
+        tmp = f"{base}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, base + ".xml")
+        with open(tmp, "w") as f:
+            json.dump({"name": name, "url": url, "etag": headers.get("ETag"),
+                       "last_modified": headers.get("Last-Modified"), "fetched_at": time.time()}, f)
+        os.replace(tmp, base + ".json")
+    except urllib.error.HTTPError as e:
+        status = "not_modified" if e.code == 304 else "stale"
+        if e.code != 304:
+            log_error(e, {"feed": name, "url": url, "status": e.code})
+    except Exception as e:
+        log_error(e, {"feed": name, "url": url})
+        status = "stale"
+
+    if status == "fetched":
+        return items, status
+    if not os.path.exists(base + ".xml"):
+        return [], "failed"
+    with open(base + ".xml", "rb") as f:
+        body = f.read()
+    try:
+        return parse_feed(body), status
+    except ET.ParseError as e:
+        log_error(e, {"feed": name, "url": url})
+        return [], "failed"
+
+def build_aliases(tickers, names=COMPANY_NAMES):
+    """
+    Lookup tables for match_tickers: {"symbols": {"RELIANCE": ticker}, "names": {lower-case
+    token tuple: ticker}}. Symbols must appear in upper case ("ITC", not "itc"), names in any case.
+    """
+    symbols, phrases = {}, {}
+    for t in tickers:
+        symbols[display_name(t)] = t
+        for name in names.get(t, []):
+            phrases[tuple(w.lower() for w in _TOKEN.findall(name))] = t
+    return {"symbols": symbols, "names": phrases}
+
+def match_tickers(text, aliases):
+    """Tickers mentioned in text: each word, and each window up to the longest name, is one dict lookup."""
+    symbols, phrases = aliases["symbols"], aliases["names"]
+    words = _TOKEN.findall(text)
+    lower = [w.lower() for w in words]
+    longest = max((len(k) for k in phrases), default=0)
+    found = set()
+    for i in range(len(words)):
+        if words[i] in symbols:
+            found.add(symbols[words[i]])
+        for n in range(1, min(longest, len(words) - i) + 1):
+            t = phrases.get(tuple(lower[i:i + n]))
+            if t:
+                found.add(t)
+    return sorted(found)
+
+class NewsIndex:
+    """
+    Deduped articles (keyed by normalized-URL hash) plus an inverted index
+    ticker -> article keys, newest first, so a ticker's news is one dict lookup.
+    """
+
+    def __init__(self, root=NEWS_DIR):
+        self.path = os.path.join(root, "index.json")
+        self.articles = {}
+        self.by_ticker = {}
+        self.updated_at = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.articles = data.get("articles", {})
+            self.by_ticker = data.get("by_ticker", {})
+            self.updated_at = data.get("updated_at")
+        return self
+
+    def add(self, item, source, aliases):
+        """Adds one feed item. Returns False if its URL is already indexed."""
+        key = url_key(item["link"])
+        if key in self.articles:
+            return False
+        self.articles[key] = {
+            "title": item["title"],
+            "link": item["link"],
+            "source": source,
+            "published": item["published"] or datetime.now(timezone.utc).isoformat(),
+            "tickers": match_tickers(f"{item['title']} {item['summary']}", aliases),
+        }
+        return True
+
+    def rebuild(self, max_articles=MAX_ARTICLES):
+        """Keeps the newest max_articles and rebuilds the ticker index from them."""
+        newest = sorted(self.articles.items(), key=lambda kv: kv[1]["published"], reverse=True)[:max_articles]
+        self.articles = dict(newest)
+        self.by_ticker = {}
+        for key, a in newest:
+            for t in a["tickers"]:
+                self.by_ticker.setdefault(t, []).append(key)
+
+    def lookup(self, ticker, limit=20):
+        return [self.articles[k] for k in self.by_ticker.get(ticker, [])[:limit]]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.updated_at = time.time()
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": self.updated_at, "articles": self.articles, "by_ticker": self.by_ticker}, f)
+        os.replace(tmp, self.path)
+
+def ingest_news(tickers=DEFAULT_UNIVERSE, feeds=None, root=NEWS_DIR, max_workers=FEED_WORKERS):
+    """
+    Fetches all feeds concurrently and merges their items into the news index.
+    Returns: {"feeds", "fetched", "not_modified", "stale", "failed", "new", "articles"}
+    """
+    feeds = RSS_FEEDS if feeds is None else feeds
+    aliases = build_aliases(tickers)
+    stats = {"feeds": len(feeds), "fetched": 0, "not_modified": 0, "stale": 0, "failed": 0, "new": 0}
+
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_feed, name, url, root): name for name, url in feeds.items()}
+        for fut in concurrent.futures.as_completed(futures):
+            items, status = fut.result()
+            stats[status] += 1
+            results[futures[fut]] = items
+
+    # Merge under a lock so concurrent ingests (UI + cron) don't drop each other's articles
+    with file_lock("news_index", lock_dir=os.path.join(root, ".locks")):
+        index = NewsIndex(root).load()
+        for name in feeds:
+            for item in results[name]:
+                stats["new"] += index.add(item, name, aliases)
+        index.rebuild()
+        index.save()
+    _LOADED.pop(index.path, None)
+    stats["articles"] = len(index.articles)
+    return stats
+
+_LOADED = {}
+
+def load_news_index(root=NEWS_DIR):
+    """NewsIndex from disk, re-read only when the file changes."""
+    path = os.path.join(root, "index.json")
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return NewsIndex(root)
+    cached = _LOADED.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    index = NewsIndex(root).load()
+    _LOADED[path] = (mtime, index)
+    return index
+
+def fetch_news(ticker, limit=20, root=NEWS_DIR):
+    """
+    Indexed news for a ticker, newest first (run ingest_news / python -m app.news to refresh).
+    Returns list of dicts {title, link, source, published}.
+    """
+    return [{k: a[k] for k in ("title", "link", "source", "published")}
+            for a in load_news_index(root).lookup(ticker, limit)]
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.news", description="Fetch the news feeds and update the news index.")
+    p.add_argument("--universe", help="Universe name in data/universes (eg. nse500) or a file path")
+    args = p.parse_args(argv)
+    tickers = load_universe(args.universe) if args.universe else DEFAULT_UNIVERSE
+    stats = ingest_news(tickers)
+    print(", ".join(f"{k}: {v}" for k, v in stats.items()))
+    return 0 if stats["failed"] < stats["feeds"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
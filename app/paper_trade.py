@@ -1,61 +1,70 @@
 # file: app/paper_trade.py
-import json
-import os
+import time
 from datetime import datetime
 from app.logger import log_error
+from app import store
 
-PORTFOLIO_FILE = "./data/paper_portfolio.json"
+STARTING_CASH = 100000
 
-def get_portfolio():
-    if not os.path.exists(PORTFOLIO_FILE):
-        # Initialize default
-        init_state = {"cash": 100000, "positions": [], "history": []}
-        with open(PORTFOLIO_FILE, 'w') as f:
-            json.dump(init_state, f)
-        return init_state
-    
-    with open(PORTFOLIO_FILE, 'r') as f:
-        return json.load(f)
+def _ensure_portfolio(conn, user_id):
+    conn.execute("INSERT OR IGNORE INTO portfolios (user_id, cash) VALUES (?, ?)", (user_id, STARTING_CASH))
 
-def save_portfolio(data):
-    with open(PORTFOLIO_FILE, 'w') as f:
-        json.dump(data, f)
+def get_portfolio(user_id=store.DEFAULT_USER):
+    """Returns: {"cash", "positions": [{symbol, avg_price, qty, date}], "history": [str]}"""
+    rows = store.query("SELECT cash FROM portfolios WHERE user_id = ?", (user_id,))
+    if not rows:
+        with store.transaction() as conn:
+            _ensure_portfolio(conn, user_id)
+        rows = store.query("SELECT cash FROM portfolios WHERE user_id = ?", (user_id,))
+    positions = store.query("SELECT symbol, avg_price, qty, date FROM positions "
+                            "WHERE user_id = ? ORDER BY id", (user_id,))
+    history = store.query("SELECT entry FROM trade_history WHERE user_id = ? ORDER BY id", (user_id,))
+    return {
+        "cash": rows[0]["cash"],
+        "positions": [dict(p) for p in positions],
+        "history": [h["entry"] for h in history],
+    }
 
-def execute_trade(action, symbol, price, qty, date=None):
+def execute_trade(action, symbol, price, qty, date=None, user_id=store.DEFAULT_USER):
     """
-    Simulates Buy/Sell.
+    Simulates Buy/Sell. The cash check and the update run in one write transaction,
+    so concurrent sessions can't spend the same cash twice.
     """
-    pf = get_portfolio()
     date = date or datetime.now().strftime("%Y-%m-%d")
-    
+
     try:
         cost = price * qty
-        
-        if action == "BUY":
-            if pf['cash'] >= cost:
-                pf['cash'] -= cost
-                pf['positions'].append({"symbol": symbol, "avg_price": price, "qty": qty, "date": date})
-                pf['history'].append(f"BOUGHT {qty} {symbol} @ {price} on {date}")
-                save_portfolio(pf)
-                return True, "Trade Executed"
+        with store.transaction() as conn:
+            _ensure_portfolio(conn, user_id)
+            cash = conn.execute("SELECT cash FROM portfolios WHERE user_id = ?", (user_id,)).fetchone()["cash"]
+
+            if action == "BUY":
+                if cash < cost:
+                    return False, "Insufficient Cash"
+                conn.execute("UPDATE portfolios SET cash = cash - ? WHERE user_id = ?", (cost, user_id))
+                conn.execute("INSERT INTO positions (user_id, symbol, avg_price, qty, date) VALUES (?, ?, ?, ?, ?)",
+                             (user_id, symbol, float(price), qty, date))
+                entry = f"BOUGHT {qty} {symbol} @ {price} on {date}"
+
+            elif action == "SELL":
+                # Simplified: sells the whole oldest position of the symbol
+                # Real impl would handle partial sells.
+                pos = conn.execute("SELECT id, avg_price, qty FROM positions WHERE user_id = ? AND symbol = ? "
+                                   "ORDER BY id LIMIT 1", (user_id, symbol)).fetchone()
+                if pos is None:
+                    return False, "Position not found"
+                proceeds = price * pos['qty']
+                pnl = proceeds - (pos['avg_price'] * pos['qty'])
+                conn.execute("UPDATE portfolios SET cash = cash + ? WHERE user_id = ?", (proceeds, user_id))
+                conn.execute("DELETE FROM positions WHERE id = ?", (pos['id'],))
+                entry = f"SOLD {pos['qty']} {symbol} @ {price} on {date} (PnL: {pnl:.2f})"
             else:
-                return False, "Insufficient Cash"
-                
-        elif action == "SELL":
-            # Simple FIFO or average logic. Here, simplified: remove matching symbol
-            # Real impl would handle partial sells.
-            for i, pos in enumerate(pf['positions']):
-                if pos['symbol'] == symbol:
-                    # Sell all for demo simplicity
-                    proceeds = price * pos['qty']
-                    pf['cash'] += proceeds
-                    pf['positions'].pop(i)
-                    pnl = proceeds - (pos['avg_price'] * pos['qty'])
-                    pf['history'].append(f"SOLD {pos['qty']} {symbol} @ {price} on {date} (PnL: {pnl:.2f})")
-                    save_portfolio(pf)
-                    return True, "Trade Executed"
-            return False, "Position not found"
-            
+                return False, f"Unknown action {action}"
+
+            conn.execute("INSERT INTO trade_history (user_id, ts, entry) VALUES (?, ?, ?)",
+                         (user_id, time.time(), entry))
+        return True, "Trade Executed"
+
     except Exception as e:
-        log_error(e, "Paper Trade Error")
+        log_error(e, {"action": "paper_trade", "symbol": symbol})
         return False, str(e)
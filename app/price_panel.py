@@ -0,0 +1,170 @@
+# file: app/price_panel.py
+import os
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+from app.logger import log_error
+
+PANEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "panel")
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+# Older versions stay on disk for readers that still have them mapped
+KEEP_VERSIONS = 2
+
+# Layout of one published version (immutable once written):
+#   data/panel/<version>/values.npy  float64 [ticker, field, date], NaN where a ticker has no bar
+#   data/panel/<version>/dates.npy   int64 UTC nanoseconds, sorted
+#   data/panel/<version>/meta.json   tickers, tz, adj versions, publish time, per-ticker bar fetch time
+#   data/panel/<timeframe>.json      pointer to the current version, replaced atomically
+# Every process maps the same files read-only, so the OS page cache holds one copy of the bars.
+
+class PricePanel:
+    """Read-only, memory-mapped OHLCV panel for one timeframe. Views share the mapped pages (no copy)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        self.version = meta["version"]
+        self.timeframe = meta["timeframe"]
+        self.published_at = meta["published_at"]
+        self.tickers = meta["tickers"]
+        # When each ticker's bars were fetched: freshness is judged per ticker by this
+        fetched = meta.get("fetched_at", self.published_at)
+        self.fetched_at = fetched if isinstance(fetched, dict) else dict.fromkeys(self.tickers, fetched)
+        self.adj_versions = meta["adj_versions"]
+        self.values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        self.dates = np.load(os.path.join(path, "dates.npy"), mmap_mode="r")
+        self.index = pd.DatetimeIndex(np.asarray(self.dates).view("datetime64[ns]"))
+        if meta.get("tz"):
+            self.index = self.index.tz_localize("UTC").tz_convert(meta["tz"])
+        self._row = {t: i for i, t in enumerate(self.tickers)}
+
+    def __contains__(self, ticker):
+        return ticker in self._row
+
+    def _span(self, start, end):
+        lo = 0 if start is None else self.index.searchsorted(self._ts(start), side="left")
+        hi = len(self.index) if end is None else self.index.searchsorted(self._ts(end), side="right")
+        return slice(lo, hi)
+
+    def _ts(self, value):
+        ts = pd.Timestamp(value)
+        if self.index.tz is not None and ts.tzinfo is None:
+            return ts.tz_localize(self.index.tz)
+        if self.index.tz is None and ts.tzinfo is not None:
+            return ts.tz_localize(None)
+        return ts
+
+    def view(self, ticker, field="Close", start=None, end=None):
+        """Zero-copy 1-D view of one field for a date range (inclusive); NaN on dates without a bar."""
+        return self.values[self._row[ticker], FIELDS.index(field), self._span(start, end)]
+
+    def block(self, ticker, start=None, end=None):
+        """Zero-copy [field, date] view of all FIELDS for a date range, plus its dates."""
+        span = self._span(start, end)
+        return self.values[self._row[ticker], :, span], self.index[span]
+
+    def frame(self, ticker, start=None, end=None):
+        """
+        OHLCV DataFrame like fetch_bars returns (dates without a bar dropped, attrs['adj_version'] set).
+        When the ticker's bars are one unbroken run of dates (the usual case) the frame wraps the
+        mapped pages without copying; only gaps inside the run force a copy.
+        """
+        block, index = self.block(ticker, start, end)
+        have = np.flatnonzero(~np.isnan(block[FIELDS.index("Close")]))
+        if len(have) and have[-1] - have[0] + 1 == len(have):
+            lo, hi = have[0], have[-1] + 1
+            # block is [field, date]: its transpose is the [date, field] frame pandas stores as is
+            df = pd.DataFrame(np.asarray(block[:, lo:hi]).T, index=index[lo:hi], columns=FIELDS, copy=False)
+        else:
+            df = pd.DataFrame(np.asarray(block[:, have]).T, index=index[have], columns=FIELDS)
+        df.attrs["adj_version"] = self.adj_versions.get(ticker)
+        df.attrs["fetched_at"] = self.fetched(ticker)
+        return df
+
+    def fetched(self, ticker):
+        """When `ticker`'s bars were fetched (epoch seconds)."""
+        return self.fetched_at.get(ticker, self.published_at)
+
+    def frames(self):
+        """{ticker: frame} for every ticker, eg. to carry into a new version; views where possible."""
+        return {t: self.frame(t) for t in self.tickers}
+
+def publish_panel(frames, timeframe, root=PANEL_DIR):
+    """
+    Writes {ticker: OHLCV frame} as a new panel version and switches readers to it.
+    Returns: the new PricePanel
+    """
+    frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+    index = pd.DatetimeIndex([])
+    for df in frames.values():
+        index = index.union(df.index)
+    tz = str(index.tz) if index.tz is not None else None
+    utc = index.tz_convert("UTC").tz_localize(None) if tz else index
+
+    tickers = list(frames)
+    values = np.full((len(tickers), len(FIELDS), len(index)), np.nan)
+    for i, t in enumerate(tickers):
+        df = frames[t]
+        pos = index.get_indexer(df.index)
+        for j, col in enumerate(FIELDS):
+            if col in df.columns:
+                values[i, j, pos] = df[col].to_numpy(dtype=float)
+
+    version = f"{timeframe}-{int(time.time() * 1000)}-{os.getpid()}"
+    path = os.path.join(root, version)
+    tmp = f"{path}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "values.npy"), values)
+    np.save(os.path.join(tmp, "dates.npy"), utc.asi8.astype(np.int64))
+    published_at = time.time()
+    # Cache reads and panel frames carry attrs['fetched_at']; bars carried over keep their own
+    fetched_at = {t: df.attrs.get("fetched_at") or published_at for t, df in frames.items()}
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"version": version, "timeframe": timeframe, "published_at": published_at,
+                   "fetched_at": fetched_at, "tz": tz,
+                   "tickers": tickers, "adj_versions": {t: df.attrs.get("adj_version") for t, df in frames.items()}}, f)
+    os.replace(tmp, path)
+
+    pointer = os.path.join(root, f"{timeframe}.json")
+    with open(f"{pointer}.{os.getpid()}.tmp", "w") as f:
+        json.dump({"version": version}, f)
+    os.replace(f"{pointer}.{os.getpid()}.tmp", pointer)
+    _prune(timeframe, root)
+    return load_panel(timeframe, root)
+
+def _prune(timeframe, root):
+    """Deletes all but the newest KEEP_VERSIONS versions (mapped files stay readable on POSIX)."""
+    versions = sorted((d for d in os.listdir(root) if d.startswith(f"{timeframe}-") and not d.endswith(".tmp")),
+                      key=lambda d: int(d.split("-")[-2]))
+    for d in versions[:-KEEP_VERSIONS]:
+        try:
+            shutil.rmtree(os.path.join(root, d))
+        except OSError:
+            pass  # still mapped on Windows, retried on the next publish
+
+_LOADED = {}
+
+def load_panel(timeframe="1d", root=PANEL_DIR):
+    """
+    Current panel for a timeframe, or None if none was published. Mapped once per
+    process and version; a newer publish is picked up on the next call.
+    """
+    pointer = os.path.join(root, f"{timeframe}.json")
+    try:
+        with open(pointer, "r") as f:
+            version = json.load(f)["version"]
+    except (OSError, ValueError):
+        return None
+    cached = _LOADED.get((timeframe, root))
+    if cached and cached.version == version:
+        return cached
+    try:
+        panel = PricePanel(os.path.join(root, version))
+    except Exception as e:
+        log_error(e, {"action": "load_panel", "timeframe": timeframe})
+        return None
+    _LOADED[(timeframe, root)] = panel
+    return panel
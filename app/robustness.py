@@ -36,7 +36,7 @@ def bootstrap_simulation(trades_df, iterations=500):
     Resamples trade returns with replacement to generate a distribution of Final Equity.
     """
     if trades_df.empty:
-        return {}
+        return {}, []
     
     returns = trades_df['pnl_pct'].values
     final_equities = []
@@ -88,3 +88,21 @@ def calculate_robustness_score(metrics, stability_df, vol_check):
     if vol_check: score += 20
     
     return min(score, 100)
+
+def robustness_report(df, min_vol=0, curve=None, timeframe="1d"):
+    """
+    Backtest metrics, parameter stability and robustness score for bars with indicators,
+    as the Deep Dive shows them. Liquidity passes when the 30D average volume reaches min_vol.
+    `curve` is a precomputed equity curve of df (app.equity) to reuse.
+    Returns: {"score", "metrics", "stability_std"}
+    """
+    _, metrics = run_trade_backtest(df, curve=curve, timeframe=timeframe)
+    stab = check_parameter_stability(df)
+    vol_30 = df['Vol_30'].iloc[-1] if 'Vol_30' in df else np.nan
+    liquid = bool(vol_30 >= min_vol) if min_vol > 0 else True
+    std = float(stab['total_return'].std()) if not stab.empty else None
+    return {
+        "score": calculate_robustness_score(metrics, stab, liquid),
+        "metrics": metrics,
+        "stability_std": None if std is None or np.isnan(std) else round(std, 2),
+    }
@@ -0,0 +1,169 @@
+# file: app/scan.py
+"""
+Headless batch scan, eg. from cron after market close:
+
+    python -m app.scan --universe nse500 --min-vol 100000
+
+Writes buys / sells / indicator snapshots to data/scans/<run-id>/ (Parquet)
+and marks it as the latest result for the Streamlit UI.
+
+Large universes can be split into deterministic shards:
+
+    python -m app.scan --universe nse500 --processes 8            # 8 local processes + merge
+    python -m app.scan --universe nse500 --run-id 20240131 --shard 3/8   # one shard (eg. per machine)
+    python -m app.scan --run-id 20240131 --merge                  # once all shards reported
+
+Tickers whose bars are unchanged since the previous scan reuse their rows from
+data/signals/<timeframe>_scan.json; --full recomputes everything. After a scan the
+universe's bars are published as the shared, memory-mapped price panel (data/panel)
+that the UI and other processes read instead of unpickling their own copies.
+
+Shards write into <run dir>/shards/; point --output at a shared mount when
+shards run on different machines. Every scan also refreshes the historical
+signal index (data/signals). In sharded runs each shard writes its own index
+and panel slice next to its result, and the merge step folds the slices in.
+The merge exits with status 1 while shards are missing.
+"""
+import argparse
+import concurrent.futures
+import os
+import socket
+import sys
+import time
+
+from app.scanner import run_scan, refresh_panel
+from app.signal_index import SignalIndex, load_signal_index
+from app.price_panel import load_panel, publish_panel
+from app.scan_state import ScanState
+from app.timeframes import TIMEFRAMES
+from app.scan_store import SCANS_DIR, save_scan_result, shard_dir, list_shard_dirs, merge_shards
+from app.universe import display_name, load_universe, shard_universe, parse_shard
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="python -m app.scan", description="Run the Donchian scan without the UI.")
+    p.add_argument("--universe", help="Universe name in data/universes (eg. nse500) or a file path")
+    p.add_argument("--output", help="Run directory (default: data/scans/<run-id>)")
+    p.add_argument("--run-id", help="Run id shared by all shards of one scan (default: timestamp)")
+    p.add_argument("--shard", help="Scan only shard INDEX/COUNT (0-based), eg. 3/8")
+    p.add_argument("--processes", type=int, default=1, help="Split into N shards scanned by N local processes")
+    p.add_argument("--merge", action="store_true", help="Merge the shard results of a run and exit")
+    p.add_argument("--timeframe", default="1d", choices=list(TIMEFRAMES), help="Bar timeframe (default: 1d)")
+    p.add_argument("--min-vol", type=float, default=0, help="Min 30D average volume")
+    p.add_argument("--no-trend", action="store_true", help="Disable the SMA 200 trend filter")
+    p.add_argument("--no-rsi", action="store_true", help="Disable the RSI > 70 veto")
+    p.add_argument("--full", action="store_true", help="Recompute every ticker, even if its bars are unchanged since the last scan")
+    p.add_argument("--no-latest", action="store_true", help="Do not mark this result as the UI's latest")
+    return p
+
+def print_summary(result, out_dir):
+    t = result["timing"]
+    rate = t["tickers"] / t["total_s"] if t["total_s"] else 0.0
+    print(f"Scanned {t['tickers']} tickers ({t['evaluated']} evaluated, {t.get('reused', 0)} unchanged) "
+          f"in {t['total_s']:.2f}s ({rate:.1f}/s)")
+    print(f"  fetch: {t['fetch_s']:.2f}s  indicators+signals: {t['eval_s']:.2f}s")
+    print(f"  buys: {len(result['buys'])}  sells: {len(result['sells'])}")
+    print(f"  written to {out_dir}")
+
+def scan_shard(universe, shard_index, shard_count, run_dir, params):
+    """Scans one shard of a universe and writes its partial result under run_dir/shards."""
+    tf = params["timeframe"]
+    tickers = shard_universe(load_universe(universe), shard_index, shard_count)
+    out_dir = shard_dir(run_dir, shard_index, shard_count)
+    # The shared index is only read here; this shard's symbols go to its own slice for the merge
+    index = load_signal_index(tf)
+    state = ScanState(tf).load()
+    result = run_scan(tickers, params["use_trend"], params["use_rsi"], params["min_vol"],
+                      timeframe=tf, signal_index=index, scan_state=state, force=params.get("full", False))
+    state.save()
+    index.subset([display_name(t) for t in tickers], os.path.join(out_dir, "signals")).save()
+    refresh_panel(tickers, tf, root=os.path.join(out_dir, "panel"))
+    meta = {
+        "universe": universe, "params": params,
+        "shard_index": shard_index, "shard_count": shard_count,
+        "host": f"{socket.gethostname()}:{os.getpid()}"
+    }
+    save_scan_result(result, out_dir, meta, mark_latest=False)
+    return shard_index, result["timing"]
+
+def merge_shard_slices(run_dir, timeframe):
+    """
+    Folds the signal index and panel slices the shards wrote into the shared index
+    and panel. Other tickers keep their current panel bars (and fetch times).
+    """
+    index = load_signal_index(timeframe)
+    panel = load_panel(timeframe)
+    frames = panel.frames() if panel is not None else {}
+    for d in list_shard_dirs(run_dir):
+        index.absorb(SignalIndex(timeframe, os.path.join(d, "signals")).load())
+        part = load_panel(timeframe, os.path.join(d, "panel"))
+        if part is not None:
+            frames.update(part.frames())
+    index.save()
+    if frames:
+        publish_panel(frames, timeframe)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    run_dir = args.output or os.path.join(SCANS_DIR, args.run_id or time.strftime("%Y%m%d-%H%M%S"))
+    mark_latest = not args.no_latest
+
+    if args.merge:
+        if not (args.output or args.run_id):
+            print("--merge needs --run-id or --output", file=sys.stderr)
+            return 2
+        result, meta = merge_shards(run_dir, mark_latest=mark_latest)
+        merge_shard_slices(run_dir, meta.get("params", {}).get("timeframe", "1d"))
+        for s in meta["shards"]:
+            t = s["timing"]
+            print(f"  shard {s['shard']}: {s['tickers']} tickers in {t.get('total_s', 0):.2f}s ({s['host']})")
+        if meta["missing_shards"]:
+            print(f"WARNING: missing shards {meta['missing_shards']}", file=sys.stderr)
+        print_summary(result, run_dir)
+        return 1 if meta["missing_shards"] else 0
+
+    if not args.universe:
+        print("--universe is required", file=sys.stderr)
+        return 2
+    params = {"use_trend": not args.no_trend, "use_rsi": not args.no_rsi, "min_vol": args.min_vol,
+              "timeframe": args.timeframe, "full": args.full}
+
+    if args.shard:
+        if not (args.output or args.run_id):
+            # Every shard of a run must agree on the directory, a timestamp won't
+            print("--shard needs --run-id or --output", file=sys.stderr)
+            return 2
+        index, count = parse_shard(args.shard)
+        _, timing = scan_shard(args.universe, index, count, run_dir, params)
+        print(f"Shard {index}/{count}: {timing['tickers']} tickers in {timing['total_s']:.2f}s -> {run_dir}")
+        return 0
+
+    if args.processes > 1:
+        n = args.processes
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n) as pool:
+            futures = [pool.submit(scan_shard, args.universe, i, n, run_dir, params) for i in range(n)]
+            for fut in concurrent.futures.as_completed(futures):
+                fut.result()
+        result, meta = merge_shards(run_dir, mark_latest=mark_latest)
+        merge_shard_slices(run_dir, args.timeframe)
+        if meta["missing_shards"]:
+            print(f"WARNING: missing shards {meta['missing_shards']}", file=sys.stderr)
+        print_summary(result, run_dir)
+        return 1 if meta["missing_shards"] else 0
+
+    tickers = load_universe(args.universe)
+    if not tickers:
+        print(f"No symbols in {args.universe}", file=sys.stderr)
+        return 1
+    index = load_signal_index(args.timeframe)
+    state = ScanState(args.timeframe).load()
+    result = run_scan(tickers, params["use_trend"], params["use_rsi"], params["min_vol"],
+                      timeframe=params["timeframe"], signal_index=index, scan_state=state, force=args.full)
+    index.save()
+    state.save()
+    refresh_panel(tickers, args.timeframe)
+    save_scan_result(result, run_dir, {"universe": args.universe, "params": params}, mark_latest=mark_latest)
+    print_summary(result, run_dir)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
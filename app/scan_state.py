@@ -0,0 +1,78 @@
+# file: app/scan_state.py
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from app.timeframes import OHLCV_AGG
+from app.throttle import file_lock
+
+# Same directory as the signal index (app.signal_index.SIGNALS_DIR), without importing it
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "signals")
+
+def data_fingerprint(df):
+    """Content hash of a bar frame (index, OHLCV, adjustment version); changes with any new or revised bar."""
+    cols = [c for c in OHLCV_AGG if c in df.columns]
+    h = hashlib.sha1()
+    h.update(str(df.attrs.get("adj_version")).encode())
+    h.update(np.ascontiguousarray(df.index.asi8).tobytes())
+    h.update(np.ascontiguousarray(df[cols].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()[:16]
+
+def params_key(**params):
+    """Stable key of the scan parameters an evaluation depends on."""
+    return json.dumps(params, sort_keys=True)
+
+class ScanState:
+    """
+    Per-ticker result of the last scan on a timeframe: last evaluated bar, data
+    fingerprint, parameters and the buy / sell / snapshot rows it produced.
+    Stored next to the signal index (data/signals/<tf>_scan.json), so a rescan can
+    reuse the rows of tickers whose bars have not changed.
+    """
+
+    def __init__(self, timeframe="1d", root=STATE_DIR):
+        self.timeframe = timeframe
+        self.root = root
+        self.path = os.path.join(root, f"{timeframe}_scan.json")
+        self.entries = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        return self
+
+    def lookup(self, ticker, fingerprint, params):
+        """Stored (buy, sell, snapshot) if `ticker` was evaluated on the same data and params, else None."""
+        e = self.entries.get(ticker)
+        if e is None or e["fp"] != fingerprint or e["params"] != params:
+            return None
+        return e["buy"], e["sell"], e["snapshot"]
+
+    def record(self, ticker, fingerprint, params, last_bar, buy, sell, snapshot):
+        with self._lock:
+            self.entries[ticker] = {"fp": fingerprint, "params": params, "last": last_bar,
+                                    "buy": buy, "sell": sell, "snapshot": snapshot}
+            self._dirty.add(ticker)
+
+    def save(self):
+        """
+        Merges this run's entries into the file under a lock, so shards and
+        concurrent jobs scanning different tickers don't overwrite each other.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(f"scan_state_{self.timeframe}", lock_dir=os.path.join(self.root, ".locks")), self._lock:
+            on_disk = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    on_disk = json.load(f)
+            on_disk.update({t: self.entries[t] for t in self._dirty})
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(on_disk, f)
+            os.replace(tmp, self.path)
+            self.entries = on_disk
+            self._dirty.clear()
@@ -0,0 +1,144 @@
+# file: app/scan_store.py
+import os
+import json
+import time
+import pandas as pd
+from app.logger import log_error
+
+SCANS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "scans")
+LATEST_FILE = os.path.join(SCANS_DIR, "latest.json")
+TABLES = ["buys", "sells", "snapshots"]
+
+def new_scan_dir(root=SCANS_DIR):
+    """Timestamped output directory for a scan run, eg. data/scans/20240131-154500"""
+    return os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+
+def save_scan_result(result, out_dir, meta=None, mark_latest=True):
+    """
+    Writes buys / sells / snapshots as Parquet files plus meta.json into out_dir.
+    When mark_latest is set, the UI's "latest" pointer is moved to this result.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for name in TABLES:
+        pd.DataFrame(result.get(name, [])).to_parquet(os.path.join(out_dir, f"{name}.parquet"), index=False)
+
+    meta = dict(meta or {})
+    meta.setdefault("created", time.time())
+    meta["timing"] = result.get("timing", {})
+    # Written last and atomically: its presence marks the result (eg. a shard's) as complete
+    _write_json_atomic(os.path.join(out_dir, "meta.json"), meta, indent=2)
+
+    if mark_latest:
+        _write_json_atomic(LATEST_FILE, {"path": os.path.abspath(out_dir), "created": meta["created"]})
+    return out_dir
+
+def load_scan_result(path):
+    """Reads a result written by save_scan_result. Tables come back as DataFrames."""
+    res = {}
+    for name in TABLES:
+        fpath = os.path.join(path, f"{name}.parquet")
+        res[name] = pd.read_parquet(fpath) if os.path.exists(fpath) else pd.DataFrame()
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as f:
+            res["meta"] = json.load(f)
+    else:
+        res["meta"] = {}
+    return res
+
+def latest_scan_path():
+    """Path of the most recent precomputed scan, or None."""
+    try:
+        if not os.path.exists(LATEST_FILE):
+            return None
+        with open(LATEST_FILE, "r") as f:
+            path = json.load(f).get("path")
+        return path if path and os.path.isdir(path) else None
+    except Exception as e:
+        log_error(e, {"action": "latest_scan_path"})
+        return None
+
+def shard_dir(run_dir, shard_index, shard_count):
+    """Where a shard writes its partial result inside a run directory."""
+    return os.path.join(run_dir, "shards", f"shard-{shard_index:03d}-of-{shard_count:03d}")
+
+def list_shard_dirs(run_dir):
+    """
+    Shard result directories that have reported under run_dir/shards, in shard order.
+    meta.json is written last, so a shard still running (or one that crashed) is skipped.
+    """
+    shards_root = os.path.join(run_dir, "shards")
+    names = sorted(os.listdir(shards_root)) if os.path.isdir(shards_root) else []
+    return [os.path.join(shards_root, n) for n in names
+            if os.path.exists(os.path.join(shards_root, n, "meta.json"))]
+
+def merge_timing(timings):
+    """Sums every timing key across shards; total_s is the slowest shard (they run concurrently)."""
+    merged = {}
+    for t in timings:
+        for key, value in t.items():
+            merged[key] = max(merged.get(key, 0), value) if key == "total_s" else merged.get(key, 0) + value
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in merged.items()}
+
+def merge_shards(run_dir, mark_latest=True):
+    """
+    Assembles the partial results under run_dir/shards into one scan result
+    written to run_dir itself. meta.json records per-shard timing and any
+    shards that have not reported yet.
+    Returns: (result, meta)
+    """
+    dirs = list_shard_dirs(run_dir)
+    if not dirs:
+        raise FileNotFoundError(f"No shard results under {os.path.join(run_dir, 'shards')}")
+
+    tables = {name: [] for name in TABLES}
+    shard_meta = []
+    shard_count = None
+    first_meta = None
+    for d in dirs:
+        part = load_scan_result(d)
+        for t in TABLES:
+            if not part[t].empty:
+                tables[t].append(part[t])
+        m = part["meta"]
+        first_meta = first_meta or m
+        shard_count = m.get("shard_count", shard_count)
+        shard_meta.append({
+            "shard": m.get("shard_index"),
+            "host": m.get("host"),
+            "tickers": m.get("timing", {}).get("tickers", 0),
+            "timing": m.get("timing", {})
+        })
+
+    result = {}
+    for t in TABLES:
+        df = pd.concat(tables[t], ignore_index=True) if tables[t] else pd.DataFrame()
+        if "Symbol" in df.columns:
+            df = df.sort_values("Symbol", kind="mergesort").reset_index(drop=True)
+        if t == "buys" and "Score" in df.columns:
+            # Same order as run_scan: best score first, unscored rows last
+            df = df.sort_values("Score", ascending=False, na_position="last", kind="mergesort").reset_index(drop=True)
+        result[t] = df
+
+    reported = {s["shard"] for s in shard_meta}
+    result["timing"] = merge_timing(s["timing"] for s in shard_meta)
+    meta = {
+        "shard_count": shard_count,
+        "shards": shard_meta,
+        "missing_shards": sorted(set(range(shard_count or 0)) - reported)
+    }
+    # Params/universe are identical across shards; take them from the first one
+    for key in ("universe", "params"):
+        if key in first_meta:
+            meta[key] = first_meta[key]
+
+    save_scan_result(result, run_dir, meta, mark_latest=mark_latest)
+    return result, meta
+
+def _write_json_atomic(path, payload, indent=None):
+    """Write to a temp file and rename, so readers never see a half-written file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=indent)
+    os.replace(tmp, path)
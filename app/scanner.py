@@ -1,103 +1,414 @@
 # file: app/scanner.py
-import yfinance as yf
 import pandas as pd
 import time
 import os
 import json
 import uuid
+import random
+import threading
+from collections import OrderedDict
 import concurrent.futures
 from app.indicators import add_indicators
-from app.cache import load_from_cache, save_to_cache
+from app.cache import get_cached, set_cache, warm_cache
+from app.adjustments import split_provider_bars
+from app.timeframes import TIMEFRAMES, BASE_PERIODS, update_resampled
+from app.universe import display_name as _display_name
+from app.market_calendar import is_fresh
+from app.scan_state import ScanState, data_fingerprint, params_key
+# robustness / equity / screener / price_panel / signal_index are imported where they're
+# used, so a session that only opens the scanner grid doesn't load them
+from app.throttle import SingleFlight, TokenBucket, file_lock
 from app.logger import log_error
 
 JOBS_DIR = "./data/jobs"
-os.makedirs(JOBS_DIR, exist_ok=True)
 
-def fetch_data_with_retry(ticker, period="2y", retries=3):
-    """Fetch with exponential backoff and cache check."""
+# Outbound provider calls, shared by every session, scan job and worker process on this machine
+PROVIDER_RATE = 2.0    # requests per second
+PROVIDER_BURST = 5
+_PROVIDER = TokenBucket("yahoo", PROVIDER_RATE, PROVIDER_BURST)
+_INFLIGHT = SingleFlight()
+
+def fetch_data_with_retry(ticker, period=None, retries=3, interval="1d", auto_adjust=True):
+    """
+    Cached bars, downloading on a miss. Concurrent misses for the same series share
+    one download: threads via SingleFlight, processes via a per-series file lock and
+    a cache re-check. Downloads go through the shared provider rate limiter.
+    period defaults to the interval's BASE_PERIODS entry, so it hits the same cached
+    series as fetch_bars.
+    """
+    period = period or BASE_PERIODS.get(interval, "2y")
     # 1. Check Cache
-    df = load_from_cache(ticker, period)
+    df = get_cached(ticker, period, auto_adjust=auto_adjust, interval=interval)
     if df is not None:
         return df
+
+    # 2. One download per series, written through to the cache; every caller reads its own view
+    key = f"{ticker}_{period}_{interval}".replace("/", "_").replace(" ", "_")
+    if not _INFLIGHT.do(key, lambda: _download(ticker, period, interval, retries, key)):
+        return None
+    return get_cached(ticker, period, auto_adjust=auto_adjust, ttl_seconds=None, interval=interval)
+
+def _download(ticker, period, interval, retries, key):
+    """Downloads and caches one series. Returns True when the cache holds it."""
+    with file_lock(f"fetch_{key}"):
+        # Another process may have downloaded it while we waited for the lock
+        if get_cached(ticker, period, interval=interval) is not None:
+            return True
+
+        import yfinance as yf  # only imported on a cache miss
+        delay = 1
+        for i in range(retries):
+            _PROVIDER.acquire()
+            try:
+                # Raw bars + corporate actions; the adjusted view is derived from the stored factors
+                df = yf.download(ticker, period=period, interval=interval, progress=False,
+                                 auto_adjust=False, actions=True)
+                if isinstance(df.columns, pd.MultiIndex):
+                    df.columns = df.columns.get_level_values(0)
+
+                if not df.empty:
+                    raw, factors = split_provider_bars(df)
+                    set_cache(ticker, period, raw, interval=interval, factors=factors)
+                    return True
+            except Exception as e:
+                log_error(e, {"ticker": ticker, "action": "download", "attempt": i + 1})
+            # Errors and empty frames (yfinance swallows rate-limit responses) are mostly
+            # throttling: back off every caller, not just this one, before the next attempt
+            if i + 1 < retries:
+                _PROVIDER.pause(delay * (1 + random.random()))
+                delay *= 2
+    return False
+
+def fetch_bars(ticker, timeframe="1d", retries=3, use_panel=True):
+    """
+    Bars for any timeframe in TIMEFRAMES. Only the base interval is downloaded;
+    higher timeframes are resampled from it, cached, and extended incrementally.
+    Derived bars are rebuilt when the base's adjustment factors change.
+    While the shared price panel is current, bars are read from it instead.
+    """
+    spec = TIMEFRAMES[timeframe]
+    if use_panel:
+        from app.price_panel import load_panel
+        panel = load_panel(timeframe)
+        if panel is not None and ticker in panel and is_fresh(panel.fetched(ticker), spec["base"]):
+            return panel.frame(ticker)
+
+    period = BASE_PERIODS[spec["base"]]
+    base = fetch_data_with_retry(ticker, period=period, retries=retries, interval=spec["base"])
+    if base is None or spec["rule"] is None:
+        return base
+
+    version = base.attrs.get("adj_version")
+    derived = get_cached(ticker, period, ttl_seconds=None, interval=timeframe)
+    if derived is not None and derived.attrs.get("adj_version") != version:
+        derived = None
+    updated = update_resampled(derived, base, timeframe)
+    updated.attrs["adj_version"] = version
+    # Resampled bars are as old as the base bars they were built from
+    updated.attrs["fetched_at"] = base.attrs.get("fetched_at")
+    if derived is None or not updated.equals(derived):
+        set_cache(ticker, period, updated, interval=timeframe)
+    return updated
+
+# Bars with indicators from the latest scan/backtest, keyed by data fingerprint, so the
+# Backtest Lab and Deep Dive reuse what a scan already computed instead of recomputing it
+INDICATOR_CACHE_SIZE = 512
+_INDICATORS = OrderedDict()
+_indicators_lock = threading.Lock()
+
+def with_indicators(ticker, df, timeframe="1d"):
+    """add_indicators(df) for `ticker`, memoized on the bars' fingerprint. Returns a copy."""
+    if df is None:
+        return None
+    fp = data_fingerprint(df)
+    key = (ticker, timeframe)
+    with _indicators_lock:
+        hit = _INDICATORS.get(key)
+        if hit is not None and hit[0] == fp:
+            _INDICATORS.move_to_end(key)
+            return hit[1].copy()
+    out = add_indicators(df.copy())
+    with _indicators_lock:
+        _INDICATORS[key] = (fp, out)
+        _INDICATORS.move_to_end(key)
+        while len(_INDICATORS) > INDICATOR_CACHE_SIZE:
+            _INDICATORS.popitem(last=False)
+    return out.copy()
+
+def indicator_bars(ticker, timeframe="1d"):
+    """fetch_bars + indicators, reusing indicators computed earlier on the same bars."""
+    return with_indicators(ticker, fetch_bars(ticker, timeframe), timeframe)
+
+RANK_WORKERS = 4
+ROBUSTNESS_CACHE_SIZE = 1024
+_ROBUSTNESS = OrderedDict()
+_EQUITY = OrderedDict()
+
+def _memo(store, key, compute, size=ROBUSTNESS_CACHE_SIZE):
+    with _indicators_lock:
+        if key in store:
+            store.move_to_end(key)
+            return store[key]
+    value = compute()
+    with _indicators_lock:
+        store[key] = value
+        while len(store) > size:
+            store.popitem(last=False)
+    return value
+
+def equity_for(ticker, df, timeframe="1d"):
+    """
+    Bar-level equity curve (app.equity) of bars with indicators, memoized per
+    (ticker, timeframe, data fingerprint). Shared by the Deep Dive, Backtest Lab,
+    ledger and robustness score; the arrays must not be modified.
+    """
+    from app.equity import equity_curve
+    key = (ticker, timeframe, data_fingerprint(df))
+    return _memo(_EQUITY, key, lambda: equity_curve(df))
+
+def robustness_for(ticker, df, timeframe="1d", min_vol=0):
+    """
+    robustness_report for bars with indicators, memoized per (ticker, timeframe, data
+    fingerprint, min_vol) so reruns (eg. the Deep Dive) don't repeat the backtests.
+    """
+    from app.robustness import robustness_report
+    key = (ticker, timeframe, data_fingerprint(df), min_vol)
+    return _memo(_ROBUSTNESS, key, lambda: robustness_report(
+        df, min_vol, curve=equity_for(ticker, df, timeframe), timeframe=timeframe))
+
+def _safe_robustness(ticker, df, timeframe, min_vol):
+    try:
+        return robustness_for(ticker, df, timeframe, min_vol)
+    except Exception as e:
+        log_error(e, f"Robustness error {ticker}")
+        return {}
+
+def rank_columns(report):
+    """Scanner grid columns for a robustness report."""
+    m = report.get("metrics") or {}
+    return {
+        "Score": report.get("score"),
+        "BT_Return": m.get("total_return"),
+        "Win_Rate": m.get("win_rate"),
+        "Trades": m.get("trades"),
+        "Max_DD": m.get("max_drawdown"),
+    }
+
+SNAPSHOT_COLS = ['Close', 'Volume', 'High_20', 'Low_20', 'Middle', 'SMA_200', 'RSI', 'Vol_30']
+
+def _bar_label(ts):
+    """Date for daily and higher bars, date + time for intraday bars."""
+    if ts.hour or ts.minute:
+        return ts.strftime('%Y-%m-%d %H:%M')
+    return ts.strftime('%Y-%m-%d')
+
+def evaluate_ticker(ticker, df, use_trend, use_rsi, min_vol):
+    """
+    Applies the strategy to one ticker's bars (indicators already added).
+    Returns: (buy_row or None, sell_row or None, snapshot_row or None)
+    """
+    if df is None or len(df) < 50:
+        return None, None, None
+
+    today = df.iloc[-1]
+    prev = df.iloc[-2]
+    display_name = _display_name(ticker)
+
+    # Last-bar indicator snapshot (kept for every ticker, signal or not)
+    snapshot = {"Symbol": display_name, "Ticker": ticker, "Date": _bar_label(today.name)}
+    for col in SNAPSHOT_COLS:
+        if col in today:
+            snapshot[col] = float(today[col])
+
+    # Volume Filter
+    if min_vol > 0 and today.get('Vol_30', 0) < min_vol:
+        return None, None, snapshot
+
+    # Buy Logic
+    if prev['Close'] < prev['Middle'] and today['Close'] > today['Middle']:
+        valid = True
+        if use_trend and today['Close'] < today['SMA_200']: valid = False
+        if use_rsi and today['RSI'] > 70: valid = False
         
-    # 2. Network Fetch
-    delay = 1
-    for i in range(retries):
-        try:
-            # yfinance download
-            df = yf.download(ticker, period=period, progress=False, auto_adjust=True)
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
-            
-            if not df.empty:
-                save_to_cache(ticker, df, period)
-                return df
-        except Exception as e:
-            time.sleep(delay)
-            delay *= 2
-    return None
+        if valid:
+            return {
+                "Symbol": display_name,
+                "Price": round(today['Close'], 2),
+                "RSI": round(today['RSI'], 1),
+                "Volume": int(today['Volume']) if 'Volume' in today else 0,
+                "Trend": "Up" if today['Close'] > today['SMA_200'] else "Down"
+            }, None, snapshot
+    
+    # Sell Logic (Long Only exits mostly, but tracking signal)
+    elif prev['Close'] > prev['Middle'] and today['Close'] < today['Middle']:
+        return None, {
+            "Symbol": display_name,
+            "Price": round(today['Close'], 2),
+            "Date": _bar_label(today.name)
+        }, snapshot
+
+    return None, None, snapshot
 
-def scan_worker(job_id, ticker_list, use_trend, use_rsi, min_vol):
+def run_scan(ticker_list, use_trend, use_rsi, min_vol, progress_cb=None, timeframe="1d", signal_index=None,
+             scan_state=None, force=False):
     """
-    Worker function to process the scan.
+    Runs the strategy over a ticker list on `timeframe` bars.
+    progress_cb(processed, total) is called every 10 tickers.
+    If a SignalIndex is given, it is updated with each ticker's crossovers (caller saves it).
+    If a ScanState is given, tickers whose bars and params are unchanged since the last scan
+    reuse their previous rows instead of recomputing indicators (force=True recomputes all);
+    new evaluations are recorded in it (caller saves it).
+    Returns: {"buys": [...], "sells": [...], "snapshots": [...], "timing": {...}}
     """
     results_buy = []
     results_sell = []
+    snapshots = []
     total = len(ticker_list)
     processed = 0
+    reused = 0
+    to_rank = []
+    fetch_s = 0.0
+    eval_s = 0.0
+    params = params_key(use_trend=use_trend, use_rsi=use_rsi, min_vol=min_vol)
+    t_start = time.perf_counter()
+
+    # Pull the universe's cached bars into the memory tier up front (parallel, no network)
+    spec = TIMEFRAMES[timeframe]
+    warm_cache(ticker_list, BASE_PERIODS[spec["base"]], spec["base"])
+    if spec["rule"] is not None:
+        warm_cache(ticker_list, BASE_PERIODS[spec["base"]], timeframe)
     
     for ticker in ticker_list:
         try:
-            df = fetch_data_with_retry(ticker)
-            if df is None or len(df) < 50:
-                processed += 1
-                continue
-            
-            df = add_indicators(df)
-            today = df.iloc[-1]
-            prev = df.iloc[-2]
-            
-            # Volume Filter
-            if min_vol > 0 and today.get('Vol_30', 0) < min_vol:
-                processed += 1
-                continue
+            t0 = time.perf_counter()
+            df = fetch_bars(ticker, timeframe)
+            t1 = time.perf_counter()
+            fetch_s += t1 - t0
 
-            # Logic
-            display_name = ticker.replace('.NS', '').replace('=F', '')
-            
-            # Buy Logic
-            if prev['Close'] < prev['Middle'] and today['Close'] > today['Middle']:
-                valid = True
-                if use_trend and today['Close'] < today['SMA_200']: valid = False
-                if use_rsi and today['RSI'] > 70: valid = False
-                
-                if valid:
-                    results_buy.append({
-                        "Symbol": display_name,
-                        "Price": round(today['Close'], 2),
-                        "RSI": round(today['RSI'], 1),
-                        "Volume": int(today['Volume']) if 'Volume' in today else 0,
-                        "Trend": "Up" if today['Close'] > today['SMA_200'] else "Down"
-                    })
-            
-            # Sell Logic (Long Only exits mostly, but tracking signal)
-            elif prev['Close'] > prev['Middle'] and today['Close'] < today['Middle']:
-                results_sell.append({
-                    "Symbol": display_name,
-                    "Price": round(today['Close'], 2),
-                    "Date": today.name.strftime('%Y-%m-%d')
-                })
+            if df is not None and len(df) >= 50:
+                fp = data_fingerprint(df) if scan_state is not None else None
+                rows = None if force or fp is None else scan_state.lookup(ticker, fp, params)
+                if rows is not None and signal_index is not None and \
+                        signal_index.last_indexed(_display_name(ticker)) != df.index[-1]:
+                    rows = None  # index was reset or lags behind: recompute to bring it up to date
+                if rows is not None:
+                    # Same bars as the last scan: its signals still hold, and the index already has them
+                    reused += 1
+                    if rows[2]:
+                        rows[2].setdefault("Ticker", ticker)  # rows stored before snapshots kept it
+                else:
+                    df = with_indicators(ticker, df, timeframe)
+                    rows = evaluate_ticker(ticker, df, use_trend, use_rsi, min_vol)
+                    if signal_index is not None:
+                        signal_index.update(_display_name(ticker), df)
+                    if rows[0] or rows[1]:
+                        to_rank.append((ticker, fp, df, rows))
+                    elif scan_state is not None:
+                        scan_state.record(ticker, fp, params, df.index[-1].isoformat(), *rows)
+                buy, sell, snap = rows
+                if buy: results_buy.append(buy)
+                if sell: results_sell.append(sell)
+                if snap: snapshots.append(snap)
+            eval_s += time.perf_counter() - t1
         
         except Exception as e:
             log_error(e, f"Scanner error {ticker}")
         
         processed += 1
-        # Update Job Progress
-        if processed % 10 == 0:
-            update_job_status(job_id, "running", processed / total)
+        if progress_cb and processed % 10 == 0:
+            progress_cb(processed, total)
+
+    # Robustness of newly signaled tickers, in parallel. Rows carry the rank columns, so
+    # reused rows (same bars and params) keep their ranking without recomputing it.
+    t_rank = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=RANK_WORKERS) as pool:
+        reports = pool.map(lambda item: _safe_robustness(item[0], item[2], timeframe, min_vol), to_rank)
+        for (ticker, fp, df, rows), report in zip(to_rank, reports):
+            for row in rows[:2]:
+                if row:
+                    row.update(rank_columns(report))
+            # A failed report isn't kept, so the next scan ranks the ticker again
+            if scan_state is not None and report.get("score") is not None:
+                scan_state.record(ticker, fp, params, df.index[-1].isoformat(), *rows)
+    rank_s = time.perf_counter() - t_rank
+    # Best score first; rows whose report failed (Score None) go last
+    results_buy.sort(key=lambda r: (r.get("Score") is not None, r.get("Score") or 0), reverse=True)
+
+    timing = {
+        "tickers": total,
+        "evaluated": len(snapshots),
+        "reused": reused,
+        "total_s": round(time.perf_counter() - t_start, 3),
+        "fetch_s": round(fetch_s, 3),
+        "eval_s": round(eval_s, 3),
+        "rank_s": round(rank_s, 3)
+    }
+    return {"buys": results_buy, "sells": results_sell, "snapshots": snapshots, "timing": timing}
+
+def run_screens(ticker_list, screens, timeframe="1d"):
+    """
+    Runs custom screens ({name: expression}, see app.screener) over a universe in one
+    pass on each ticker's last bar. Raises ValueError for an invalid expression.
+    Returns: DataFrame[Symbol, <one bool column per screen>] of tickers matching any screen
+    """
+    from app.screener import compile_screens, build_matrix
+    program = compile_screens(screens)
+    frames = {}
+    for ticker in ticker_list:
+        try:
+            frames[ticker] = fetch_bars(ticker, timeframe)
+        except Exception as e:
+            log_error(e, f"Screen error {ticker}")
+    tickers, matrix = build_matrix(frames)
+    hits = program.screen(tickers, matrix)
+    hits.index = pd.Index([_display_name(t) for t in tickers], name="Symbol")
+    return hits[hits.any(axis=1)].reset_index()
+
+def refresh_panel(ticker_list, timeframe="1d", root=None):
+    """
+    Brings the universe's bars into the shared price panel: tickers missing from it or
+    whose panel bars are stale are re-read, every other ticker (eg. other universes) is
+    carried over. Run after a data refresh (scan).
+    Shards publish a slice under their own root (default: data/panel), which the app.scan
+    merge step combines.
+    """
+    from app.price_panel import PANEL_DIR, load_panel, publish_panel
+    root = root or PANEL_DIR
+    spec = TIMEFRAMES[timeframe]
+    panel = load_panel(timeframe, root)
+    stale = [t for t in ticker_list if panel is None or t not in panel or not is_fresh(panel.fetched(t), spec["base"])]
+    if panel is not None and not stale:
+        return panel
+    frames = panel.frames() if panel is not None else {}
+    for ticker in stale:
+        try:
+            frames[ticker] = fetch_bars(ticker, timeframe, use_panel=False)
+        except Exception as e:
+            log_error(e, f"Panel error {ticker}")
+    try:
+        return publish_panel(frames, timeframe, root)
+    except Exception as e:
+        log_error(e, {"action": "publish_panel", "timeframe": timeframe})
+        return None
+
+def scan_worker(job_id, ticker_list, use_trend, use_rsi, min_vol, timeframe="1d", force=False):
+    """
+    Worker function to process the scan.
+    """
+    from app.signal_index import load_signal_index
+    index = load_signal_index(timeframe)
+    state = ScanState(timeframe).load()
+    final_res = run_scan(
+        ticker_list, use_trend, use_rsi, min_vol,
+        progress_cb=lambda done, total: update_job_status(job_id, "running", done / total),
+        timeframe=timeframe, signal_index=index, scan_state=state, force=force
+    )
+    index.save()
+    state.save()
+    refresh_panel(ticker_list, timeframe)
             
     # Save Final Result
-    final_res = {"buys": results_buy, "sells": results_sell}
+    os.makedirs(JOBS_DIR, exist_ok=True)
     with open(os.path.join(JOBS_DIR, f"{job_id}_result.pkl"), 'wb') as f:
         import pickle
         pickle.dump(final_res, f)
@@ -106,15 +417,16 @@ def scan_worker(job_id, ticker_list, use_trend, use_rsi, min_vol):
 
 def update_job_status(job_id, status, progress):
     meta = {"status": status, "progress": progress, "updated": str(time.time())}
+    os.makedirs(JOBS_DIR, exist_ok=True)
     with open(os.path.join(JOBS_DIR, f"{job_id}.json"), 'w') as f:
         json.dump(meta, f)
 
-def submit_scan_job(ticker_list, use_trend, use_rsi, min_vol):
+def submit_scan_job(ticker_list, use_trend, use_rsi, min_vol, timeframe="1d", force=False):
     job_id = str(uuid.uuid4())
     update_job_status(job_id, "queued", 0.0)
     
     executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-    executor.submit(scan_worker, job_id, ticker_list, use_trend, use_rsi, min_vol)
+    executor.submit(scan_worker, job_id, ticker_list, use_trend, use_rsi, min_vol, timeframe, force)
     return job_id
 
 def get_job_status(job_id):
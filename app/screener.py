@@ -0,0 +1,307 @@
+# file: app/screener.py
+"""
+Screening rules as expressions over OHLCV bars, eg.
+
+    cross_above(Close, Middle) and Close > SMA(200) and RSI(14) < 70
+
+Rules are parsed once into expression trees. Identical sub-expressions are shared
+across every rule of a program (SMA(200) is computed once even if ten screens use
+it), and each node is evaluated as one NumPy operation over a [ticker, bar] matrix,
+so any number of screens run in a single pass over the universe.
+
+Columns: Open High Low Close Volume, plus the scanner's indicator names
+(High_20 Low_20 Middle SMA_200 RSI Vol_30).
+Functions: SMA([x,] n)  EMA([x,] n)  RSI([x,] n)  HIGHEST(x, n)  LOWEST(x, n)  MIDDLE(n)
+           PREV(x[, k])  ABS(x)  CROSS_ABOVE(a, b)  CROSS_BELOW(a, b)   (names are case-insensitive)
+Operators: + - * /  < <= > >= == !=  and or not
+"""
+import ast
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Indicator columns of app.indicators.add_indicators, as expressions
+ALIASES = {
+    "High_20": "HIGHEST(High, 20)",
+    "Low_20": "LOWEST(Low, 20)",
+    "Middle": "MIDDLE(20)",
+    "SMA_200": "SMA(Close, 200)",
+    "RSI": "RSI(Close, 14)",
+    "Vol_30": "SMA(Volume, 30)",
+}
+
+_CMP = {ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=", ast.Eq: "==", ast.NotEq: "!="}
+_BIN = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+# name -> (min args, max args, leading series arg defaults to Close)
+_FUNCS = {
+    "SMA": (1, 2, True), "EMA": (1, 2, True), "RSI": (1, 2, True),
+    "HIGHEST": (2, 2, False), "LOWEST": (2, 2, False), "MIDDLE": (1, 1, False),
+    "PREV": (1, 2, False), "ABS": (1, 1, False),
+    "CROSS_ABOVE": (2, 2, False), "CROSS_BELOW": (2, 2, False),
+}
+_WINDOW_FUNCS = {"SMA", "EMA", "RSI", "HIGHEST", "LOWEST", "MIDDLE", "PREV"}
+
+def parse(expr):
+    """
+    Expression string -> canonical node tuple (hashable, so equal sub-trees compare equal):
+    ("col", name) ("const", value) ("fn", NAME, *args) ("op", sym, a, b) ("and"|"or", a, b) ("not", a)
+    Raises ValueError on syntax errors or unknown names.
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid screen {expr!r}: {e.msg}") from None
+    return _node(tree.body, expr)
+
+def _node(n, expr):
+    if isinstance(n, ast.BoolOp):
+        kind = "and" if isinstance(n.op, ast.And) else "or"
+        out = _node(n.values[0], expr)
+        for v in n.values[1:]:
+            out = (kind, out, _node(v, expr))
+        return out
+    if isinstance(n, ast.UnaryOp) and isinstance(n.op, ast.Not):
+        return ("not", _node(n.operand, expr))
+    if isinstance(n, ast.UnaryOp) and isinstance(n.op, ast.USub):
+        inner = _node(n.operand, expr)
+        return ("const", -inner[1]) if inner[0] == "const" else ("op", "-", ("const", 0.0), inner)
+    if isinstance(n, ast.Compare):
+        # a < b < c  ->  (a < b) and (b < c)
+        parts, left = [], _node(n.left, expr)
+        for op, comp in zip(n.ops, n.comparators):
+            if type(op) not in _CMP:
+                raise ValueError(f"Unsupported comparison in {expr!r}")
+            right = _node(comp, expr)
+            parts.append(("op", _CMP[type(op)], left, right))
+            left = right
+        out = parts[0]
+        for p in parts[1:]:
+            out = ("and", out, p)
+        return out
+    if isinstance(n, ast.BinOp) and type(n.op) in _BIN:
+        return ("op", _BIN[type(n.op)], _node(n.left, expr), _node(n.right, expr))
+    if isinstance(n, ast.Constant) and isinstance(n.value, (int, float)):
+        return ("const", float(n.value))
+    if isinstance(n, ast.Name):
+        if n.id in FIELDS:
+            return ("col", n.id)
+        if n.id in ALIASES:
+            return parse(ALIASES[n.id])
+        raise ValueError(f"Unknown column {n.id!r} in {expr!r}")
+    if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and not n.keywords:
+        name = n.func.id.upper()
+        if name not in _FUNCS:
+            raise ValueError(f"Unknown function {n.func.id!r} in {expr!r}")
+        lo, hi, series_default = _FUNCS[name]
+        args = [_node(a, expr) for a in n.args]
+        if not lo <= len(args) <= hi:
+            raise ValueError(f"{name} takes {lo}-{hi} arguments in {expr!r}")
+        if series_default and len(args) == 1:
+            args = [("col", "Close")] + args
+        if name == "PREV" and len(args) == 1:
+            args.append(("const", 1.0))
+        if name in _WINDOW_FUNCS:
+            w = args[-1]
+            if w[0] != "const" or w[1] < 1 or w[1] != int(w[1]):
+                raise ValueError(f"{name} needs a positive whole number as its last argument in {expr!r}")
+        return ("fn", name) + tuple(args)
+    raise ValueError(f"Unsupported syntax in {expr!r}")
+
+class Program:
+    """
+    Compiled screens: every distinct sub-expression of every screen appears once in
+    `steps` (children before parents), and each screen's result is one of them.
+    """
+
+    def __init__(self, screens):
+        self.outputs = {}
+        self.steps = []
+        seen = set()
+
+        def visit(node):
+            if node in seen:
+                return
+            if node[0] in ("fn", "op", "and", "or", "not"):
+                for child in node[2:] if node[0] in ("fn", "op") else node[1:]:
+                    visit(child)
+            seen.add(node)
+            self.steps.append(node)
+
+        for name, expr in screens.items():
+            node = parse(expr)
+            visit(node)
+            self.outputs[name] = node
+
+    def run(self, matrix):
+        """
+        Evaluates every step once over a {field: float[ticker, bar]} matrix.
+        Returns: {screen name: bool[ticker, bar]}
+        """
+        values = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for node in self.steps:
+                values[node] = _eval(node, values, matrix)
+        shape = matrix["Close"].shape
+        return {name: np.broadcast_to(_as_bool(values[node]), shape) for name, node in self.outputs.items()}
+
+    def screen(self, tickers, matrix):
+        """Screens on each ticker's last bar. Returns: DataFrame[ticker x screen] of bools."""
+        out = self.run(matrix)
+        last = {name: res[:, -1] if res.shape[1] else np.zeros(len(tickers), dtype=bool) for name, res in out.items()}
+        return pd.DataFrame(last, index=pd.Index(tickers, name="Ticker"))
+
+def compile_screens(screens):
+    """{name: expression} -> Program. Raises ValueError naming the bad expression."""
+    if isinstance(screens, str):
+        screens = {"screen": screens}
+    return Program(screens)
+
+def _as_bool(a):
+    # Arithmetic used as a condition: non-zero passes, NaN (not enough history) does not
+    a = np.asarray(a)
+    return a if a.dtype == bool else np.nan_to_num(a, nan=0.0) != 0
+
+def _eval(node, values, matrix):
+    kind = node[0]
+    if kind == "col":
+        return matrix[node[1]]
+    if kind == "const":
+        return np.float64(node[1])
+    if kind == "not":
+        return ~_as_bool(values[node[1]])
+    if kind == "and":
+        return _as_bool(values[node[1]]) & _as_bool(values[node[2]])
+    if kind == "or":
+        return _as_bool(values[node[1]]) | _as_bool(values[node[2]])
+    if kind == "op":
+        a, b = values[node[2]], values[node[3]]
+        sym = node[1]
+        if sym == "+": return a + b
+        if sym == "-": return a - b
+        if sym == "*": return a * b
+        if sym == "/": return a / b
+        if sym == "<": return a < b
+        if sym == "<=": return a <= b
+        if sym == ">": return a > b
+        if sym == ">=": return a >= b
+        if sym == "==": return a == b
+        return a != b
+
+    name, args = node[1], [values[a] for a in node[2:]]
+    if name in _WINDOW_FUNCS:
+        n = int(node[-1][1])
+    if name == "SMA":
+        return _rolling(args[0], n, np.mean)
+    if name == "HIGHEST":
+        return _rolling(args[0], n, np.max)
+    if name == "LOWEST":
+        return _rolling(args[0], n, np.min)
+    if name == "MIDDLE":
+        return (_rolling(matrix["High"], n, np.max) + _rolling(matrix["Low"], n, np.min)) / 2
+    if name == "EMA":
+        return _ewm(args[0], 2.0 / (n + 1), n)
+    if name == "RSI":
+        return _rsi(args[0], n)
+    if name == "PREV":
+        return _shift(args[0], n)
+    if name == "ABS":
+        return np.abs(args[0])
+    a, b = args
+    if name == "CROSS_ABOVE":
+        return (_shift(a, 1) < _shift(b, 1)) & (a > b)
+    return (_shift(a, 1) > _shift(b, 1)) & (a < b)
+
+def _shift(a, k):
+    a = np.asarray(a, dtype=float)
+    if a.ndim == 0:
+        return a
+    out = np.full(a.shape, np.nan)
+    if k < a.shape[1]:
+        out[:, k:] = a[:, :a.shape[1] - k]
+    return out
+
+def _rolling(a, n, fn):
+    """Trailing window of n bars along axis 1; NaN until n bars are available (like pandas rolling(n))."""
+    a = np.asarray(a, dtype=float)
+    out = np.full(a.shape, np.nan)
+    if n <= a.shape[1]:
+        out[:, n - 1:] = fn(sliding_window_view(a, n, axis=1), axis=-1)
+    return out
+
+def _ewm(a, alpha, min_periods):
+    """pandas ewm(alpha, adjust=False, min_periods) along axis 1, starting at each row's first value."""
+    a = np.asarray(a, dtype=float)
+    out = np.full(a.shape, np.nan)
+    state = np.full(a.shape[0], np.nan)
+    count = np.zeros(a.shape[0])
+    for t in range(a.shape[1]):
+        x = a[:, t]
+        have = ~np.isnan(x)
+        state = np.where(have & np.isnan(state), x, state)
+        state = np.where(have & (count > 0), (1 - alpha) * state + alpha * x, state)
+        count += have
+        out[:, t] = np.where(count >= min_periods, state, np.nan)
+    return out
+
+def _rsi(close, n):
+    """Wilder RSI as app.indicators.calculate_rsi_wilder, for every row at once."""
+    close = np.asarray(close, dtype=float)
+    pad = np.isnan(close)
+    delta = np.full(close.shape, np.nan)
+    delta[:, 1:] = np.diff(close, axis=1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    gain[pad] = np.nan
+    loss[pad] = np.nan
+    rs = _ewm(gain, 1.0 / n, n) / _ewm(loss, 1.0 / n, n)
+    return 100 - 100 / (1 + rs)
+
+def build_matrix(frames, lookback=None):
+    """
+    {ticker: OHLCV frame} -> (tickers, {field: float[ticker, bar]}).
+    Rows are right-aligned on each ticker's own last bar (shorter histories are NaN-padded
+    on the left), so "the last bar" and rolling windows match per-ticker evaluation.
+    """
+    frames = {t: df for t, df in frames.items() if df is not None and len(df)}
+    tickers = list(frames)
+    width = max((len(df) for df in frames.values()), default=0)
+    if lookback:
+        width = min(width, lookback)
+    matrix = {f: np.full((len(tickers), width), np.nan) for f in FIELDS}
+    for i, t in enumerate(tickers):
+        df = frames[t].iloc[-width:] if width else frames[t].iloc[:0]
+        for f in FIELDS:
+            if f in df.columns:
+                matrix[f][i, width - len(df):] = df[f].to_numpy(dtype=float)
+    return tickers, matrix
+
+def strategy_screens(use_trend, use_rsi, min_vol):
+    """
+    The scanner's built-in Donchian strategy (evaluate_ticker) as screens. Filters are
+    written as `not (veto)` so that missing history (NaN) does not veto, as in the scanner.
+    """
+    filters = []
+    if min_vol > 0:
+        filters.append(f"not (Vol_30 < {float(min_vol)})")
+    buy = ["cross_above(Close, Middle)"] + filters
+    if use_trend:
+        buy.append("not (Close < SMA_200)")
+    if use_rsi:
+        buy.append("not (RSI > 70)")
+    sell = ["cross_below(Close, Middle)"] + filters
+    return {"buy": " and ".join(buy), "sell": " and ".join(sell)}
+
+def parse_screens(text):
+    """'name: expression' per line (blank lines and '#' comments skipped) -> {name: expression}."""
+    screens = {}
+    for i, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        name, sep, expr = line.partition(":")
+        if not sep:
+            name, expr = f"screen_{i}", line
+        screens[name.strip()] = expr.strip()
+    return screens
@@ -0,0 +1,217 @@
+# file: app/signal_index.py
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from app.logger import log_error
+from app.market_calendar import load_calendar
+from app.throttle import file_lock
+
+SIGNALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "signals")
+INDEX_COLS = ["Symbol", "Date", "Direction", "Price", "Middle", "RSI", "SMA_200", "Trend"]
+
+def find_crossovers(df):
+    """
+    Every Donchian middle-band crossover in a frame that already has indicators.
+    Same rule as the scanner: strict cross of Close over/under Middle between two bars.
+    Returns: DataFrame[Date, Direction, Price, Middle, RSI, SMA_200, Trend]
+    """
+    close = df['Close'].to_numpy(dtype=float)
+    mid = df['Middle'].to_numpy(dtype=float)
+    buy = np.zeros(len(df), dtype=bool)
+    sell = np.zeros(len(df), dtype=bool)
+    buy[1:] = (close[:-1] < mid[:-1]) & (close[1:] > mid[1:])
+    sell[1:] = (close[:-1] > mid[:-1]) & (close[1:] < mid[1:])
+
+    hits = buy | sell
+    sma = df['SMA_200'].to_numpy(dtype=float)[hits] if 'SMA_200' in df else np.full(hits.sum(), np.nan)
+    rsi = df['RSI'].to_numpy(dtype=float)[hits] if 'RSI' in df else np.full(hits.sum(), np.nan)
+    price = close[hits]
+    return pd.DataFrame({
+        "Date": df.index[hits],
+        "Direction": np.where(buy[hits], "buy", "sell"),
+        "Price": price,
+        "Middle": mid[hits],
+        "RSI": rsi,
+        "SMA_200": sma,
+        "Trend": np.where(price > sma, "Up", "Down")
+    })
+
+class SignalIndex:
+    """
+    Materialized table of historical crossovers for a universe, one per timeframe.
+    Rows are kept sorted by Date so date-range queries are a binary search.
+    Per-symbol state remembers the last indexed bar, so updates only look at new bars.
+    """
+
+    def __init__(self, timeframe="1d", root=SIGNALS_DIR):
+        self.timeframe = timeframe
+        self.root = root
+        self.path = os.path.join(root, f"{timeframe}.parquet")
+        self.state_path = os.path.join(root, f"{timeframe}_state.json")
+        self.table = pd.DataFrame(columns=INDEX_COLS)
+        self.state = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        if os.path.exists(self.path):
+            self.table = pd.read_parquet(self.path)
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                self.state = json.load(f)
+        return self
+
+    def save(self):
+        """
+        Merges this run's symbols into the files under a lock, so a UI scan and a CLI / cron
+        scan saving at the same time don't drop each other's symbols.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(f"signal_index_{self.timeframe}", lock_dir=os.path.join(self.root, ".locks")), self._lock:
+            on_disk = SignalIndex(self.timeframe, self.root).load()
+            table, state = on_disk.table, on_disk.state
+            if self._dirty:
+                mine = self.table[self.table["Symbol"].isin(self._dirty)]
+                table = table[~table["Symbol"].isin(self._dirty)]
+                table = pd.concat([table, mine], ignore_index=True) if not table.empty else mine
+                table = table.sort_values("Date", kind="mergesort").reset_index(drop=True)
+                for symbol in self._dirty:
+                    if symbol in self.state:
+                        state[symbol] = self.state[symbol]
+                    else:
+                        state.pop(symbol, None)
+
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            table.to_parquet(tmp, index=False)
+            os.replace(tmp, self.path)
+            tmp = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+            self.table, self.state = table, state
+            self._dirty.clear()
+
+    def last_indexed(self, symbol):
+        st = self.state.get(symbol)
+        return pd.Timestamp(st["last"]) if st else None
+
+    def update(self, symbol, df):
+        """
+        Adds crossovers of `df` (bars with indicators) not yet in the index.
+        The last indexed bar is re-evaluated because it may have been a partial bar.
+        If the bars' adjustment version (df.attrs['adj_version']) changed since the
+        last update, prices were restated and the symbol is rebuilt from scratch.
+        Returns: number of rows for `symbol` written by this update.
+        """
+        if df is None or len(df) < 2:
+            return 0
+        version = df.attrs.get("adj_version")
+        st = self.state.get(symbol)
+        last = self.last_indexed(symbol) if st and st.get("adj") == version else None
+        new = find_crossovers(df)
+        if last is not None:
+            new = new[new["Date"] >= last]
+        new.insert(0, "Symbol", symbol)
+
+        with self._lock:
+            table = self.table
+            if last is not None:
+                table = table[~((table["Symbol"] == symbol) & (table["Date"] >= last))]
+            else:
+                table = table[table["Symbol"] != symbol]
+            if not new.empty:
+                table = pd.concat([table, new], ignore_index=True) if not table.empty else new.reset_index(drop=True)
+            self.table = table.sort_values("Date", kind="mergesort").reset_index(drop=True)
+            self.state[symbol] = {"last": df.index[-1].isoformat(), "adj": version}
+            self._dirty.add(symbol)
+        return len(new)
+
+    def drop(self, symbol):
+        """Forget a symbol (eg. its history was revised) so the next update rebuilds it."""
+        with self._lock:
+            self.table = self.table[self.table["Symbol"] != symbol].reset_index(drop=True)
+            self.state.pop(symbol, None)
+            self._dirty.add(symbol)
+
+    def subset(self, symbols, root):
+        """Index restricted to `symbols`, stored under root (eg. one shard's slice); save() writes it."""
+        symbols = set(symbols)
+        part = SignalIndex(self.timeframe, root)
+        with self._lock:
+            part.table = self.table[self.table["Symbol"].isin(symbols)].reset_index(drop=True)
+            part.state = {s: v for s, v in self.state.items() if s in symbols}
+        part._dirty = symbols
+        return part
+
+    def absorb(self, part):
+        """Takes over every symbol of another index (eg. a shard's slice); save() writes them."""
+        symbols = set(part.state) | set(part.table["Symbol"])
+        with self._lock:
+            table = self.table[~self.table["Symbol"].isin(symbols)]
+            if not part.table.empty:
+                table = pd.concat([table, part.table], ignore_index=True) if not table.empty else part.table
+            self.table = table.sort_values("Date", kind="mergesort").reset_index(drop=True)
+            self.state.update(part.state)
+            self._dirty |= symbols
+
+    def query(self, start=None, end=None, direction=None, symbols=None,
+              min_rsi=None, max_rsi=None, trend=None):
+        """Filtered view of the index, newest first. start/end and min_rsi are inclusive, max_rsi is not."""
+        t = self.table
+        if t.empty:
+            return t
+        dates = t["Date"]
+        lo = dates.searchsorted(_as_ts(start, dates), side="left") if start is not None else 0
+        hi = dates.searchsorted(_as_ts(end, dates), side="right") if end is not None else len(t)
+        t = t.iloc[lo:hi]
+
+        mask = np.ones(len(t), dtype=bool)
+        if direction:
+            mask &= (t["Direction"] == direction).to_numpy()
+        if symbols is not None:
+            mask &= t["Symbol"].isin(symbols).to_numpy()
+        if min_rsi is not None:
+            mask &= (t["RSI"] >= min_rsi).to_numpy()
+        if max_rsi is not None:
+            mask &= (t["RSI"] < max_rsi).to_numpy()
+        if trend:
+            mask &= (t["Trend"] == trend).to_numpy()
+        return t[mask].iloc[::-1].reset_index(drop=True)
+
+    def recent(self, sessions=5, **filters):
+        """Signals in the last `sessions` trading sessions up to the newest indexed bar."""
+        if self.table.empty:
+            return self.table
+        latest = self.table["Date"].max()
+        if self.state:
+            latest = max(latest, max(_as_ts(v["last"], self.table["Date"]) for v in self.state.values()))
+        start = pd.Timestamp(load_calendar().sessions_back(latest.date(), sessions))
+        return self.query(start=start, **filters)
+
+def _as_ts(value, like):
+    """Timestamp comparable with the index's Date column (tz-aware for intraday bars)."""
+    ts = pd.Timestamp(value)
+    tz = getattr(like.dt, "tz", None)
+    if tz is not None and ts.tzinfo is None:
+        ts = ts.tz_localize(tz)
+    elif tz is None and ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts
+
+_LOADED = {}
+
+def load_signal_index(timeframe="1d", root=SIGNALS_DIR):
+    """Process-wide SignalIndex per timeframe, re-read only when the file on disk changes."""
+    idx = SignalIndex(timeframe, root)
+    try:
+        mtime = os.path.getmtime(idx.path) if os.path.exists(idx.path) else None
+        cached = _LOADED.get((timeframe, root))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        idx.load()
+        _LOADED[(timeframe, root)] = (mtime, idx)
+    except Exception as e:
+        log_error(e, {"action": "load_signal_index", "timeframe": timeframe})
+    return idx
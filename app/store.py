@@ -0,0 +1,149 @@
+# file: app/store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from app.logger import log_error, CONSENT_LOG
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "state.db")
+DEFAULT_USER = "default"
+
+# Pre-SQLite state files, imported once into a new database
+LEGACY_ALERTS = "./data/alerts.json"
+LEGACY_PORTFOLIO = "./data/paper_portfolio.json"
+LEGACY_CONSENT = CONSENT_LOG
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    price REAL NOT NULL,
+    condition TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_user_symbol ON alerts (user_id, symbol);
+CREATE INDEX IF NOT EXISTS alerts_active ON alerts (symbol) WHERE active = 1;
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    user_id TEXT PRIMARY KEY,
+    cash REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    avg_price REAL NOT NULL,
+    qty REAL NOT NULL,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS positions_user_symbol ON positions (user_id, symbol);
+CREATE TABLE IF NOT EXISTS trade_history (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trade_history_user ON trade_history (user_id, id);
+
+CREATE TABLE IF NOT EXISTS consent (
+    user_id TEXT PRIMARY KEY,
+    accepted INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+def connect(path=None):
+    """
+    Per-thread connection to the state database (WAL: readers never block, one writer
+    at a time). Creates the schema and imports legacy JSON state on first use.
+    """
+    path = os.path.abspath(path or DB_PATH)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # isolation_level=None: transactions are explicit (see transaction())
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conns[path] = conn
+        with _init_lock:
+            if path not in _initialized:
+                conn.executescript(SCHEMA)
+                _import_legacy(conn)
+                _initialized.add(path)
+    return conn
+
+@contextmanager
+def _begin(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def transaction(path=None):
+    """
+    Atomic read-modify-write: BEGIN IMMEDIATE takes the write lock up front, so two
+    sessions can't both read the old state and overwrite each other.
+    """
+    return _begin(connect(path))
+
+def query(sql, params=(), path=None):
+    """Read-only query outside any transaction (WAL readers never wait on the writer)."""
+    return connect(path).execute(sql, params).fetchall()
+
+def _import_legacy(conn):
+    """
+    One-time import (tracked by PRAGMA user_version) of alerts.json / paper_portfolio.json,
+    which are then renamed to *.migrated, and of the accepted users in consent.log, which
+    stays in place as the audit trail.
+    """
+    try:
+        with _begin(conn):
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+                return
+            if os.path.exists(LEGACY_ALERTS):
+                with open(LEGACY_ALERTS, "r") as f:
+                    for a in json.load(f):
+                        conn.execute("INSERT INTO alerts (user_id, symbol, price, condition, active, created) "
+                                     "VALUES (?, ?, ?, ?, ?, ?)",
+                                     (DEFAULT_USER, a["symbol"], a["price"], a.get("condition", "above"),
+                                      int(a.get("active", True)), time.time()))
+            if os.path.exists(LEGACY_PORTFOLIO):
+                with open(LEGACY_PORTFOLIO, "r") as f:
+                    pf = json.load(f)
+                conn.execute("INSERT OR REPLACE INTO portfolios (user_id, cash) VALUES (?, ?)",
+                             (DEFAULT_USER, pf["cash"]))
+                for p in pf.get("positions", []):
+                    conn.execute("INSERT INTO positions (user_id, symbol, avg_price, qty, date) VALUES (?, ?, ?, ?, ?)",
+                                 (DEFAULT_USER, p["symbol"], p["avg_price"], p["qty"], p.get("date")))
+                for h in pf.get("history", []):
+                    conn.execute("INSERT INTO trade_history (user_id, ts, entry) VALUES (?, ?, ?)",
+                                 (DEFAULT_USER, time.time(), h))
+            if os.path.exists(LEGACY_CONSENT):
+                with open(LEGACY_CONSENT, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if "Consent: accepted" in line and "User: " in line:
+                            user = line.split("User: ", 1)[1].split(" | ", 1)[0].strip()
+                            conn.execute("INSERT OR REPLACE INTO consent (user_id, accepted, ts) VALUES (?, 1, ?)",
+                                         (user, time.time()))
+            conn.execute("PRAGMA user_version = 1")
+        for path in (LEGACY_ALERTS, LEGACY_PORTFOLIO):
+            if os.path.exists(path):
+                os.replace(path, path + ".migrated")
+    except Exception as e:
+        log_error(e, {"action": "import_legacy_state"})
@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import app.cache as cache
+from app.adjustments import split_provider_bars, apply_factors, factors_changed
+
+def _provider(n=10, split_at=None, div_at=None):
+    """yfinance-style frame (auto_adjust=False, actions=True), Close already split-adjusted."""
+    idx = pd.bdate_range('2024-01-01', periods=n)
+    close = np.linspace(100, 110, n)
+    df = pd.DataFrame({
+        'Open': close - 1, 'High': close + 1, 'Low': close - 2, 'Close': close,
+        'Adj Close': close.copy(), 'Volume': np.full(n, 1000.0),
+        'Dividends': 0.0, 'Stock Splits': 0.0
+    }, index=idx)
+    if div_at is not None:
+        df.iloc[:div_at, df.columns.get_loc('Adj Close')] *= 0.98
+    if split_at is not None:
+        df.iloc[split_at, df.columns.get_loc('Stock Splits')] = 2.0
+    return df
+
+class TestAdjustments(unittest.TestCase):
+    def test_adjusted_view_matches_provider_adjustment(self):
+        df = _provider(split_at=5, div_at=3)
+        raw, factors = split_provider_bars(df)
+        # Raw prices before the split are the pre-split (doubled) prices
+        self.assertAlmostEqual(raw['Close'].iloc[0], df['Close'].iloc[0] * 2)
+        self.assertAlmostEqual(raw['Volume'].iloc[0], 500.0)
+        adj = apply_factors(raw, factors)
+        ratio = df['Adj Close'] / df['Close']
+        np.testing.assert_allclose(adj['Close'], df['Adj Close'])
+        np.testing.assert_allclose(adj['Open'], df['Open'] * ratio)
+        np.testing.assert_allclose(adj['Volume'], df['Volume'])
+        # Only breakpoints are stored: first bar, after the dividend, after the split
+        self.assertEqual(len(factors), 3)
+
+    def test_new_bars_do_not_change_factors(self):
+        _, old = split_provider_bars(_provider(n=10, split_at=5))
+        _, new = split_provider_bars(_provider(n=12, split_at=5).iloc[2:])
+        self.assertFalse(factors_changed(old, new))
+        _, div = split_provider_bars(_provider(n=12, split_at=5, div_at=11))
+        self.assertTrue(factors_changed(old, div))
+
+    def test_cache_shares_raw_and_adjusted(self):
+        orig = cache.CACHE_DIR
+        quiet = lambda *a, **k: None  # keep cache_set / cache_factors out of the real usage.log
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(cache, 'log_usage', quiet), mock.patch.object(cache, 'log_error', quiet):
+            cache.CACHE_DIR = tmp
+            try:
+                raw, factors = split_provider_bars(_provider(split_at=5))
+                self.assertTrue(cache.set_cache('X.NS', '2y', raw, factors=factors))
+                self.assertFalse(cache.set_cache('X.NS', '2y', raw, factors=factors))
+
+                adj = cache.get_cached('X.NS', '2y')
+                unadj = cache.get_cached('X.NS', '2y', auto_adjust=False)
+                self.assertAlmostEqual(unadj['Close'].iloc[0], 2 * adj['Close'].iloc[0])
+                self.assertEqual(adj.attrs['adj_version'], cache.get_adjustment_version('X.NS', '2y'))
+            finally:
+                cache.CACHE_DIR = orig
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import pickle
+import tempfile
+import time
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import app.cache as cache
+
+def _df(n=100):
+    return pd.DataFrame({'Close': np.arange(n, dtype=float)}, index=pd.bdate_range('2024-01-01', periods=n))
+
+class TestTieredCache(unittest.TestCase):
+    def setUp(self):
+        self._orig_dir = cache.CACHE_DIR
+        self._tmp = tempfile.TemporaryDirectory()
+        cache.CACHE_DIR = self._tmp.name
+        cache._MEMORY = cache._MemoryLRU(cache.MEMORY_BUDGET_BYTES)
+        # Keep cache_set / cache_evict lines out of the real data/logs
+        for name in ('log_usage', 'log_error'):
+            p = mock.patch.object(cache, name, lambda *a, **k: None)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        cache.CACHE_DIR = self._orig_dir
+        cache._MEMORY = cache._MemoryLRU(cache.MEMORY_BUDGET_BYTES)
+        self._tmp.cleanup()
+
+    def test_memory_tier_serves_repeat_reads(self):
+        cache.set_cache('A', '2y', _df())
+        before = cache.cache_stats()
+        df = cache.get_cached('A', '2y')
+        df['Extra'] = 1.0  # callers add indicator columns; the cached copy must not change
+        again = cache.get_cached('A', '2y')
+        after = cache.cache_stats()
+        self.assertNotIn('Extra', again.columns)
+        self.assertEqual(after['mem_hits'] - before['mem_hits'], 2)
+        self.assertEqual(after['disk_hits'], before['disk_hits'])
+
+    def test_rewrite_by_other_process_is_seen(self):
+        cache.set_cache('A', '2y', _df())
+        cache.get_cached('A', '2y')
+        path = cache._cache_path('A', '2y')
+        with open(path, 'wb') as f:
+            pickle.dump({"ts": time.time(), "df": _df(5)}, f)
+        os.utime(path, (time.time(), time.time() + 5))
+        self.assertEqual(len(cache.get_cached('A', '2y')), 5)
+
+    def test_memory_budget_evicts_lru(self):
+        one = cache._payload_nbytes({"df": _df()})
+        cache.configure_cache(memory_bytes=int(one * 2.5))
+        for t in ('A', 'B', 'C'):
+            cache.set_cache(t, '2y', _df())
+        stats = cache.cache_stats()
+        self.assertEqual(stats['mem_entries'], 2)
+        self.assertGreaterEqual(stats['mem_evictions'], 1)
+
+    def test_disk_quota_evicts_oldest_access_with_factors(self):
+        for i, t in enumerate(('A', 'B')):
+            cache.set_cache(t, '2y', _df(1000))
+            path = cache._cache_path(t, '2y')
+            with open(cache._cache_path(t, '2y', kind="factors"), 'wb') as f:
+                pickle.dump({"factors": pd.DataFrame(), "version": "x"}, f)
+            os.utime(path, (1000 + i, time.time()))
+        size_b = sum(os.path.getsize(cache._cache_path('B', '2y', kind=k)) for k in ('bars', 'factors'))
+        evicted = cache.enforce_disk_quota(budget_bytes=size_b)
+        self.assertEqual(evicted, 1)
+        self.assertEqual(sorted(os.listdir(cache.CACHE_DIR)), ['B_2y_1d.factors.pkl', 'B_2y_1d.pkl'])
+
+    def test_disk_age_eviction(self):
+        cache.set_cache('A', '2y', _df())
+        os.utime(cache._cache_path('A', '2y'), (time.time(), time.time() - 3600))
+        self.assertEqual(cache.enforce_disk_quota(max_age_seconds=60), 1)
+
+    def test_warm_cache(self):
+        for t in ('A', 'B'):
+            cache.set_cache(t, '2y', _df())
+        cache._MEMORY = cache._MemoryLRU(cache.MEMORY_BUDGET_BYTES)
+        self.assertEqual(cache.warm_cache(['A', 'B', 'MISSING'], '2y'), 2)
+        self.assertEqual(cache.cache_stats()['mem_entries'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
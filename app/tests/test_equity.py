@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+import pandas as pd
+from app.backtest import run_trade_backtest
+from app.equity import equity_curve, equity_metrics, position_mask
+from app.indicators import add_indicators
+
+def _bars(seed, n=500):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    df = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                       'Volume': np.full(n, 1e5)}, index=pd.bdate_range('2021-01-01', periods=n))
+    return add_indicators(df)
+
+class TestEquity(unittest.TestCase):
+    def test_position_mask_ignores_repeated_signals(self):
+        buy = np.array([0, 1, 0, 1, 0, 0, 0], dtype=bool)
+        sell = np.array([1, 0, 0, 0, 1, 1, 0], dtype=bool)
+        self.assertEqual(list(position_mask(buy, sell)), [0, 1, 1, 1, 0, 0, 0])
+
+    def test_curve_compounds_to_trade_ledger(self):
+        for seed in range(5):
+            df = _bars(seed)
+            trades, metrics = run_trade_backtest(df)
+            curve = equity_curve(df)
+            self.assertAlmostEqual(curve['equity'][-1], np.prod(1 + trades['pnl_pct']), places=10)
+            self.assertAlmostEqual(metrics['total_return'], round((curve['equity'][-1] - 1) * 100, 2))
+
+    def test_intra_trade_drawdown_is_visible(self):
+        # One long trade that falls 30% and recovers before the exit: the trade-close
+        # curve never sees it, the bar-level curve does
+        close = [100.0] * 5 + [110, 90, 77, 100, 120, 150] + [130.0] * 5
+        df = pd.DataFrame({'Close': close, 'Middle': [105.0] * 5 + [70.0] * 6 + [140.0] * 5},
+                          index=pd.bdate_range('2024-01-01', periods=len(close)))
+        trades, metrics = run_trade_backtest(df)
+        self.assertEqual(len(trades), 1)
+        self.assertGreater(trades['pnl_pct'].iloc[0], 0)
+        self.assertLess(metrics['max_drawdown'], -29)
+        # Longest stretch below a peak: from the 150 close (Mon 15 Jan) to the end (Mon 22 Jan)
+        self.assertEqual(metrics['dd_bars'], 5)
+        self.assertEqual(metrics['dd_days'], 7)
+
+    def test_metrics(self):
+        df = _bars(1)
+        m = equity_metrics(equity_curve(df))
+        self.assertTrue(0 < m['exposure'] < 100)
+        r = equity_curve(df)['returns'][1:]
+        self.assertAlmostEqual(m['sharpe'], round(r.mean() / r.std(ddof=1) * np.sqrt(252), 2))
+        # No CAGR floor: a short span annualizes over its actual length
+        short = equity_metrics(equity_curve(df.iloc[-60:]))
+        years = (df.index[-1] - df.index[-60]).days / 365.25
+        self.assertAlmostEqual(short['cagr'], round(((1 + short['total_return'] / 100) ** (1 / years) - 1) * 100, 2), delta=0.05)
+
+    def test_precomputed_curve_is_used(self):
+        df = _bars(2)
+        curve = equity_curve(df)
+        _, a = run_trade_backtest(df)
+        _, b = run_trade_backtest(df, curve=curve)
+        self.assertEqual(a, b)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Modules a session imports before it opens any tab
+APP_MODULES = ["app.scanner", "app.cache", "app.ui", "app.backtest", "app.robustness",
+               "app.alerts", "app.paper_trade", "app.news", "app.explain"]
+HEAVY_MODULES = ["yfinance", "plotly", "st_aggrid", "requests", "smtplib"]
+
+# Loaded by the scanner only when a scan ranks, screens or touches the panel / index
+SCANNER_LAZY = ["app.robustness", "app.backtest", "app.equity", "app.screener",
+                "app.price_panel", "app.signal_index"]
+
+def _run(code):
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return out.stdout.strip()
+
+class TestImportTime(unittest.TestCase):
+    def test_heavy_dependencies_are_lazy(self):
+        # Only count modules our package pulls in (streamlit itself may load plotly)
+        code = (
+            "import sys, pandas, numpy, streamlit\n"
+            "before = set(sys.modules)\n"
+            f"for m in {APP_MODULES!r}: __import__(m)\n"
+            "loaded = set(sys.modules) - before\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in loaded))"
+        )
+        self.assertEqual(_run(code), "")
+
+    def test_scanner_defers_its_helpers(self):
+        # Checks what gets loaded rather than timing it, which is flaky on a busy machine
+        code = (
+            "import sys, pandas, numpy, streamlit\n"
+            "import app.scanner\n"
+            f"print(','.join(m for m in {SCANNER_LAZY!r} if m in sys.modules))"
+        )
+        self.assertEqual(_run(code), "")
+
+if __name__ == '__main__':
+    unittest.main()
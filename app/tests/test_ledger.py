@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import app.ledger as ledger
+
+def _bars(seed, n=400):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 2, n))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(n, 1e5)}, index=pd.bdate_range('2022-01-03', periods=n))
+
+class TestLedger(unittest.TestCase):
+    def setUp(self):
+        from app.scanner import with_indicators
+        bars = {f'T{i}.NS': _bars(i) for i in range(6)}
+        bars['SHORT.NS'] = _bars(99, n=20)
+        p = mock.patch.object(ledger, 'indicator_bars', lambda t, tf='1d': with_indicators(t, bars[t], tf))
+        p.start()
+        self.addCleanup(p.stop)
+        self.tickers = list(bars)
+
+    def test_aggregates_all_tickers(self):
+        book, per_ticker, overall = ledger.backtest_universe(self.tickers, max_workers=3)
+        self.assertEqual(sorted(book['Symbol'].unique()), [f'T{i}' for i in range(6)])
+        self.assertEqual(len(per_ticker), 6)
+        self.assertEqual(per_ticker['trades'].sum(), len(book))
+        self.assertEqual(overall['trades'], len(book))
+        self.assertTrue(book['exit_date'].is_monotonic_increasing)
+        self.assertTrue(set(book['status']) <= {'Open', 'Closed'})
+
+    def test_chunked_export_round_trips(self):
+        book, _, _ = ledger.backtest_universe(self.tickers)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv = ledger.export_ledger(book, os.path.join(tmp, 'l.csv'), chunk_rows=7)
+            pq = ledger.export_ledger(book, os.path.join(tmp, 'l.parquet'), chunk_rows=7)
+            self.assertEqual(len(pd.read_csv(csv)), len(book))
+            pd.testing.assert_frame_equal(pd.read_parquet(pq), book)
+            self.assertEqual(sorted(os.listdir(tmp)), ['l.csv', 'l.parquet'])
+
+    def test_empty_export(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = ledger.export_ledger(pd.DataFrame(columns=ledger.LEDGER_COLS), os.path.join(tmp, 'e.csv'))
+            self.assertEqual(list(pd.read_csv(path).columns), ledger.LEDGER_COLS)
+
+if __name__ == '__main__':
+    unittest.main()
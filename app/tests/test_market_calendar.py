@@ -0,0 +1,67 @@
+import datetime as dt
+import unittest
+from unittest import mock
+import app.market_calendar as market_calendar
+from app.market_calendar import MarketCalendar, PUBLISH_DELAY, FALLBACK_TTL, load_calendar
+
+SPEC = {
+    "timezone": "Asia/Kolkata", "session": ["09:15", "15:30"],
+    "holidays": ["2024-03-29", "2024-11-01"],
+    "special_sessions": {"2024-11-01": [["18:00", "19:00"]], "2024-01-20": [["09:15", "15:30"]]}
+}
+CAL = MarketCalendar(SPEC)
+
+def ist(*args):
+    return dt.datetime(*args, tzinfo=CAL.tz)
+
+class TestMarketCalendar(unittest.TestCase):
+    def test_sessions(self):
+        self.assertFalse(CAL.is_trading_day(dt.date(2024, 3, 29)))   # holiday (Friday)
+        self.assertFalse(CAL.is_trading_day(dt.date(2024, 3, 30)))   # Saturday
+        self.assertTrue(CAL.is_trading_day(dt.date(2024, 1, 20)))    # special Saturday session
+        (o, c), = CAL.sessions_on(dt.date(2024, 11, 1))              # Muhurat only
+        self.assertEqual((o.hour, c.hour), (18, 19))
+
+    def test_after_close_fresh_until_next_open(self):
+        # Fetched Thursday evening before a Good Friday holiday: fresh all weekend
+        fetched = ist(2024, 3, 28, 17, 0)
+        self.assertEqual(CAL.next_publish(fetched), ist(2024, 4, 1, 9, 15))
+        self.assertTrue(CAL.is_fresh(fetched, now=ist(2024, 3, 31, 12, 0)))
+        self.assertFalse(CAL.is_fresh(fetched, now=ist(2024, 4, 1, 9, 16)))
+
+    def test_final_bar_after_close(self):
+        fetched = ist(2024, 3, 28, 15, 35)
+        self.assertEqual(CAL.next_publish(fetched), ist(2024, 3, 28, 15, 30) + PUBLISH_DELAY)
+
+    def test_in_session(self):
+        fetched = ist(2024, 3, 28, 10, 20)
+        self.assertEqual(CAL.next_publish(fetched, "15m"), ist(2024, 3, 28, 10, 30))
+        self.assertEqual(CAL.next_publish(fetched, "1d"), ist(2024, 3, 28, 10, 35))
+        self.assertEqual(CAL.next_publish(ist(2024, 3, 28, 15, 25), "1d"), ist(2024, 3, 28, 15, 30))
+
+    def test_epoch_input(self):
+        fetched = ist(2024, 3, 28, 17, 0)
+        self.assertEqual(CAL.next_publish(fetched.timestamp()), ist(2024, 4, 1, 9, 15))
+
+    def test_sessions_back(self):
+        # Mon 1 Apr, back over the weekend and the Good Friday holiday
+        self.assertEqual(CAL.sessions_back(dt.date(2024, 4, 1), 2), dt.date(2024, 3, 28))
+        self.assertEqual(CAL.sessions_back(dt.date(2024, 4, 1), 1), dt.date(2024, 4, 1))
+
+    def test_flat_ttl_past_covered_years(self):
+        # 2025 isn't in SPEC: its holidays are unknown, so use the flat TTL and say so once
+        fetched = ist(2025, 3, 28, 17, 0)
+        with mock.patch.object(market_calendar, 'log_usage') as log:
+            cal = MarketCalendar(SPEC)
+            self.assertTrue(cal.is_fresh(fetched, now=fetched + FALLBACK_TTL / 2))
+            self.assertFalse(cal.is_fresh(fetched, now=fetched + FALLBACK_TTL * 2))
+        self.assertEqual(log.call_count, 1)
+        self.assertIn("2024", log.call_args[0][0])
+
+    def test_shipped_calendar_covers_2026(self):
+        cal = load_calendar()
+        self.assertTrue(cal.covers(dt.date(2026, 12, 31)))
+        self.assertFalse(cal.is_trading_day(dt.date(2026, 1, 26)))   # Republic Day
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app import news
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Markets</title>
+<item><title>Reliance Industries shares hit record high</title>
+  <link>https://www.example.com/markets/ril-record/?utm_source=rss</link>
+  <pubDate>Mon, 15 Jan 2024 10:00:00 +0530</pubDate><description>Oil-to-telecom major rallies.</description></item>
+<item><title>TCS and Infosys lead IT gains</title>
+  <link>https://example.com/markets/it-gains</link>
+  <pubDate>Mon, 15 Jan 2024 12:00:00 +0530</pubDate><description>&lt;b&gt;Tech&lt;/b&gt; stocks up.</description></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Wire</title>
+<entry><title>Reliance Industries shares hit record high</title>
+  <link rel="alternate" href="http://example.com/markets/ril-record#top"/>
+  <updated>2024-01-15T04:30:00Z</updated></entry>
+<entry><title>Larsen &amp; Toubro wins order; itc flat</title>
+  <link href="https://example.com/markets/lt-order"/>
+  <updated>2024-01-16T09:00:00Z</updated><summary>Infra major.</summary></entry>
+</feed>"""
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    feeds = {"/rss.xml": (RSS, '"v1"'), "/atom.xml": (ATOM, '"v1"')}
+    hits = []
+
+    def do_GET(self):
+        self.hits.append((self.path, self.headers.get("If-None-Match")))
+        if self.path not in self.feeds:
+            self.send_error(500)
+            return
+        body, etag = self.feeds[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestNewsIngest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.feeds = {"Wire": f"{base}/atom.xml", "Markets": f"{base}/rss.xml"}
+        cls.broken = {"Broken": f"{base}/missing.xml"}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = self._tmp.name
+        _FeedHandler.hits.clear()
+        # The HTTP 500 fixture would otherwise land in the real data/logs/error.log
+        p = mock.patch.object(news, 'log_error', lambda *a, **k: None)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def ingest(self, feeds=None):
+        return news.ingest_news(news.DEFAULT_UNIVERSE, feeds or self.feeds, root=self.root)
+
+    def test_ingest_dedups_and_indexes(self):
+        stats = self.ingest()
+        self.assertEqual(stats["fetched"], 2)
+        # The RSS and Atom copies of the RIL story normalize to the same URL
+        self.assertEqual(stats["new"], 3)
+        self.assertEqual(stats["articles"], 3)
+
+        ril = news.fetch_news("RELIANCE.NS", root=self.root)
+        self.assertEqual(len(ril), 1)
+        self.assertEqual(ril[0]["source"], "Wire")  # the first feed listed wins a duplicate
+        self.assertEqual([a["title"] for a in news.fetch_news("INFY.NS", root=self.root)],
+                         ["TCS and Infosys lead IT gains"])
+        self.assertEqual(len(news.fetch_news("TCS.NS", root=self.root)), 1)
+        self.assertEqual(len(news.fetch_news("LT.NS", root=self.root)), 1)
+        # Lower-case "itc" is not the ITC symbol
+        self.assertEqual(news.fetch_news("ITC.NS", root=self.root), [])
+
+    def test_conditional_get_on_refetch(self):
+        self.ingest()
+        stats = self.ingest()
+        self.assertEqual(stats["not_modified"], 2)
+        self.assertEqual(stats["new"], 0)
+        self.assertEqual(stats["articles"], 3)
+        self.assertEqual([etag for _, etag in _FeedHandler.hits].count('"v1"'), 2)
+
+    def test_failing_feed_does_not_break_ingest(self):
+        stats = self.ingest({**self.feeds, **self.broken})
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["articles"], 3)
+        self.assertTrue(os.path.exists(os.path.join(self.root, "index.json")))
+
+    def test_malformed_body_keeps_last_good_copy(self):
+        url = self.feeds["Markets"].replace("rss.xml", "flaky.xml")
+        with mock.patch.dict(_FeedHandler.feeds, {"/flaky.xml": (RSS, '"v1"')}):
+            self.assertEqual(news.fetch_feed("Flaky", url, root=self.root)[1], "fetched")
+            _FeedHandler.feeds["/flaky.xml"] = (b"<rss><channel><item>", '"v2"')
+            items, status = news.fetch_feed("Flaky", url, root=self.root)
+            self.assertEqual((len(items), status), (2, "stale"))
+            # The bad body's ETag was not kept, so the publisher's fix is fetched, not a 304
+            _FeedHandler.feeds["/flaky.xml"] = (ATOM, '"v2"')
+            items, status = news.fetch_feed("Flaky", url, root=self.root)
+        self.assertEqual((len(items), status), (2, "fetched"))
+        self.assertEqual([etag for _, etag in _FeedHandler.hits], [None, '"v1"', '"v1"'])
+        self.assertIn("lt-order", items[1]["link"])
+
+    def test_normalize_url(self):
+        self.assertEqual(news.normalize_url("HTTP://WWW.Example.com/a/?utm_medium=x&b=2&a=1#frag"),
+                         "https://example.com/a?a=1&b=2")
+
+if __name__ == '__main__':
+    unittest.main()
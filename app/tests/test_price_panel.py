@@ -0,0 +1,116 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import app.price_panel as price_panel
+import app.scanner as scanner
+from app.price_panel import publish_panel, load_panel, KEEP_VERSIONS
+
+def _bars(start, n, base=100.0):
+    idx = pd.bdate_range(start, periods=n)
+    close = base + np.arange(n, dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(n, 1000.0)}, index=idx)
+
+class TestPricePanel(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_views_are_zero_copy_and_aligned(self):
+        a = _bars('2024-01-01', 10)
+        a.attrs['adj_version'] = 'v1'
+        b = _bars('2024-01-08', 5, base=50.0)
+        panel = publish_panel({'A': a, 'B': b}, '1d', self.root)
+
+        view = panel.view('A', 'Close', '2024-01-03', '2024-01-05')
+        self.assertEqual(list(view), [102.0, 103.0, 104.0])
+        self.assertIsInstance(view.base, np.memmap)
+        self.assertFalse(view.flags.writeable)
+        # B has no bars before its start: NaN in the shared date axis
+        self.assertTrue(np.isnan(panel.view('B', 'Close', end='2024-01-05')).all())
+
+        frame = panel.frame('A')
+        pd.testing.assert_frame_equal(frame, a, check_freq=False)
+        self.assertEqual(frame.attrs['adj_version'], 'v1')
+        self.assertEqual(len(panel.frame('B')), 5)
+
+    def test_readers_swap_to_new_version(self):
+        first = publish_panel({'A': _bars('2024-01-01', 5)}, '1d', self.root)
+        self.assertIs(load_panel('1d', self.root), first)
+        old_view = first.view('A')
+        for i in range(KEEP_VERSIONS + 1):
+            latest = publish_panel({'A': _bars('2024-01-01', 6 + i)}, '1d', self.root)
+        current = load_panel('1d', self.root)
+        self.assertEqual(current.version, latest.version)
+        self.assertEqual(len(current.frame('A')), 6 + KEEP_VERSIONS)
+        # Old versions are pruned, but views a reader still holds keep working
+        self.assertEqual(len([d for d in os.listdir(self.root) if d.startswith('1d-')]), KEEP_VERSIONS)
+        self.assertEqual(old_view[-1], 104.0)
+
+    def test_frame_wraps_the_mapped_pages(self):
+        b = _bars('2024-01-08', 5, base=50.0)
+        gappy = _bars('2024-01-01', 10).drop(pd.Timestamp('2024-01-03'))
+        panel = publish_panel({'A': _bars('2024-01-01', 10), 'B': b, 'G': gappy}, '1d', self.root)
+
+        for t in ('A', 'B'):
+            frame = panel.frame(t)
+            self.assertTrue(np.shares_memory(frame['Close'].to_numpy(), panel.values))
+        pd.testing.assert_frame_equal(panel.frame('B'), b, check_freq=False)
+        # A gap inside the run can't be a view: copied, gap dropped
+        frame = panel.frame('G')
+        self.assertFalse(np.shares_memory(frame['Close'].to_numpy(), panel.values))
+        pd.testing.assert_frame_equal(frame, gappy, check_freq=False)
+
+    def test_freshness_is_per_ticker(self):
+        old, new = _bars('2024-01-01', 5), _bars('2024-01-01', 5)
+        old.attrs['fetched_at'] = time.time() - 30 * 86400
+        new.attrs['fetched_at'] = time.time()
+        panel = publish_panel({'A': old, 'B': new}, '1d', self.root)
+        self.assertEqual(panel.fetched('A'), old.attrs['fetched_at'])
+        self.assertEqual(panel.frame('B').attrs['fetched_at'], new.attrs['fetched_at'])
+
+        # Published just now, but A's bars are a month old: only A goes to the cache / provider
+        fresh = _bars('2024-01-01', 6)
+        with mock.patch.object(price_panel, 'load_panel', lambda tf: panel), \
+                mock.patch.object(scanner, 'fetch_data_with_retry', lambda *a, **k: fresh):
+            self.assertIs(scanner.fetch_bars('A'), fresh)
+            self.assertTrue(np.shares_memory(scanner.fetch_bars('B')['Close'].to_numpy(), panel.values))
+
+    def test_refresh_merges_into_current_panel(self):
+        old, other = _bars('2024-01-01', 5), _bars('2024-01-01', 5, base=50.0)
+        old.attrs['fetched_at'] = time.time() - 30 * 86400
+        other.attrs['fetched_at'] = time.time()
+        publish_panel({'A': old, 'OTHER': other}, '1d', self.root)
+
+        fetched = []
+        def fetch_bars(ticker, timeframe='1d', use_panel=True):
+            fetched.append(ticker)
+            df = _bars('2024-01-01', 6)
+            df.attrs['fetched_at'] = time.time()
+            return df
+
+        with mock.patch.object(scanner, 'fetch_bars', fetch_bars):
+            panel = scanner.refresh_panel(['A', 'C'], '1d', root=self.root)
+        # Stale A and missing C are read again; another universe's OTHER is carried over
+        self.assertEqual(sorted(fetched), ['A', 'C'])
+        self.assertEqual(sorted(panel.tickers), ['A', 'C', 'OTHER'])
+        self.assertEqual(len(panel.frame('A')), 6)
+        self.assertEqual(panel.fetched('OTHER'), other.attrs['fetched_at'])
+        pd.testing.assert_frame_equal(panel.frame('OTHER'), other, check_freq=False)
+
+        with mock.patch.object(scanner, 'fetch_bars', fetch_bars):
+            self.assertIs(scanner.refresh_panel(['A', 'C'], '1d', root=self.root), panel)
+        self.assertEqual(len(fetched), 2)
+
+    def test_missing_panel(self):
+        self.assertIsNone(load_panel('1wk', self.root))
+
+if __name__ == '__main__':
+    unittest.main()
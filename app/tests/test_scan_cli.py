@@ -0,0 +1,66 @@
+import functools
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import app.price_panel as price_panel
+import app.scan as scan
+import app.scan_store as scan_store
+import app.scanner as scanner
+from app.scan_state import ScanState
+from app.signal_index import SignalIndex
+
+def _bars(ticker, period="2y", interval="1d", retries=3):
+    rng = np.random.default_rng(sum(map(ord, ticker)))
+    close = 100 + np.cumsum(rng.normal(0, 1, 260))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(260, 1e6)}, index=pd.bdate_range('2023-01-02', periods=260))
+
+class TestScanCli(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        tmp = self._tmp.name
+        self.universe = os.path.join(tmp, "universe.txt")
+        with open(self.universe, "w") as f:
+            f.write("AAA\nBBB\nGC=F\n")
+        # Everything the CLI persists goes under tmp instead of data/
+        patches = [
+            mock.patch.object(scanner, 'fetch_data_with_retry', _bars),
+            mock.patch.object(price_panel, 'load_panel', lambda *a, **k: None),
+            mock.patch.object(scanner, 'warm_cache', lambda *a, **k: 0),
+            mock.patch.object(scanner, 'log_error', lambda *a, **k: None),
+            mock.patch.object(scan, 'load_signal_index', lambda tf: SignalIndex(tf, os.path.join(tmp, "signals")).load()),
+            mock.patch.object(scan, 'ScanState', lambda tf: ScanState(tf, os.path.join(tmp, "signals"))),
+            mock.patch.object(scan, 'refresh_panel', functools.partial(scanner.refresh_panel, root=os.path.join(tmp, "panel"))),
+            mock.patch.object(scan_store, 'LATEST_FILE', os.path.join(tmp, "scans", "latest.json")),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_scan_writes_result_and_latest_pointer(self):
+        out = os.path.join(self._tmp.name, "scans", "run-1")
+        self.assertEqual(scan.main(["--universe", self.universe, "--output", out]), 0)
+
+        for name in scan_store.TABLES:
+            self.assertTrue(os.path.exists(os.path.join(out, f"{name}.parquet")))
+        self.assertEqual(scan_store.latest_scan_path(), os.path.abspath(out))
+
+        res = scan_store.load_scan_result(scan_store.latest_scan_path())
+        self.assertEqual(sorted(res["snapshots"]["Symbol"]), ["AAA", "BBB", "GC"])
+        # The provider ticker is kept for the ledger; it can't be rebuilt from "GC"
+        self.assertEqual(sorted(res["snapshots"]["Ticker"]), ["AAA.NS", "BBB.NS", "GC=F"])
+        self.assertEqual(res["meta"]["universe"], self.universe)
+        self.assertEqual(res["meta"]["timing"]["tickers"], 3)
+
+    def test_no_latest_leaves_pointer(self):
+        out = os.path.join(self._tmp.name, "scans", "run-2")
+        self.assertEqual(scan.main(["--universe", self.universe, "--output", out, "--no-latest"]), 0)
+        self.assertTrue(os.path.exists(os.path.join(out, "meta.json")))
+        self.assertIsNone(scan_store.latest_scan_path())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import app.robustness as robustness
+import app.scanner as scanner
+from app.robustness import robustness_report
+from app.scan_state import ScanState, data_fingerprint
+from app.signal_index import SignalIndex
+
+def _bars(n=260, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(n, 1e6)}, index=pd.bdate_range('2023-01-02', periods=n))
+
+class TestIncrementalScan(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.bars = {'A.NS': _bars(seed=1), 'B.NS': _bars(seed=2)}
+        # Memoized reports from other tests would hide robustness_report calls
+        scanner._ROBUSTNESS.clear()
+        scanner._EQUITY.clear()
+        patches = [mock.patch.object(scanner, 'fetch_bars', lambda t, tf='1d': self.bars[t]),
+                   mock.patch.object(scanner, 'warm_cache', lambda *a, **k: 0)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def scan(self, force=False):
+        state = ScanState(root=self._tmp.name).load()
+        index = self.index
+        res = scanner.run_scan(list(self.bars), True, True, 0, signal_index=index, scan_state=state, force=force)
+        state.save()
+        return res
+
+    def test_unchanged_tickers_are_reused(self):
+        self.index = SignalIndex(root=self._tmp.name)
+        first = self.scan()
+        self.assertEqual(first['timing']['reused'], 0)
+
+        with mock.patch.object(scanner, 'add_indicators', side_effect=scanner.add_indicators) as calc:
+            again = self.scan()
+            self.assertEqual(again['timing']['reused'], 2)
+            self.assertEqual(calc.call_count, 0)
+            self.assertEqual(again['snapshots'], first['snapshots'])
+
+            # One ticker gets a new bar: only it is recomputed
+            self.bars['A.NS'] = _bars(261, seed=1)
+            third = self.scan()
+            self.assertEqual(third['timing']['reused'], 1)
+            self.assertEqual(calc.call_count, 1)
+
+            self.assertEqual(self.scan(force=True)['timing']['reused'], 0)
+
+    def test_signals_are_ranked_once(self):
+        self.index = SignalIndex(root=self._tmp.name)
+        self.bars = {f'T{i}.NS': _bars(seed=i) for i in range(30)}
+        with mock.patch.object(robustness, 'robustness_report', side_effect=robustness_report) as rank:
+            first = self.scan()
+            signaled = first['buys'] + first['sells']
+            self.assertTrue(signaled)
+            self.assertEqual(rank.call_count, len(signaled))
+            self.assertTrue(all('Score' in row for row in signaled))
+            scores = [r['Score'] for r in first['buys']]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+            scanner._ROBUSTNESS.clear()
+            again = self.scan()
+            self.assertEqual(rank.call_count, len(signaled))   # reused rows keep their ranking
+            self.assertEqual(again['buys'], first['buys'])
+
+    def test_failed_report_does_not_abort_ranking(self):
+        self.index = SignalIndex(root=self._tmp.name)
+        self.bars = {f'T{i}.NS': _bars(seed=i) for i in range(100)}
+        buys = [r['Symbol'] for r in self.scan()['buys']]
+        self.assertGreaterEqual(len(buys), 2)
+        # The top-ranked buy's report fails on a full rescan
+        failing = self.bars[buys[0] + '.NS']['Close'].iloc[-1]
+        def flaky(df, *args, **kwargs):
+            if df['Close'].iloc[-1] == failing:
+                raise ValueError("boom")
+            return robustness_report(df, *args, **kwargs)
+
+        scanner._ROBUSTNESS.clear()
+        os.remove(ScanState(root=self._tmp.name).path)
+        with mock.patch.object(robustness, 'robustness_report', side_effect=flaky), \
+                mock.patch.object(scanner, 'log_error', lambda *a, **k: None):
+            res = self.scan(force=True)
+        self.assertEqual([r['Symbol'] for r in res['buys']], buys[1:] + buys[:1])
+        self.assertIsNone(res['buys'][-1]['Score'])
+        scores = [r['Score'] for r in res['buys'][:-1]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        # The failure isn't remembered: the next scan ranks that ticker again
+        res = self.scan()
+        self.assertEqual([r['Symbol'] for r in res['buys']], buys)
+        self.assertIsNotNone(res['buys'][0]['Score'])
+        self.assertEqual(res['timing']['reused'], 99)
+
+    def test_fingerprint_tracks_revisions(self):
+        df = _bars()
+        fp = data_fingerprint(df)
+        revised = df.copy()
+        revised.iloc[10, 3] += 1
+        self.assertNotEqual(data_fingerprint(revised), fp)
+        revised = df.copy()
+        revised.attrs['adj_version'] = 'abc'
+        self.assertNotEqual(data_fingerprint(revised), fp)
+
+    def test_save_merges_concurrent_writers(self):
+        a = ScanState(root=self._tmp.name).load()
+        b = ScanState(root=self._tmp.name).load()
+        a.record('A', 'x', 'p', '2024-01-01', None, None, {})
+        b.record('B', 'y', 'p', '2024-01-01', None, None, {})
+        a.save()
+        b.save()
+        self.assertEqual(sorted(ScanState(root=self._tmp.name).load().entries), ['A', 'B'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+from app.indicators import add_indicators
+from app.scanner import evaluate_ticker
+from app.screener import compile_screens, build_matrix, strategy_screens, parse, parse_screens
+
+def _bars(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 2, n))
+    return pd.DataFrame({'Open': close, 'High': close + rng.uniform(0, 2, n), 'Low': close - rng.uniform(0, 2, n),
+                         'Close': close, 'Volume': rng.uniform(5e4, 2e5, n)},
+                        index=pd.bdate_range('2022-01-03', periods=n))
+
+class TestScreener(unittest.TestCase):
+    def test_indicators_match_pandas(self):
+        frames = {'A': _bars(300, 1), 'B': _bars(120, 2)}   # B is shorter: left-padded
+        tickers, matrix = build_matrix(frames)
+        from app.screener import _eval
+        for alias, col in [('SMA_200', 'SMA_200'), ('RSI', 'RSI'), ('Middle', 'Middle'), ('Vol_30', 'Vol_30')]:
+            node = parse(alias)
+            values = {}
+            for step in compile_screens({'x': alias}).steps:
+                values[step] = _eval(step, values, matrix)
+            for i, t in enumerate(tickers):
+                expected = add_indicators(frames[t].copy())[col].to_numpy()
+                got = values[node][i, -len(expected):]
+                np.testing.assert_allclose(got, expected, rtol=1e-9, equal_nan=True, err_msg=f"{t} {alias}")
+
+    def test_strategy_screens_match_evaluate_ticker(self):
+        frames = {f'T{i}': _bars(260, i) for i in range(40)}
+        for use_trend, use_rsi, min_vol in [(True, True, 0), (False, False, 0), (True, True, 100000)]:
+            program = compile_screens(strategy_screens(use_trend, use_rsi, min_vol))
+            # Screen every bar of history, compare with the scanner evaluated on each prefix
+            tickers, matrix = build_matrix(frames)
+            out = program.run(matrix)
+            for i, t in enumerate(tickers[:5]):
+                df = add_indicators(frames[t].copy())
+                for end in range(200, 260):
+                    buy, sell, _ = evaluate_ticker(t, df.iloc[:end], use_trend, use_rsi, min_vol)
+                    self.assertEqual(bool(out['buy'][i, end - 1]), buy is not None)
+                    self.assertEqual(bool(out['sell'][i, end - 1]), sell is not None)
+
+    def test_common_subexpressions_are_shared(self):
+        program = compile_screens({
+            'a': 'Close > SMA(200) and RSI(14) < 70',
+            'b': 'Close > SMA_200 and RSI > 30',
+        })
+        self.assertEqual(sum(1 for s in program.steps if s[:2] == ('fn', 'SMA')), 1)
+        self.assertEqual(sum(1 for s in program.steps if s[:2] == ('fn', 'RSI')), 1)
+
+    def test_screen_last_bar(self):
+        frames = {'UP': pd.DataFrame({'Close': np.arange(1.0, 31.0)}), 'DOWN': pd.DataFrame({'Close': np.arange(30.0, 0, -1)})}
+        hits = compile_screens({'up': 'Close > PREV(Close) and Close > SMA(10)', 'x': '0 < Close < 5'}).screen(*build_matrix(frames))
+        self.assertEqual(hits['up'].to_dict(), {'UP': True, 'DOWN': False})
+        self.assertEqual(hits['x'].to_dict(), {'UP': False, 'DOWN': True})
+
+    def test_errors(self):
+        for bad in ['Close >', 'FOO(3)', 'Close > Price', 'SMA(Close, Volume)', '__import__("os")', 'Close.real']:
+            with self.assertRaises(ValueError):
+                compile_screens({'bad': bad})
+
+    def test_parse_screens(self):
+        self.assertEqual(parse_screens("# mine\nbuy: Close > 1\n\nClose < 2"), {'buy': 'Close > 1', 'screen_4': 'Close < 2'})
+
+if __name__ == '__main__':
+    unittest.main()
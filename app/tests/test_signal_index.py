@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+import pandas as pd
+from app.signal_index import SignalIndex, find_crossovers
+
+def _frame(closes, start='2024-01-01'):
+    idx = pd.bdate_range(start, periods=len(closes))
+    return pd.DataFrame({
+        'Close': closes, 'Middle': [100.0] * len(closes),
+        'RSI': [50.0] * len(closes), 'SMA_200': [90.0] * len(closes)
+    }, index=idx)
+
+class TestSignalIndex(unittest.TestCase):
+    def test_find_crossovers(self):
+        sig = find_crossovers(_frame([95, 105, 106, 99, 101]))
+        self.assertEqual(list(sig['Direction']), ['buy', 'sell', 'buy'])
+        self.assertEqual(list(sig['Price']), [105, 99, 101])
+
+    def test_incremental_update_matches_rebuild(self):
+        closes = [95, 105, 106, 99, 101, 98, 97, 103]
+        with tempfile.TemporaryDirectory() as tmp:
+            inc = SignalIndex(root=tmp)
+            inc.update('AAA', _frame(closes[:5]))
+            inc.update('AAA', _frame(closes))
+            full = SignalIndex(root=tmp)
+            full.update('AAA', _frame(closes))
+            pd.testing.assert_frame_equal(inc.table, full.table)
+
+            inc.save()
+            loaded = SignalIndex(root=tmp).load()
+            self.assertEqual(len(loaded.table), 5)
+            self.assertEqual(loaded.last_indexed('AAA'), pd.Timestamp(_frame(closes).index[-1]))
+
+    def test_save_merges_concurrent_writers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            seed = SignalIndex(root=tmp)
+            seed.update('AAA', _frame([95, 105]))
+            seed.update('CCC', _frame([95, 105]))
+            seed.save()
+
+            ui = SignalIndex(root=tmp).load()
+            cron = SignalIndex(root=tmp).load()
+            ui.update('AAA', _frame([95, 105, 99]))
+            cron.update('BBB', _frame([95, 105]))
+            cron.drop('CCC')
+            ui.save()
+            cron.save()
+
+            merged = SignalIndex(root=tmp).load()
+            self.assertEqual(sorted(merged.state), ['AAA', 'BBB'])
+            self.assertEqual(list(merged.table[merged.table['Symbol'] == 'AAA']['Direction']), ['buy', 'sell'])
+            self.assertEqual(set(merged.table['Symbol']), {'AAA', 'BBB'})
+            self.assertEqual(sorted(cron.state), ['AAA', 'BBB'])   # the saver sees the merged index
+
+    def test_shard_slices_merge(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            shared = SignalIndex(root=tmp)
+            shared.update('AAA', _frame([95, 105]))
+            shared.update('BBB', _frame([95, 105]))
+            shared.save()
+
+            # A shard scans BBB / CCC against the shared index and writes only its own slice
+            shard = SignalIndex(root=tmp).load()
+            shard.update('BBB', _frame([95, 105, 99]))
+            shard.update('CCC', _frame([105, 95]))
+            shard.subset(['BBB', 'CCC'], f"{tmp}/shard").save()
+            self.assertEqual(sorted(SignalIndex(root=tmp).load().state), ['AAA', 'BBB'])
+
+            merged = SignalIndex(root=tmp).load()
+            merged.absorb(SignalIndex(root=f"{tmp}/shard").load())
+            merged.save()
+            on_disk = SignalIndex(root=tmp).load()
+            self.assertEqual(sorted(on_disk.state), ['AAA', 'BBB', 'CCC'])
+            self.assertEqual(list(on_disk.table[on_disk.table['Symbol'] == 'BBB']['Direction']), ['buy', 'sell'])
+            self.assertEqual(list(on_disk.table[on_disk.table['Symbol'] == 'CCC']['Direction']), ['sell'])
+
+    def test_partial_last_bar_is_reevaluated(self):
+        idx = SignalIndex(root=tempfile.gettempdir())
+        idx.update('AAA', _frame([95, 105]))       # intraday: last bar crossed
+        idx.update('AAA', _frame([95, 99]))        # same bar closed below the band
+        self.assertTrue(idx.table.empty)
+
+    def test_query(self):
+        idx = SignalIndex(root=tempfile.gettempdir())
+        idx.update('AAA', _frame([95, 105, 99, 101]))
+        b = _frame([95, 105, 99, 101])
+        b['RSI'] = 65.0
+        idx.update('BBB', b)
+        buys = idx.query(direction='buy', max_rsi=60)
+        self.assertEqual(set(buys['Symbol']), {'AAA'})
+        self.assertEqual(len(idx.recent(2, direction='buy')), 2)
+        self.assertEqual(len(idx.query(start='2024-01-03', end='2024-01-03')), 2)
+
+if __name__ == '__main__':
+    unittest.main()
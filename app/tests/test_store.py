@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from app import store
+from app.alerts import save_alert, load_alerts, check_alerts
+from app.paper_trade import get_portfolio, execute_trade
+from app.news import check_consent, record_consent
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        d = self._tmp.name
+        patches = [mock.patch.object(store, 'DB_PATH', os.path.join(d, 'state.db')),
+                   mock.patch.object(store, 'LEGACY_ALERTS', os.path.join(d, 'alerts.json')),
+                   mock.patch.object(store, 'LEGACY_PORTFOLIO', os.path.join(d, 'paper_portfolio.json')),
+                   mock.patch.object(store, 'LEGACY_CONSENT', os.path.join(d, 'consent.log')),
+                   # Keep test runs out of the real data/logs
+                   mock.patch('app.news.log_consent', lambda *a, **k: None),
+                   mock.patch('app.alerts.log_usage', lambda *a, **k: None),
+                   mock.patch('app.alerts.log_error', lambda *a, **k: None),
+                   mock.patch('app.paper_trade.log_error', lambda *a, **k: None),
+                   mock.patch('app.store.log_error', lambda *a, **k: None)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_concurrent_trades_never_overspend(self):
+        # 20 threads each buy 10k of stock against 100k cash: exactly 10 may succeed
+        results = []
+        def buy(i):
+            results.append(execute_trade("BUY", f"S{i}.NS", 100.0, 100)[0])
+        threads = [threading.Thread(target=buy, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        pf = get_portfolio()
+        self.assertEqual(sum(results), 10)
+        self.assertEqual(len(pf['positions']), 10)
+        self.assertEqual(len(pf['history']), 10)
+        self.assertAlmostEqual(pf['cash'], 0.0)
+
+    def test_sell_closes_oldest_position(self):
+        execute_trade("BUY", "A.NS", 100.0, 10, date="2024-01-01")
+        execute_trade("BUY", "A.NS", 120.0, 5, date="2024-01-02")
+        self.assertEqual(execute_trade("SELL", "A.NS", 110.0, 0), (True, "Trade Executed"))
+        pf = get_portfolio()
+        self.assertEqual(pf['positions'], [{"symbol": "A.NS", "avg_price": 120.0, "qty": 5, "date": "2024-01-02"}])
+        self.assertAlmostEqual(pf['cash'], 100000 - 1000 - 600 + 1100)
+        self.assertIn("PnL: 100.00", pf['history'][-1])
+        self.assertEqual(execute_trade("SELL", "B.NS", 1.0, 0), (False, "Position not found"))
+
+    def test_alert_triggers_once_across_threads(self):
+        save_alert("A.NS", 100.0, "below")
+        save_alert("B.NS", 50.0, "above")
+        fired = []
+        threads = [threading.Thread(target=lambda: fired.extend(check_alerts({"A.NS": 90.0, "B.NS": 40.0})))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(fired), 1)
+        self.assertIn("A.NS", fired[0])
+        self.assertEqual([a['active'] for a in load_alerts()], [False, True])
+        self.assertEqual(len(load_alerts(symbol="B.NS")), 1)
+
+    def test_consent_is_per_user(self):
+        self.assertFalse(check_consent())
+        record_consent("u1")
+        self.assertTrue(check_consent())
+        self.assertTrue(check_consent("u1"))
+        self.assertFalse(check_consent("u2"))
+
+    def test_legacy_files_imported_once(self):
+        with open(store.LEGACY_ALERTS, 'w') as f:
+            json.dump([{"symbol": "A.NS", "price": 10, "condition": "above", "active": True}], f)
+        with open(store.LEGACY_PORTFOLIO, 'w') as f:
+            json.dump({"cash": 500, "positions": [{"symbol": "A.NS", "avg_price": 9, "qty": 1, "date": "2024-01-01"}],
+                       "history": ["BOUGHT 1 A.NS @ 9 on 2024-01-01"]}, f)
+        with open(store.LEGACY_CONSENT, 'w') as f:
+            f.write("User: u1 | Consent: accepted\n")
+
+        self.assertEqual(get_portfolio()['cash'], 500)
+        self.assertEqual(len(get_portfolio()['positions']), 1)
+        self.assertEqual(load_alerts()[0]['symbol'], "A.NS")
+        self.assertTrue(check_consent("u1"))
+        self.assertTrue(os.path.exists(store.LEGACY_ALERTS + ".migrated"))
+        self.assertTrue(os.path.exists(store.LEGACY_CONSENT))
+
+        # A new process (fresh connection) does not import again
+        store._initialized.clear()
+        store._local.conns = {}
+        with open(store.LEGACY_ALERTS, 'w') as f:
+            json.dump([{"symbol": "Z.NS", "price": 1, "condition": "above", "active": True}], f)
+        self.assertEqual([a['symbol'] for a in load_alerts()], ["A.NS"])
+
+if __name__ == '__main__':
+    unittest.main()
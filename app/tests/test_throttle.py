@@ -0,0 +1,171 @@
+import contextlib
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from unittest import mock
+import pandas as pd
+import app.scanner as scanner
+from app.throttle import SingleFlight, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+    def __call__(self):
+        return self.t
+    def sleep(self, s):
+        self.t += s
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_run(self):
+        flight = SingleFlight()
+        calls = []
+        gate = threading.Event()
+
+        def slow():
+            calls.append(1)
+            gate.wait(2)
+            return 42
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('k', slow))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [42] * 8)
+        # Once finished, the next call runs again
+        self.assertEqual(flight.do('k', lambda: 7), 7)
+
+    def test_error_is_shared(self):
+        flight = SingleFlight()
+        calls = []
+        gate = threading.Event()
+        start = threading.Barrier(8)
+
+        def failing():
+            calls.append(1)
+            gate.wait(2)
+            raise ValueError("boom")
+
+        errors = []
+        def caller():
+            start.wait()
+            try:
+                flight.do('k', failing)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=caller) for _ in range(8)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(errors), 8)
+        self.assertEqual(len({id(e) for e in errors}), 1)
+
+class FakeBucket:
+    def __init__(self):
+        self.pauses = []
+    def acquire(self, timeout=None):
+        return True
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+class TestDownload(unittest.TestCase):
+    def setUp(self):
+        self.bucket = FakeBucket()
+        patches = [mock.patch.object(scanner, '_PROVIDER', self.bucket),
+                   mock.patch.object(scanner, 'file_lock', lambda *a, **k: contextlib.nullcontext()),
+                   mock.patch.object(scanner, 'log_error', lambda *a, **k: None)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_concurrent_misses_download_once(self):
+        cached = {}
+        downloads = []
+        gate = threading.Event()
+
+        def download(ticker, period, interval, retries, key):
+            downloads.append(key)
+            gate.wait(2)
+            cached[ticker] = pd.DataFrame({'Close': [1.0]})
+            return True
+
+        start = threading.Barrier(8)
+        results = []
+        def caller():
+            start.wait()
+            results.append(scanner.fetch_data_with_retry('AAA.NS'))
+
+        with mock.patch.object(scanner, 'get_cached', lambda ticker, *a, **k: cached.get(ticker)), \
+                mock.patch.object(scanner, '_download', download):
+            threads = [threading.Thread(target=caller) for _ in range(8)]
+            for t in threads:
+                t.start()
+            time.sleep(0.1)
+            gate.set()
+            for t in threads:
+                t.join()
+        # The default period is the daily base period, the same series fetch_bars caches
+        self.assertEqual(downloads, ['AAA.NS_5y_1d'])
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(df is not None for df in results))
+
+    def test_empty_frame_backs_off(self):
+        # yfinance returns an empty frame, not an error, when it is rate limited
+        yf = types.SimpleNamespace(download=mock.Mock(return_value=pd.DataFrame()))
+        with mock.patch.dict(sys.modules, {'yfinance': yf}), \
+                mock.patch.object(scanner, 'get_cached', lambda *a, **k: None):
+            self.assertFalse(scanner._download('AAA.NS', '2y', '1d', 3, 'AAA.NS_2y_1d'))
+        self.assertEqual(yf.download.call_count, 3)
+        # No pause after the last attempt: nobody retries, other callers shouldn't wait
+        self.assertEqual(len(self.bucket.pauses), 2)
+        for delay, pause in zip([1, 2], self.bucket.pauses):
+            self.assertTrue(delay <= pause < 2 * delay)
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def bucket(self):
+        return TokenBucket("test", rate=2.0, burst=3, lock_dir=self._tmp.name, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_burst_then_rate(self):
+        b = self.bucket()
+        self.assertEqual([b.try_acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(b.try_acquire(), 0.5)
+        start = self.clock.t
+        for _ in range(4):
+            b.acquire()
+        self.assertAlmostEqual(self.clock.t - start, 2.0)
+
+    def test_state_is_shared_between_instances(self):
+        a, b = self.bucket(), self.bucket()
+        for _ in range(3):
+            a.try_acquire()
+        self.assertGreater(b.try_acquire(), 0)
+
+    def test_pause_blocks_everyone(self):
+        b = self.bucket()
+        self.bucket().pause(10)
+        self.assertAlmostEqual(b.try_acquire(), 10.0)
+        self.assertFalse(b.acquire(timeout=5))
+        self.clock.t += 10.5
+        self.assertEqual(b.try_acquire(), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
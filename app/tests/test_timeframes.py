@@ -0,0 +1,39 @@
+import unittest
+import pandas as pd
+import numpy as np
+from app.timeframes import resample_ohlcv, update_resampled
+
+def _bars(index):
+    n = len(index)
+    close = 100 + np.cumsum(np.random.default_rng(1).normal(0, 1, n))
+    return pd.DataFrame({
+        'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close,
+        'Volume': np.arange(1, n + 1, dtype=float)
+    }, index=index)
+
+class TestTimeframes(unittest.TestCase):
+    def test_weekly_ohlcv(self):
+        daily = _bars(pd.bdate_range('2024-01-01', periods=10))  # Mon 1st .. Fri 12th
+        weekly = resample_ohlcv(daily, "1wk")
+        self.assertEqual(list(weekly.index), list(pd.to_datetime(['2024-01-05', '2024-01-12'])))
+        first = daily.iloc[:5]
+        self.assertEqual(weekly['Open'].iloc[0], first['Open'].iloc[0])
+        self.assertEqual(weekly['High'].iloc[0], first['High'].max())
+        self.assertEqual(weekly['Close'].iloc[0], first['Close'].iloc[-1])
+        self.assertEqual(weekly['Volume'].iloc[0], first['Volume'].sum())
+
+    def test_hourly_buckets_start_at_session_open(self):
+        idx = pd.date_range('2024-01-02 09:15', '2024-01-02 15:15', freq='15min', tz='Asia/Kolkata')
+        hourly = resample_ohlcv(_bars(idx), "1h")
+        self.assertEqual(hourly.index[0].strftime('%H:%M'), '09:15')
+        self.assertEqual(hourly.index[1].strftime('%H:%M'), '10:15')
+
+    def test_incremental_matches_full(self):
+        daily = _bars(pd.bdate_range('2023-01-02', periods=300))
+        for tf in ("1wk", "1mo"):
+            derived = resample_ohlcv(daily.iloc[:250], tf)
+            updated = update_resampled(derived, daily, tf)
+            pd.testing.assert_frame_equal(updated, resample_ohlcv(daily, tf))
+
+if __name__ == '__main__':
+    unittest.main()
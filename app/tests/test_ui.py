@@ -0,0 +1,33 @@
+import unittest
+import pandas as pd
+from app.ui import query_page, _normalize_selection
+
+class TestResultsGrid(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Symbol': [f"SYM{i}" for i in range(120)],
+            'Price': [float(i) for i in range(120)]
+        })
+
+    def test_page_slice(self):
+        page, total = query_page(self.df, page=3, page_size=50)
+        self.assertEqual(total, 120)
+        self.assertEqual(len(page), 20)
+        self.assertEqual(page.iloc[0]['Symbol'], 'SYM100')
+
+    def test_sort_and_search(self):
+        page, total = query_page(self.df, page=1, page_size=5, sort_by='Price', ascending=False, search='sym1')
+        # SYM1, SYM10-19, SYM100-119
+        self.assertEqual(total, 31)
+        self.assertEqual(page.iloc[0]['Symbol'], 'SYM119')
+
+    def test_normalize_selection(self):
+        row = {'Symbol': 'TCS', 'Price': 1.0, '_selectedRowNodeInfo': {}}
+        self.assertEqual(_normalize_selection([row]), {'Symbol': 'TCS', 'Price': 1.0})
+        self.assertEqual(_normalize_selection(pd.DataFrame([row]))['Symbol'], 'TCS')
+        self.assertIsNone(_normalize_selection(None))
+        self.assertIsNone(_normalize_selection([]))
+        self.assertIsNone(_normalize_selection(pd.DataFrame()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from app.universe import read_universe_file, shard_universe, parse_shard
+from app.scan_store import save_scan_result, shard_dir, list_shard_dirs, merge_shards
+
+class TestUniverse(unittest.TestCase):
+    def setUp(self):
+        self.tickers = [f"SYM{i}.NS" for i in range(200)]
+
+    def test_read_universe_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "u.txt")
+            with open(path, "w") as f:
+                f.write("# comment\nreliance\nTCS.NS\n\nINFY  # inline\nTCS\n^NSEI\n")
+            self.assertEqual(read_universe_file(path), ['RELIANCE.NS', 'TCS.NS', 'INFY.NS', '^NSEI'])
+
+    def test_shards_partition_universe(self):
+        shards = [shard_universe(self.tickers, i, 4) for i in range(4)]
+        merged = sorted(t for s in shards for t in s)
+        self.assertEqual(merged, sorted(self.tickers))
+        # Deterministic and independent of the order of the universe file
+        self.assertEqual(shard_universe(list(reversed(self.tickers)), 1, 4), list(reversed(shards[1])))
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/8"), (2, 8))
+        with self.assertRaises(ValueError):
+            parse_shard("8/8")
+
+    def test_merge_shards(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, sym in enumerate(["B", "A"]):
+                res = {
+                    "buys": [{"Symbol": sym, "Price": 1.0}], "sells": [], "snapshots": [{"Symbol": sym}],
+                    "timing": {"tickers": 1, "evaluated": 1, "total_s": 1.0 + i, "fetch_s": 0.5, "eval_s": 0.5}
+                }
+                save_scan_result(res, shard_dir(tmp, i, 3), {"shard_index": i, "shard_count": 3}, mark_latest=False)
+
+            result, meta = merge_shards(tmp, mark_latest=False)
+            self.assertEqual(list(result["buys"]["Symbol"]), ["A", "B"])
+            self.assertEqual(result["timing"]["total_s"], 2.0)
+            self.assertEqual(meta["missing_shards"], [2])
+            self.assertTrue(os.path.exists(os.path.join(tmp, "buys.parquet")))
+
+    def test_merge_skips_shards_still_writing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            res = {"buys": [{"Symbol": "A"}], "sells": [], "snapshots": [], "timing": {"tickers": 1, "total_s": 1.0}}
+            save_scan_result(res, shard_dir(tmp, 0, 2), {"shard_index": 0, "shard_count": 2}, mark_latest=False)
+            # Shard 1 has written its slices and one table, but not meta.json yet
+            partial = shard_dir(tmp, 1, 2)
+            os.makedirs(os.path.join(partial, "signals"))
+            pd.DataFrame([{"Symbol": "B"}]).to_parquet(os.path.join(partial, "buys.parquet"), index=False)
+
+            self.assertEqual(list_shard_dirs(tmp), [shard_dir(tmp, 0, 2)])
+            result, meta = merge_shards(tmp, mark_latest=False)
+            self.assertEqual(list(result["buys"]["Symbol"]), ["A"])
+            self.assertEqual([s["shard"] for s in meta["shards"]], [0])
+            self.assertEqual(meta["missing_shards"], [1])
+
+    def test_merge_ranks_by_score_and_sums_timing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            shards = [[("A", 2.0), ("D", None)], [("B", 5.0), ("C", 1.0)]]
+            for i, buys in enumerate(shards):
+                res = {
+                    "buys": [{"Symbol": s, "Score": score} for s, score in buys], "sells": [], "snapshots": [],
+                    "timing": {"tickers": 2, "evaluated": 1, "reused": 1, "total_s": 3.0,
+                               "fetch_s": 1.0, "eval_s": 1.0, "rank_s": 0.25}
+                }
+                save_scan_result(res, shard_dir(tmp, i, 2), {"shard_index": i, "shard_count": 2}, mark_latest=False)
+
+            result, meta = merge_shards(tmp, mark_latest=False)
+            self.assertEqual(list(result["buys"]["Symbol"]), ["B", "A", "C", "D"])
+            self.assertEqual(result["timing"], {"tickers": 4, "evaluated": 2, "reused": 2, "total_s": 3.0,
+                                                "fetch_s": 2.0, "eval_s": 2.0, "rank_s": 0.5})
+            self.assertEqual(meta["missing_shards"], [])
+
+if __name__ == '__main__':
+    unittest.main()
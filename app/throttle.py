@@ -0,0 +1,133 @@
+# file: app/throttle.py
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks below are per-process only
+    fcntl = None
+
+LOCK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "cache", ".locks")
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+@contextmanager
+def file_lock(name, lock_dir=LOCK_DIR):
+    """
+    Exclusive lock shared by threads (threading.Lock) and processes (flock on
+    <lock_dir>/<name>.lock). Blocks until acquired.
+    """
+    path = os.path.join(lock_dir, f"{name}.lock")
+    with _thread_locks_guard:
+        tlock = _thread_locks.setdefault(path, threading.Lock())
+    with tlock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key within a process: the first caller
+    runs fn, the others wait and get its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [event, result, error]
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+        try:
+            call[1] = fn()
+            return call[1]
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call[0].set()
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter whose state lives in a small JSON file under a file
+    lock, so every thread and process on the machine draws from the same budget.
+    rate: tokens per second, burst: bucket size.
+    """
+
+    def __init__(self, name, rate, burst, lock_dir=LOCK_DIR, clock=time.time, sleep=time.sleep):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.lock_dir = lock_dir
+        self.path = os.path.join(lock_dir, f"{name}.bucket.json")
+        self._clock = clock
+        self._sleep = sleep
+
+    def _read(self, now):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        return {"tokens": state.get("tokens", self.burst), "ts": state.get("ts", now),
+                "not_before": state.get("not_before", 0.0)}
+
+    def _write(self, state):
+        os.makedirs(self.lock_dir, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def try_acquire(self):
+        """Takes a token if available. Returns: seconds to wait before retrying (0.0 = acquired)."""
+        with file_lock(self.name, self.lock_dir):
+            now = self._clock()
+            state = self._read(now)
+            if now < state["not_before"]:
+                return state["not_before"] - now
+            tokens = min(self.burst, state["tokens"] + max(0.0, now - state["ts"]) * self.rate)
+            if tokens >= 1.0:
+                self._write({"tokens": tokens - 1.0, "ts": now, "not_before": state["not_before"]})
+                return 0.0
+            self._write({"tokens": tokens, "ts": now, "not_before": state["not_before"]})
+            return (1.0 - tokens) / self.rate
+
+    def acquire(self, timeout=None):
+        """Blocks until a token is available. Returns False if `timeout` seconds pass first."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+    def pause(self, seconds):
+        """Stops all callers for `seconds` (eg. after the provider throttled us) and empties the bucket."""
+        with file_lock(self.name, self.lock_dir):
+            now = self._clock()
+            state = self._read(now)
+            self._write({"tokens": 0.0, "ts": now + seconds, "not_before": max(state["not_before"], now + seconds)})
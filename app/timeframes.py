@@ -0,0 +1,60 @@
+# file: app/timeframes.py
+import pandas as pd
+
+# Provider intervals that are downloaded and cached, with the history requested for each.
+# Every other timeframe is derived from one of these, so a ticker is downloaded once per base.
+BASE_PERIODS = {
+    "1d": "5y",    # enough weekly bars for SMA 200 on the weekly chart
+    "15m": "60d",  # provider limit for 15m bars
+}
+
+# timeframe -> base interval + pandas resample arguments (None = the base itself)
+# NSE cash session opens 09:15 IST, hence the 15 minute offset for hourly buckets.
+TIMEFRAMES = {
+    "15m": {"base": "15m", "rule": None},
+    "1h":  {"base": "15m", "rule": "60min", "closed": "left", "label": "left", "offset": "15min"},
+    "1d":  {"base": "1d", "rule": None},
+    "1wk": {"base": "1d", "rule": "W-FRI", "closed": "right", "label": "right"},
+    "1mo": {"base": "1d", "rule": "ME", "closed": "right", "label": "right"},
+}
+
+OHLCV_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+def resample_ohlcv(df, timeframe):
+    """
+    Vectorized OHLCV downsampling of base bars to `timeframe`.
+    Buckets without any base bar (weekends, holidays, nights) are dropped.
+    """
+    spec = TIMEFRAMES[timeframe]
+    if spec["rule"] is None or df is None or df.empty:
+        return df
+    agg = {col: how for col, how in OHLCV_AGG.items() if col in df.columns}
+    kwargs = {"closed": spec["closed"], "label": spec["label"]}
+    if "offset" in spec:
+        kwargs.update(origin="start_day", offset=spec["offset"])
+    out = df[list(agg)].resample(spec["rule"], **kwargs).agg(agg)
+    return out.dropna(subset=["Close"])
+
+def update_resampled(derived, base, timeframe):
+    """
+    Incrementally extends a previously derived series with new base bars.
+    Only the last (possibly partial) bucket and anything after it is recomputed.
+    Falls back to a full resample when the base history no longer lines up.
+    """
+    spec = TIMEFRAMES[timeframe]
+    if spec["rule"] is None:
+        return base
+    if derived is None or len(derived) < 2 or base is None or base.empty or base.index[0] > derived.index[0]:
+        return resample_ohlcv(base, timeframe)
+
+    # Right-closed buckets hold (prev_label, label]; left-closed hold [label, next_label)
+    if spec["closed"] == "right":
+        tail = base[base.index > derived.index[-2]]
+    else:
+        tail = base[base.index >= derived.index[-1]]
+    if tail.empty:
+        return derived
+
+    new_tail = resample_ohlcv(tail, timeframe)
+    head = derived[derived.index < new_tail.index[0]]
+    return pd.concat([head, new_tail])
@@ -1,54 +1,127 @@
 # file: app/ui.py
 import streamlit as st
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import pandas as pd
 
-# Try import AgGrid, else fallback
-try:
-    from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-    HAS_AGGRID = True
-except ImportError:
-    HAS_AGGRID = False
+# plotly and st_aggrid are heavy; they are imported on first use only
+_AGGRID = None
 
-def render_interactive_table(df, key="table"):
+def _load_aggrid():
+    """Returns the st_aggrid module (or False if not installed), importing it once."""
+    global _AGGRID
+    if _AGGRID is None:
+        try:
+            import st_aggrid
+            _AGGRID = st_aggrid
+        except ImportError:
+            _AGGRID = False
+    return _AGGRID
+
+def _normalize_selection(selected):
+    """
+    Returns the first selected row as a dict (or None).
+    AgGrid < 1.0 returns a list of dicts, AgGrid >= 1.0 returns a DataFrame
+    (or None when nothing is selected).
+    """
+    if selected is None:
+        return None
+    if isinstance(selected, pd.DataFrame):
+        if selected.empty:
+            return None
+        row = selected.iloc[0].to_dict()
+    elif isinstance(selected, dict):
+        row = selected
+    else:
+        if len(selected) == 0:
+            return None
+        row = selected[0]
+    # AgGrid adds bookkeeping keys to the row, drop them
+    return {k: v for k, v in dict(row).items() if not str(k).startswith('_')}
+
+def query_page(df, page=1, page_size=50, sort_by=None, ascending=True, search=None):
+    """
+    Server-side filter / sort / slice of a results table.
+    Returns: (page_df, total_matching_rows)
     """
-    Renders AgGrid with selection enabled.
+    view = df
+    if search and 'Symbol' in view.columns:
+        mask = view['Symbol'].astype(str).str.contains(search.strip(), case=False, regex=False)
+        view = view[mask]
+
+    if sort_by and sort_by in view.columns:
+        view = view.sort_values(sort_by, ascending=ascending, kind='mergesort')
+
+    start = (max(int(page), 1) - 1) * page_size
+    return view.iloc[start:start + page_size], len(view)
+
+def render_paginated_table(df, key="table", page_size=50, selectable=True):
     """
-    if df.empty:
+    Paginated grid: sorting, filtering and slicing run on the server and only
+    the visible page is sent to the browser.
+    Returns the selected row as a dict (or None).
+    """
+    if df is None or df.empty:
         st.write("No Data")
         return None
 
-    if HAS_AGGRID:
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination(paginationAutoPageSize=True)
+    c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
+    search = c1.text_input("Filter Symbol", key=f"{key}_search")
+    sort_by = c2.selectbox("Sort by", ["(none)"] + list(df.columns), key=f"{key}_sort")
+    ascending = c3.toggle("Ascending", value=False, key=f"{key}_asc")
+
+    # Page number lives in session state so it can be clamped when the filter narrows the result
+    page_key = f"{key}_page"
+    page_df, total = query_page(
+        df, st.session_state.get(page_key, 1), page_size,
+        sort_by=None if sort_by == "(none)" else sort_by,
+        ascending=ascending, search=search
+    )
+    n_pages = max((total + page_size - 1) // page_size, 1)
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+        page_df, total = query_page(
+            df, n_pages, page_size,
+            sort_by=None if sort_by == "(none)" else sort_by,
+            ascending=ascending, search=search
+        )
+    page = c4.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key)
+    st.caption(f"{total} rows · page {page}/{n_pages}")
+
+    if page_df.empty:
+        st.write("No Data")
+        return None
+
+    aggrid = _load_aggrid() if selectable else False
+    if aggrid:
+        AgGrid, GridOptionsBuilder, GridUpdateMode = aggrid.AgGrid, aggrid.GridOptionsBuilder, aggrid.GridUpdateMode
+        page_df = page_df.reset_index(drop=True)
+        gb = GridOptionsBuilder.from_dataframe(page_df)
         gb.configure_selection('single', use_checkbox=True)
-        gb.configure_column("Symbol", pinned=True)
+        if 'Symbol' in page_df.columns:
+            gb.configure_column("Symbol", pinned=True)
+        # Sorting/filtering happen server-side over the full result
+        gb.configure_default_column(sortable=False, filter=False)
         gridOptions = gb.build()
 
         grid_response = AgGrid(
-            df,
+            page_df,
             gridOptions=gridOptions,
             update_mode=GridUpdateMode.SELECTION_CHANGED,
             fit_columns_on_grid_load=True,
             theme='streamlit',
             key=key
         )
-        
-        selected = grid_response['selected_rows']
-        if selected:
-            # AgGrid v0.3.4+ returns list of dicts. 
-            # Depending on version, it might be a DataFrame or list.
-            # We assume list of dicts here.
-            return selected[0] if len(selected) > 0 else None
-        return None
+        return _normalize_selection(grid_response['selected_rows'])
     else:
-        st.dataframe(df)
+        st.dataframe(page_df, hide_index=True)
         return None
 
 def plot_stock_chart(df, ticker):
     """
     Creates Plotly Candlestick with Donchian and RSI.
     """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
                         vertical_spacing=0.1, subplot_titles=(f"{ticker} Price", "RSI"),
                         row_width=[0.2, 0.7])
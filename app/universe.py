@@ -0,0 +1,69 @@
+# file: app/universe.py
+import os
+import zlib
+
+UNIVERSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "universes")
+
+# Used when data/universes has no files (fresh checkout without data)
+DEFAULT_UNIVERSE = [
+    'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS',
+    'SBIN.NS', 'BHARTIARTL.NS', 'ITC.NS', 'KOTAKBANK.NS', 'LT.NS',
+    'AXISBANK.NS', 'HINDUNILVR.NS', 'TATAMOTORS.NS', 'BAJFINANCE.NS', 'MARUTI.NS'
+]
+
+def display_name(ticker):
+    """'RELIANCE.NS' -> 'RELIANCE' (the symbol shown in the UI and stored in results)"""
+    return ticker.replace('.NS', '').replace('=F', '')
+
+def list_universes():
+    """Names of the universe files in data/universes (without .txt), sorted."""
+    if not os.path.isdir(UNIVERSE_DIR):
+        return []
+    return sorted(f[:-4] for f in os.listdir(UNIVERSE_DIR) if f.endswith(".txt"))
+
+def read_universe_file(path):
+    """One symbol per line; blank lines and '#' comments are ignored. Bare NSE symbols get '.NS'."""
+    tickers = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            sym = line.split("#", 1)[0].strip().upper()
+            if not sym:
+                continue
+            if "." not in sym and "=" not in sym and not sym.startswith("^"):
+                sym += ".NS"
+            if sym not in seen:
+                seen.add(sym)
+                tickers.append(sym)
+    return tickers
+
+def load_universe(name_or_path):
+    """
+    Loads a universe by name (data/universes/<name>.txt) or by file path.
+    """
+    path = name_or_path
+    if not os.path.exists(path):
+        path = os.path.join(UNIVERSE_DIR, f"{name_or_path}.txt")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Unknown universe: {name_or_path}")
+    return read_universe_file(path)
+
+def shard_of(ticker, shard_count):
+    """Shard a ticker belongs to. CRC32 is stable across processes and machines (unlike hash())."""
+    return zlib.crc32(ticker.encode("utf-8")) % shard_count
+
+def shard_universe(tickers, shard_index, shard_count):
+    """Tickers of shard `shard_index` (0-based) out of `shard_count`, in universe order."""
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard_index}/{shard_count}")
+    return [t for t in tickers if shard_of(t, shard_count) == shard_index]
+
+def parse_shard(spec):
+    """'2/8' -> (2, 8)"""
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like INDEX/COUNT, got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}: need 0 <= INDEX < COUNT")
+    return index, count